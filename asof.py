@@ -0,0 +1,91 @@
+# asof.py — batched as-of lookups on a sorted DatetimeIndex (binary search, no Python scans)
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+POLICIES = ("backward", "forward", "nearest")
+
+Cols = Optional[Union[str, List[str]]]
+
+
+def _as_ns(values) -> np.ndarray:
+    idx = pd.DatetimeIndex(pd.to_datetime(values))
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    return idx.values.astype("datetime64[ns]")
+
+
+def asof_positions(index, targets: Iterable, policy: str = "backward",
+                   fallback: bool = False, tolerance: Optional[pd.Timedelta] = None) -> np.ndarray:
+    """Row position for each target date, -1 where nothing qualifies.
+
+    backward: last row <= target; forward: first row >= target;
+    nearest: whichever is closer (ties go backward). With ``fallback`` a
+    backward/forward miss is retried in the other direction, which is what
+    the old ``fetch_nearest_price`` did.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+    idx = _as_ns(index)
+    tgt = _as_ns(list(targets))
+    n = len(idx)
+    if n == 0:
+        return np.full(len(tgt), -1, dtype=np.int64)
+
+    back = np.searchsorted(idx, tgt, side="right") - 1
+    fwd = np.searchsorted(idx, tgt, side="left")
+    has_back = back >= 0
+    has_fwd = fwd < n
+
+    if policy == "nearest":
+        d_back = np.where(has_back, tgt - idx[np.clip(back, 0, n - 1)], np.timedelta64(2**62, "ns"))
+        d_fwd = np.where(has_fwd, idx[np.clip(fwd, 0, n - 1)] - tgt, np.timedelta64(2**62, "ns"))
+        pos = np.where(d_back <= d_fwd, back, fwd)
+        ok = has_back | has_fwd
+    else:
+        first, second = (back, fwd) if policy == "backward" else (fwd, back)
+        ok_first, ok_second = (has_back, has_fwd) if policy == "backward" else (has_fwd, has_back)
+        pos = first
+        ok = ok_first
+        if fallback:
+            pos = np.where(ok_first, first, second)
+            ok = ok_first | ok_second
+
+    pos = np.where(ok, pos, -1).astype(np.int64)
+    if tolerance is not None:
+        hit = pos >= 0
+        dist = np.abs(idx[np.clip(pos, 0, n - 1)] - tgt)
+        pos[hit & (dist > np.timedelta64(pd.Timedelta(tolerance).value, "ns"))] = -1
+    return pos
+
+
+def asof(data: Union[pd.DataFrame, pd.Series], targets: Iterable, cols: Cols = None,
+         policy: str = "backward", fallback: bool = False,
+         tolerance: Optional[pd.Timedelta] = None) -> np.ndarray:
+    """Plain float values at each target date; NaN where nothing qualifies.
+
+    Returns shape (n_targets,) for a Series or a single column name, and
+    (n_targets, n_cols) for a list of columns.
+    """
+    pos = asof_positions(data.index, targets, policy, fallback, tolerance)
+    if isinstance(data, pd.Series):
+        arr = data.to_numpy(dtype=float)
+    elif cols is None or isinstance(cols, str):
+        arr = (data if cols is None else data[cols])
+        arr = arr.to_numpy(dtype=float)
+        if arr.ndim == 2:
+            arr = arr[:, 0]
+    else:
+        arr = data[list(cols)].to_numpy(dtype=float)
+
+    out = np.full((len(pos),) + arr.shape[1:], np.nan)
+    hit = pos >= 0
+    out[hit] = arr[pos[hit]]
+    return out
+
+
+def nearest_value(data: Union[pd.DataFrame, pd.Series], date, col: Optional[str] = None) -> Optional[float]:
+    # Single-date convenience with the legacy semantics (backward, then forward)
+    val = asof(data, [date], col, fallback=True)[0]
+    return None if np.isnan(val) else float(val)
@@ -0,0 +1,106 @@
+# atr_kernel.py — panel-wide true range / ATR / ATR% z-score on (dates × tickers) NumPy blocks
+from typing import Dict, Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+Block = np.ndarray  # float64, shape (T, N); NaN where a ticker has no bar
+
+
+def _2d(x) -> Block:
+    arr = np.asarray(x, dtype=float)
+    return arr[:, None] if arr.ndim == 1 else arr
+
+
+def true_range(high, low, close) -> Block:
+    # max(H-L, |H-prevC|, |L-prevC|); NaN legs are skipped like pd.concat(...).max(axis=1)
+    high, low, close = _2d(high), _2d(low), _2d(close)
+    prev = np.empty_like(close)
+    prev[0] = np.nan
+    prev[1:] = close[:-1]
+    with np.errstate(invalid="ignore"):
+        return np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+
+
+def rolling_mean(x, window: int) -> Block:
+    # Same as DataFrame.rolling(window).mean(): NaN until full, NaN if the window holds a NaN
+    x = _2d(x)
+    T = x.shape[0]
+    out = np.full_like(x, np.nan)
+    if T < window:
+        return out
+    nan = np.isnan(x)
+    csum = np.cumsum(np.where(nan, 0.0, x), axis=0)
+    cnan = np.cumsum(nan, axis=0)
+    win_sum = csum[window - 1:].copy()
+    win_sum[1:] -= csum[:-window]
+    win_nan = cnan[window - 1:].copy()
+    win_nan[1:] -= cnan[:-window]
+    out[window - 1:] = np.where(win_nan == 0, win_sum / window, np.nan)
+    return out
+
+
+def rolling_std(x, window: int, ddof: int = 1) -> Block:
+    x = _2d(x)
+    # Shift by a per-column reference so the sum-of-squares form stays well conditioned
+    ref = np.nanmean(x, axis=0) if x.size else 0.0
+    ref = np.where(np.isnan(ref), 0.0, ref)
+    d = x - ref
+    mean = rolling_mean(d, window)
+    mean_sq = rolling_mean(d * d, window)
+    var = (mean_sq - mean * mean) * window / (window - ddof)
+    return np.sqrt(np.maximum(var, 0.0))
+
+
+def wilder(x, window: int) -> Block:
+    # Wilder smoothing seeded with the first full simple average, per column
+    x = _2d(x)
+    sma = rolling_mean(x, window)
+    out = np.full_like(x, np.nan)
+    prev = np.full(x.shape[1], np.nan)
+    alpha = 1.0 / window
+    for t in range(x.shape[0]):
+        cur = np.where(np.isnan(prev), sma[t], prev + alpha * (x[t] - prev))
+        cur = np.where(~np.isnan(prev) & np.isnan(x[t]), prev, cur)
+        out[t] = cur
+        prev = cur
+    return out
+
+
+def zscore(x, window: int) -> Block:
+    x = _2d(x)
+    mean = rolling_mean(x, window)
+    std = rolling_std(x, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = (x - mean) / std
+    return np.where(std > 0, z, np.where(np.isnan(std), np.nan, 0.0))
+
+
+def atr_block(high, low, close, windows: Iterable[int] = (14, 20), pct_window: int = 14,
+              z_lookback: int = 20) -> Dict[str, Union[Block, Dict[int, Block]]]:
+    """Every ATR flavour for the whole universe in one call.
+
+    Returns tr, sma/wilder ATR per window, atr_pct (pct_window SMA ATR as %
+    of close) and atr_pct_z (rolling z-score of atr_pct over z_lookback).
+    """
+    close = _2d(close)
+    tr = true_range(high, low, close)
+    windows = sorted(set(windows) | {pct_window})
+    sma = {w: rolling_mean(tr, w) for w in windows}
+    wil = {w: wilder(tr, w) for w in windows}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        atr_pct = sma[pct_window] / close * 100
+    return {
+        "tr": tr,
+        "sma": sma,
+        "wilder": wil,
+        "atr_pct": atr_pct,
+        "atr_pct_z": zscore(atr_pct, z_lookback),
+    }
+
+
+def atr_series(df: pd.DataFrame, window: int = 14) -> pd.Series:
+    # Single-ticker convenience: a (T, 1) block through the same kernel
+    tr = true_range(df["High"].to_numpy(dtype=float), df["Low"].to_numpy(dtype=float),
+                    df["Close"].to_numpy(dtype=float))
+    return pd.Series(rolling_mean(tr, window)[:, 0], index=df.index)
@@ -1,177 +1,200 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import yfinance as yf
+import argparse
+import os
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-
-# ========== Google Sheets Setup ==========
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-creds = ServiceAccountCredentials.from_json_keyfile_name("gcreds.json", scope)
-client = gspread.authorize(creds)
-sheet = client.open("Earnings Tracker").sheet1
-tickers = sheet.col_values(1)[1:]  # Skip header
+from price_store import default_store
+from asof import asof, nearest_value
+from atr_kernel import atr_series
+from iv_archive import default_archive
+from sheet_mirror import tracker_tickers
+from instrumentation import count, timer
+from earnings_cache import default_earnings
+from option_pricing import EXPIRY_BUFFER, IV_CRUSH, OPTION_DTE, RISK_FREE, add_option_pnl, realized_vol
+from result_cache import ResultCache, params_hash, window_version
+from results_store import record_run
+
+# ========== Config ==========
+LOOKUP_TOLERANCE = pd.Timedelta(days=30)  # same reach as the old per-event download window
+ENTRY_OFFSET = pd.Timedelta(days=20)
+EXIT_OFFSET = pd.Timedelta(days=1)
+WARMUP = pd.Timedelta(days=75)            # bars before entry that ATR14 / 20d vol read, tolerance included
+STRADDLE_MIN = (0.025, 0.6)               # ATR%, IV rank above which -> Straddle
+CONDOR_MAX = (0.015, 0.3)                 # ATR%, IV rank below which -> Iron Condor
+OUTPUT_CSV = "earnings_strategy_backtest.csv"
+CACHE_ENGINE = "backtest052925"
+# Everything that changes an event's result; bump "version" when the event logic itself changes
+PARAMS = {
+    "version": 2, "atr_window": 14, "vol_window": 20, "entry": ENTRY_OFFSET.days, "exit": EXIT_OFFSET.days,
+    "tolerance": LOOKUP_TOLERANCE.days, "straddle": STRADDLE_MIN, "condor": CONDOR_MAX,
+    "iv_crush": IV_CRUSH, "dte": OPTION_DTE, "expiry_buffer": EXPIRY_BUFFER, "r": RISK_FREE,
+}
 
 # ========== Helper Functions ==========
 
 def get_earnings_dates(ticker, n=20):
-    try:
-        tkr = yf.Ticker(ticker)
-        df = tkr.get_earnings_dates(limit=n)
-        if df is None or df.empty:
-            return []
-        dates = pd.to_datetime(df.index).tz_localize(None)
-        today = pd.Timestamp.today().normalize()
-        past_dates = [d for d in dates if d < today]
-        return sorted(past_dates, reverse=True)[:n]
-    except Exception as e:
-        print(f"{ticker} error (earnings_dates): {e}")
-        return []
+    # Local read: past reports from the shared earnings cache (yfinance + catalysts + earnings_events.csv)
+    return default_earnings().past(ticker, n)
 
 def compute_atr(df, window=14):
-    high = df["High"]
-    low = df["Low"]
-    close = df["Close"]
-    tr1 = high - low
-    tr2 = abs(high - close.shift())
-    tr3 = abs(low - close.shift())
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    return tr.rolling(window).mean()
+    return atr_series(df, window)
 
 def fetch_nearest_price(df, date, col=None):
-    idx = df.index
-    if date in idx:
-        val = df.loc[date][col] if col else df.loc[date]
-        return float(val)
-    prev_dates = [d for d in idx if d <= date]
-    if prev_dates:
-        nearest_date = max(prev_dates)
-        val = df.loc[nearest_date][col] if col else df.loc[nearest_date]
-        return float(val)
-    next_dates = [d for d in idx if d > date]
-    if next_dates:
-        nearest_date = min(next_dates)
-        val = df.loc[nearest_date][col] if col else df.loc[nearest_date]
-        return float(val)
-    return None
+    # Exact/previous bar, else the next one; plain float or None
+    return nearest_value(df, date, col)
 
 def fetch_iv_rank(ticker, date, lookback=252):
-    try:
-        tkr = yf.Ticker(ticker)
-        option_dates = tkr.options
-        if not option_dates:
-            return None
-        expiry = None
-        for edate in option_dates:
-            if pd.to_datetime(edate) > date + timedelta(days=7):
-                expiry = edate
-                break
-        if expiry is None:
-            expiry = option_dates[-1]
-        chain = tkr.option_chain(expiry)
-        calls = chain.calls
-        price = fetch_nearest_price(
-            yf.download(ticker, start=date - timedelta(days=10), end=date + timedelta(days=2), progress=False, auto_adjust=True),
-            date,
-            "Close"
-        )
-        if price is None or calls.empty:
-            return None
-        calls["dist"] = (calls["strike"] - price).abs()
-        atm_call = calls.sort_values("dist").iloc[0]
-        iv_now = atm_call["impliedVolatility"]
-
-        ivs = []
-        for e in option_dates:
-            try:
-                if pd.to_datetime(e) < date and len(ivs) < lookback:
-                    chain_hist = tkr.option_chain(e)
-                    calls_hist = chain_hist.calls
-                    calls_hist["dist"] = (calls_hist["strike"] - price).abs()
-                    atm_hist = calls_hist.sort_values("dist").iloc[0]
-                    ivs.append(atm_hist["impliedVolatility"])
-            except:
-                continue
-        if not ivs:
-            return None
-        iv_rank = (iv_now - min(ivs)) / (max(ivs) - min(ivs)) if max(ivs) != min(ivs) else 0.5
-        return iv_rank
-    except Exception as e:
-        print(f"{ticker} error (iv_rank): {e}")
-        return None
-
-# ========== Main Backtest ==========
-results = []
-
-for ticker in tickers:
-    earnings_dates = get_earnings_dates(ticker, n=20)
-    print(f"Running: {ticker} ({len(earnings_dates)} earnings)")
-    try:
-        for earn_date in earnings_dates:
-            entry_date = earn_date - pd.Timedelta(days=20)
-            exit_date = earn_date + pd.Timedelta(days=1)
-
-            df_price = yf.download(
-                ticker,
-                start=entry_date - pd.Timedelta(days=30),
-                end=exit_date + pd.Timedelta(days=2),
-                progress=False,
-                auto_adjust=True
-            )
-            if df_price.empty:
-                print(f"{ticker} skipped: price data incomplete")
-                continue
-            df_price.index = pd.to_datetime(df_price.index).tz_localize(None)
+    # Historical ATM IV rank as of `date` from the local archive (no options calls)
+    return default_archive().iv_rank(ticker, date, lookback)
+
+def fetch_atm_iv(ticker, date, fallback):
+    # Archived ATM IV level for option pricing; realized vol / crushed entry IV when missing
+    iv = default_archive().atm_iv(ticker, date)
+    return fallback if iv is None or np.isnan(iv) else iv
+
+# ========== Per-Ticker Backtest ==========
+def event_versions(ticker, df_price, earnings_dates):
+    # Data version per event: the bars it reads plus the archived IV inputs it uses
+    archive = default_archive()
+    out = {}
+    for d in earnings_dates:
+        entry_date, exit_date = d - ENTRY_OFFSET, d + EXIT_OFFSET
+        ivs = (archive.iv_rank(ticker, entry_date), archive.atm_iv(ticker, entry_date), archive.atm_iv(ticker, exit_date))
+        out[d] = window_version(df_price, entry_date - WARMUP - LOOKUP_TOLERANCE, exit_date + LOOKUP_TOLERANCE, ivs)
+    return out
+
+
+def backtest_ticker(ticker, df_price, earnings_dates):
+    """{earnings date: result row, or None when the event is skipped}; option P&L included."""
+    frame = df_price.assign(
+        ATR14=compute_atr(df_price),
+        VolProxy=df_price["Close"].rolling(window=20).std(),
+        RV=realized_vol(df_price["Close"])
+    )
+    # Every event's lookups in two batched as-of calls
+    events = pd.DatetimeIndex(earnings_dates)
+    entry_dates = events - ENTRY_OFFSET
+    exit_dates = events + EXIT_OFFSET
+    at_entry = asof(frame, entry_dates, ["ATR14", "Open", "VolProxy", "RV"], fallback=True, tolerance=LOOKUP_TOLERANCE)
+    at_exit = asof(frame, exit_dates, "Close", fallback=True, tolerance=LOOKUP_TOLERANCE)
+
+    out = {}
+    for i, earn_date in enumerate(earnings_dates):
+        out[earn_date] = None
+        entry_date, exit_date = entry_dates[i], exit_dates[i]
+        atr14, price_entry, vol_proxy, rv = (float(v) for v in at_entry[i])
+        price_exit = float(at_exit[i])
+
+        if np.isnan(price_entry) or np.isnan(price_exit) or np.isnan(atr14):
+            print(f"{ticker} skipped: could not find price/ATR at required dates")
+            continue
+
+        atr_pct = atr14 / price_entry if price_entry else None
+
+        # IV Rank with fallback
+        iv_rank = fetch_iv_rank(ticker, entry_date)
+        if iv_rank is None:
+            iv_rank = (vol_proxy / price_entry) if (price_entry and not np.isnan(vol_proxy)) else 0.5
+
+        # Strategy Selection
+        if atr_pct is not None and iv_rank is not None:
+            if atr_pct > STRADDLE_MIN[0] and iv_rank > STRADDLE_MIN[1]:
+                strat = "Straddle"
+            elif atr_pct < CONDOR_MAX[0] and iv_rank < CONDOR_MAX[1]:
+                strat = "Iron Condor"
+            else:
+                strat = "Vertical Call"
+        else:
+            strat = "N/A"
+
+        pnl = (price_exit - price_entry) / price_entry if (price_entry and price_exit) else None
+        iv_entry = fetch_atm_iv(ticker, entry_date, rv)
+        iv_exit = fetch_atm_iv(ticker, exit_date, iv_entry * IV_CRUSH)
+
+        out[earn_date] = {
+            "Ticker": ticker,
+            "Earnings Date": earn_date.date(),
+            "Entry Date": entry_date.date(),
+            "Exit Date": exit_date.date(),
+            "Entry Price": price_entry,
+            "Exit Price": price_exit,
+            "ATR(14)": atr14,
+            "ATR%": atr_pct,
+            "IV Rank": iv_rank,
+            "Strategy": strat,
+            "P/L": pnl,
+            "Entry IV": iv_entry,
+            "Exit IV": iv_exit
+        }
+
+    # Option P&L for this ticker's rows in one vectorized pricing pass
+    done = [d for d, row in out.items() if row is not None]
+    if done:
+        priced = add_option_pnl(pd.DataFrame([out[d] for d in done]))
+        for d, row in zip(done, priced.to_dict("records")):
+            out[d] = row
+    return out
 
-            # ATR and Entry/Exit Prices
-            atr_series = compute_atr(df_price)
-            atr14 = fetch_nearest_price(atr_series, entry_date)
-            price_entry = fetch_nearest_price(df_price, entry_date, "Open")
-            price_exit = fetch_nearest_price(df_price, exit_date, "Close")
 
-            if price_entry is None or price_exit is None or atr14 is None:
-                print(f"{ticker} skipped: could not find price/ATR at required dates")
+# ========== Main Backtest ==========
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Earnings strategy backtest (incremental)")
+    ap.add_argument("--full", action="store_true", help="recompute every event, ignoring cached results")
+    ap.add_argument("--prune", action="store_true", help="drop cached results from other parameter sets")
+    args = ap.parse_args(argv)
+
+    tickers = [t for t in tracker_tickers() if t]  # local sheet mirror
+    store = default_store()
+    cache = ResultCache(CACHE_ENGINE)
+    params = params_hash(PARAMS)
+    if args.prune:
+        print(f"Pruned {cache.prune(params)} cached results from other parameter sets")
+    results = []
+    reused = computed = forgotten = 0
+
+    # Network work fans out up front (bounded, rate-limited); the loop only reads local data
+    # Only tickers whose cached dates have gone stale are re-queried
+    default_earnings().refresh(tickers, limit=20)
+    earnings_by_ticker = {t: get_earnings_dates(t, n=20) for t in tickers}
+    with timer("backtest.prices"):
+        store.ensure_many([t for t in tickers if earnings_by_ticker[t]])
+
+    for ticker in tickers:
+        earnings_dates = earnings_by_ticker[ticker]
+        try:
+            if not earnings_dates:
+                print(f"Running: {ticker} (0 earnings)")
                 continue
-
-            atr_pct = atr14 / price_entry if price_entry else None
-
-            # IV Rank with fallback
-            iv_rank = fetch_iv_rank(ticker, entry_date)
-            if iv_rank is None:
-                rolling_std = df_price["Close"].rolling(window=20).std()
-                vol_proxy = fetch_nearest_price(rolling_std, entry_date)
-                iv_rank = (vol_proxy / price_entry) if (price_entry and vol_proxy) else 0.5
-
-            # Strategy Selection
-            if atr_pct is not None and iv_rank is not None:
-                if atr_pct > 0.025 and iv_rank > 0.6:
-                    strat = "Straddle"
-                elif atr_pct < 0.015 and iv_rank < 0.3:
-                    strat = "Iron Condor"
-                else:
-                    strat = "Vertical Call"
-            else:
-                strat = "N/A"
-
-            pnl = (price_exit - price_entry) / price_entry if (price_entry and price_exit) else None
-
-            results.append({
-                "Ticker": ticker,
-                "Earnings Date": earn_date.date(),
-                "Entry Date": entry_date.date(),
-                "Exit Date": exit_date.date(),
-                "Entry Price": price_entry,
-                "Exit Price": price_exit,
-                "ATR(14)": atr14,
-                "ATR%": atr_pct,
-                "IV Rank": iv_rank,
-                "Strategy": strat,
-                "P/L": pnl
-            })
-
-    except Exception as e:
-        print(f"{ticker} error: {e}")
-
-# Save results
-results_df = pd.DataFrame(results)
-results_df.to_csv("earnings_strategy_backtest.csv", index=False)
-print("✅ All done. Results saved to earnings_strategy_backtest.csv")
\ No newline at end of file
+            forgotten += cache.forget(ticker, earnings_dates)
+            with timer("backtest.load_bars"):
+                df_price = store.get(ticker, adjusted=True)
+            count("backtest.events", len(earnings_dates))
+            # Only new events, or ones whose bars / IV inputs changed, are recomputed
+            versions = event_versions(ticker, df_price, earnings_dates)
+            cached, todo = cache.lookup(ticker, params, versions) if not args.full else ({}, list(earnings_dates))
+            reused += len(cached)
+            computed += len(todo)
+            print(f"Running: {ticker} ({len(earnings_dates)} earnings, {len(todo)} to compute)")
+            count("backtest.cache_hit", len(cached))
+            count("backtest.cache_miss", len(todo))
+            fresh = backtest_ticker(ticker, df_price, todo) if todo else {}
+            # Persisted per ticker, so an interrupted run picks up from here
+            cache.store(ticker, params, {d: (versions[d], fresh[d]) for d in todo})
+            merged = {**cached, **fresh}
+            results.extend(merged[d] for d in earnings_dates if merged[d] is not None)
+
+        except Exception as e:
+            print(f"{ticker} error: {e}")
+
+    count("backtest.trades", len(results))
+    print(f"Cache: {reused} events reused, {computed} computed, {forgotten} withdrawn dates dropped")
+    cache.close()
+    # Atomic replace: a crash mid-write never leaves a truncated CSV
+    tmp = OUTPUT_CSV + ".tmp"
+    pd.DataFrame(results).to_csv(tmp, index=False)
+    os.replace(tmp, OUTPUT_CSV)
+    print(f"✅ All done. Results saved to {OUTPUT_CSV}")
+    record_run(CACHE_ENGINE, pd.DataFrame(results), {"params": params})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# bench.py — offline benchmark suite for the hot paths; JSON results, baseline regression gate
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import synthetic
+
+# ───────── config ─────────
+BENCH_DIR = os.path.join("data", "bench")
+RESULTS_PATH = os.path.join(BENCH_DIR, "results.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+THRESHOLD = 0.25         # fail when a case is this much slower than its baseline
+SCALES = {               # tickers, years
+    "tiny": (10, 1),
+    "small": (100, 3),
+    "medium": (500, 5),
+    "large": (5000, 20),  # ~200 MB per OHLC field; needs a few GB of RAM
+}
+
+
+# ───────── cases ─────────
+class Suite:
+    """Fixtures are built once per scale; each case gets a zero-arg callable to time."""
+
+    def __init__(self, n_tickers: int, years: float, seed: int = 0):
+        self.panel = synthetic.price_panel(n_tickers, years, seed)
+        self.events = synthetic.earnings_events(self.panel, seed=seed)
+        self.frames = [self.panel.frame(j) for j in range(len(self.panel.tickers))]
+        self.iv = synthetic.iv_history(self.panel, seed)
+        self.grid = synthetic.sheet_grid(self.panel, seed=seed)
+        self.new_grid = synthetic.perturb(self.grid, seed=seed)
+        self.tmp = tempfile.mkdtemp(prefix="bench_")
+
+    def cases(self) -> Dict[str, Callable[[], object]]:
+        return {
+            "atr_panel": self.atr_panel,
+            "nearest_price": self.nearest_price,
+            "event_loop": self.event_loop,
+            "iv_rank": self.iv_rank,
+            "classify": self.classify,
+            "sheet_diff": self.sheet_diff,
+        }
+
+    def atr_panel(self):
+        from atr_kernel import atr_block
+        p = self.panel
+        return atr_block(p.high, p.low, p.close)
+
+    def nearest_price(self):
+        # Entry (-20d) and exit (+1d) as-of lookups for every event, batched per ticker
+        from asof import asof
+        tol = pd.Timedelta(days=30)
+        for t, df in zip(self.panel.tickers, self.frames):
+            ev = pd.DatetimeIndex(list(self.events[t].values()))
+            asof(df, ev - pd.Timedelta(days=20), ["Open", "Close"], fallback=True, tolerance=tol)
+            asof(df, ev + pd.Timedelta(days=1), "Close", fallback=True, tolerance=tol)
+
+    def event_loop(self):
+        # main_cleaned.simulate_trades on in-memory bars, empty IV archive (realized-vol path)
+        import iv_archive
+        import main_cleaned
+        iv_archive._default_archive = iv_archive.IVArchive(os.path.join(self.tmp, "iv"))
+        n = 0
+        for t, df in zip(self.panel.tickers, self.frames):
+            n += len(main_cleaned.simulate_trades(t, self.events[t], df))
+        return n
+
+    def iv_rank(self):
+        # Rolling IV rank index per ticker plus an as-of query for every event
+        from iv_archive import _rolling_index
+        dates = self.panel.dates.values.astype("datetime64[D]")
+        for j, t in enumerate(self.panel.tickers):
+            idx = _rolling_index(dates, self.iv[:, j], 252)
+            for d in self.events[t].values():
+                idx.row(d)
+
+    def classify(self):
+        from threshold_sweep import EventMatrix, move_payoffs, sweep
+        rng = np.random.default_rng(0)
+        n = sum(len(v) for v in self.events.values())
+        atr = rng.uniform(0.005, 0.06, n)
+        iv = rng.uniform(0, 1, n)
+        move = rng.normal(0, 0.05, n)
+        return sweep(EventMatrix(atr, iv, move_payoffs(atr, move)))
+
+    def sheet_diff(self):
+        from fake_worksheet import FakeWorksheet
+        from sheet_sync import SheetWriter
+        w = SheetWriter(FakeWorksheet([list(r) for r in self.grid]))
+        for c in range(1, len(self.new_grid[0])):
+            w.set_column(chr(65 + c), [r[c] for r in self.new_grid[1:]])
+        return w.plan()
+
+
+# ───────── timing ─────────
+def time_case(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    fn()                                     # warm imports / caches outside the timed runs
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return {"min": min(runs), "median": float(np.median(runs)), "runs": repeat}
+
+
+def run(scale: str = "small", repeat: int = 5, only: Optional[List[str]] = None, seed: int = 0) -> dict:
+    n, years = SCALES[scale]
+    t0 = time.perf_counter()
+    suite = Suite(n, years, seed)
+    setup = time.perf_counter() - t0
+    results = {}
+    for name, fn in suite.cases().items():
+        if only and name not in only:
+            continue
+        results[name] = time_case(fn, repeat)
+        print(f"  {name:<14} min {results[name]['min'] * 1000:9.2f} ms   median {results[name]['median'] * 1000:9.2f} ms")
+    return {
+        "meta": {
+            "scale": scale, "tickers": n, "years": years, "seed": seed, "setup_s": round(setup, 3),
+            "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "machine": platform.machine(), "when": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "cases": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = THRESHOLD) -> List[str]:
+    """Cases whose best time regressed past threshold (same scale only)."""
+    if baseline.get("meta", {}).get("scale") != current["meta"]["scale"]:
+        return []
+    bad = []
+    for name, res in current["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if base and res["min"] > base["min"] * (1 + threshold):
+            bad.append(f"{name}: {res['min'] * 1000:.2f} ms vs baseline {base['min'] * 1000:.2f} ms "
+                       f"(+{(res['min'] / base['min'] - 1) * 100:.0f}%)")
+    return bad
+
+
+def _dump(obj: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump(obj, fh, indent=2)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Offline benchmarks on synthetic data")
+    ap.add_argument("--scale", choices=list(SCALES), default="small")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only", nargs="+", default=None, help="subset of case names")
+    ap.add_argument("--out", default=RESULTS_PATH)
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--threshold", type=float, default=THRESHOLD)
+    ap.add_argument("--update-baseline", action="store_true")
+    args = ap.parse_args(argv)
+
+    print(f"⏱  {args.scale}: {SCALES[args.scale][0]} tickers × {SCALES[args.scale][1]}y")
+    res = run(args.scale, args.repeat, args.only)
+    _dump(res, args.out)
+    if args.update_baseline or not os.path.exists(args.baseline):
+        _dump(res, args.baseline)
+        print(f"✅ Baseline written to {args.baseline}")
+        return
+    with open(args.baseline) as fh:
+        bad = compare(res, json.load(fh), args.threshold)
+    if bad:
+        print("❌ Regressions:\n  " + "\n  ".join(bad))
+        sys.exit(1)
+    print(f"✅ No case slower than baseline by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
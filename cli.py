@@ -0,0 +1,162 @@
+# cli.py — single entry point for the Earnings Tracker jobs; heavy imports happen inside each subcommand
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+# ───────── config ─────────
+STARTUP_BUDGET = 0.5     # seconds for `cli.py <cmd> --help`, interpreter start included
+HEAVY = ("pandas", "numpy", "yfinance", "gspread", "oauth2client", "matplotlib", "requests")
+COMMANDS = ("metrics", "earnings-dates", "atm-strikes", "backtest", "signals", "alerts", "bench",
+            "montecarlo")
+
+
+# ───────── commands ─────────
+def cmd_metrics(args) -> None:
+    from metrics_engine import DEFAULT_LAYOUT, run
+    run(args.columns or DEFAULT_LAYOUT)
+
+
+def cmd_earnings_dates(args) -> None:
+    from metrics_engine import run
+    run(["D"])
+
+
+def cmd_atm_strikes(args) -> None:
+    from metrics_engine import run
+    run(["AD"])
+
+
+def cmd_backtest(args) -> None:
+    if args.engine == "parallel":
+        import parallel_backtest
+        parallel_backtest.main(["--workers", str(args.workers)] if args.workers else [])
+    elif args.engine == "strategy":
+        import backtest052925
+        backtest052925.main(["--full"] if args.full else [])
+    elif args.engine == "updated2":
+        import main_cleaned_updated2
+        main_cleaned_updated2.main()
+    else:
+        import main_cleaned
+        main_cleaned.main()
+
+
+def cmd_signals(args) -> None:
+    # Dry run: what the alerts command would post, nothing is sent
+    from DiscordSignal import collect_alerts
+    alerts = collect_alerts(args.days)
+    for a in alerts:
+        print(a.text, end="\n\n")
+    print(f"{len(alerts)} triggered signals within {args.days}d")
+
+
+def cmd_alerts(args) -> None:
+    import DiscordSignal
+    DiscordSignal.main(args.webhook or DiscordSignal.WEBHOOK_URL)
+
+
+def cmd_bench(args) -> None:
+    import bench
+    argv = ["--scale", args.scale, "--repeat", str(args.repeat)]
+    bench.main(argv + (["--update-baseline"] if args.update_baseline else []))
+
+
+def cmd_montecarlo(args) -> None:
+    import monte_carlo
+    argv = ["--paths", str(args.paths)] + (["--workers", str(args.workers)] if args.workers else [])
+    argv += ["--input", args.input] if args.input else []
+    monte_carlo.main(argv + (["--implied"] if args.implied else []))
+
+
+def cmd_startup_check(args) -> None:
+    """Time `--help` for every subcommand in a fresh interpreter and check import hygiene."""
+    worst = 0.0
+    for cmd in ("",) + COMMANDS:
+        argv = [sys.executable, __file__] + ([cmd] if cmd else []) + ["--help"]
+        runs = []
+        for _ in range(args.runs):
+            t0 = time.perf_counter()
+            subprocess.run(argv, stdout=subprocess.DEVNULL, check=True)
+            runs.append(time.perf_counter() - t0)
+        best = min(runs)
+        worst = max(worst, best)
+        flag = "✅" if best <= args.budget else "❌"
+        print(f"{flag} {('cli ' + cmd).strip():<22} {best * 1000:7.1f} ms")
+    probe = "import sys, cli; print(','.join(m for m in %r if m in sys.modules))" % (HEAVY,)
+    leaked = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True,
+                            cwd=sys.path[0] or None).stdout.strip()
+    print(f"{'❌' if leaked else '✅'} import cli pulls in: {leaked or 'nothing heavy'}")
+    if worst > args.budget or leaked:
+        sys.exit(1)
+
+
+# ───────── parser ─────────
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="cli.py", description="Earnings Tracker jobs")
+    ap.add_argument("--report", nargs="?", const="", default=None, metavar="PATH",
+                    help="time stages and write a JSON run report (default: data/runs/<job>-<time>.json)")
+    ap.add_argument("--prom", default=None, metavar="PATH", help="also write a Prometheus textfile")
+    ap.add_argument("--provider", default=None, metavar="SPEC",
+                    help="market data: yfinance (default) or local[:path] for an on-disk universe")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("metrics", help="recompute sheet columns (default: full layout)")
+    p.add_argument("--columns", nargs="+", metavar="LETTER", help="e.g. B C Q R S")
+    p.set_defaults(func=cmd_metrics)
+
+    sub.add_parser("earnings-dates", help="column D: next earnings date").set_defaults(func=cmd_earnings_dates)
+    sub.add_parser("atm-strikes", help="column AD: ATM strike").set_defaults(func=cmd_atm_strikes)
+
+    p = sub.add_parser("backtest", help="run a backtest engine")
+    p.add_argument("--engine", choices=["main", "parallel", "strategy", "updated2"], default="main",
+                   help="main=main_cleaned, parallel=process pool over main_cleaned, "
+                        "strategy=backtest052925, updated2=main_cleaned_updated2")
+    p.add_argument("--workers", type=int, default=None, help="parallel engine only")
+    p.add_argument("--full", action="store_true", help="strategy engine: recompute cached events too")
+    p.set_defaults(func=cmd_backtest)
+
+    p = sub.add_parser("signals", help="list triggered signals without sending")
+    p.add_argument("--days", type=int, default=30)
+    p.set_defaults(func=cmd_signals)
+
+    p = sub.add_parser("alerts", help="post new signals to Discord")
+    p.add_argument("--webhook", default=None, help="override DISCORD_WEBHOOK_URL")
+    p.set_defaults(func=cmd_alerts)
+
+    p = sub.add_parser("bench", help="offline benchmarks on synthetic data, fails on baseline regression")
+    p.add_argument("--scale", choices=["tiny", "small", "medium", "large"], default="small")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--update-baseline", action="store_true")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("montecarlo", help="P/L distribution (E[P/L], POP, CVaR) per backtest setup")
+    p.add_argument("--input", default=None, help="backtest CSV (default: backtest_results.csv)")
+    p.add_argument("--paths", type=int, default=1_000_000)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--implied", action="store_true", help="implied-move lognormal only")
+    p.set_defaults(func=cmd_montecarlo)
+
+    p = sub.add_parser("startup-check", help="measure CLI startup against the budget")
+    p.add_argument("--budget", type=float, default=STARTUP_BUDGET)
+    p.add_argument("--runs", type=int, default=3)
+    p.set_defaults(func=cmd_startup_check)
+    return ap
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    if args.provider:
+        os.environ["TRACKER_PROVIDER"] = args.provider      # read by market_data.default_provider()
+    if args.report is None and args.prom is None:
+        args.func(args)
+        return
+    import instrumentation
+    with instrumentation.run(args.command, args.report or None, args.prom):
+        args.func(args)
+
+
+if __name__ == "__main__":
+    main()
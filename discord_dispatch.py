@@ -0,0 +1,288 @@
+# discord_dispatch.py — async Discord webhook alerts: packed messages, rate-limit aware, deduped via a sent ledger
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ───────── config ─────────
+CONTENT_LIMIT = 2000     # Discord hard cap on message content
+SEPARATOR = "\n\n"
+LEDGER_PATH = os.path.join("data", "alerts.db")
+MAX_IN_FLIGHT = 4
+RETRIES = 5
+TIMEOUT = 10
+RESET_SLACK = 0.05       # s past a bucket's reset before refilling it locally (clock skew vs the server)
+
+
+# ───────── alerts ─────────
+@dataclass(frozen=True)
+class Alert:
+    ticker: str
+    earnings: str
+    setup: str
+    text: str
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        return (self.ticker, str(self.earnings), str(self.setup))
+
+
+def pack(alerts: List[Alert], limit: int = CONTENT_LIMIT) -> List[List[Alert]]:
+    """Greedy first-fit in order: as many alerts per message as the content cap allows."""
+    chunks: List[List[Alert]] = []
+    size = 0
+    for a in alerts:
+        n = len(a.text[:limit])
+        if chunks and size + len(SEPARATOR) + n <= limit:
+            chunks[-1].append(a)
+            size += len(SEPARATOR) + n
+        else:
+            chunks.append([a])
+            size = n
+    return chunks
+
+
+def render(chunk: List[Alert], limit: int = CONTENT_LIMIT) -> str:
+    return SEPARATOR.join(a.text for a in chunk)[:limit]
+
+
+# ───────── sent ledger ─────────
+class SentLedger:
+    def __init__(self, path: str = LEDGER_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS sent (
+            ticker TEXT, earnings TEXT, setup TEXT, sent_at REAL,
+            PRIMARY KEY (ticker, earnings, setup))""")
+
+    def unsent(self, alerts: Iterable[Alert]) -> List[Alert]:
+        seen = {tuple(r) for r in self.db.execute("SELECT ticker, earnings, setup FROM sent")}
+        out, keys = [], set()
+        for a in alerts:
+            if a.key not in seen and a.key not in keys:
+                out.append(a)
+                keys.add(a.key)
+        return out
+
+    def mark(self, alerts: Iterable[Alert]) -> None:
+        now = time.time()
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO sent VALUES (?, ?, ?, ?)",
+                                [(*a.key, now) for a in alerts])
+
+
+# ───────── dispatcher ─────────
+class RateLimit:
+    """Tracks the webhook bucket from X-RateLimit-* headers; waits instead of eating 429s."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+        self.size: Optional[int] = None      # X-RateLimit-Limit; refills the bucket locally at reset
+        self.period = 0.0                    # longest Reset-After seen, i.e. the bucket window
+        self.blocked_until = 0.0     # set by 429 / global limits
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # The lock only guards the bucket check; waiting happens outside it so every sender
+        # wakes on its own and re-reads whatever a response changed in the meantime
+        while True:
+            async with self.lock:
+                now = self.clock()
+                if self.remaining is not None and self.reset_at + RESET_SLACK <= now:
+                    # Bucket has reset: refill to the last seen size so waiters don't all burst into 429s;
+                    # the next response corrects both numbers
+                    self.remaining = self.size
+                    self.reset_at = now + self.period if self.size is not None else 0.0
+                wait = self.blocked_until - now
+                if self.remaining is not None and self.remaining <= 0:
+                    wait = max(wait, self.reset_at + RESET_SLACK - now)
+                if wait <= 0:
+                    if self.remaining is not None:
+                        self.remaining -= 1
+                    return
+            await asyncio.sleep(wait)
+
+    def update(self, headers, status: int, body: str = "") -> float:
+        now = self.clock()
+        if "X-RateLimit-Limit" in headers:
+            self.size = int(headers["X-RateLimit-Limit"])
+        if "X-RateLimit-Remaining" in headers:
+            remaining = int(headers["X-RateLimit-Remaining"])
+            after = float(headers.get("X-RateLimit-Reset-After", 0))
+            same_window = self.remaining is not None and now + after <= self.reset_at + RESET_SLACK
+            # Concurrent replies land out of order; within a window the count only goes down
+            self.remaining = min(remaining, self.remaining) if same_window else remaining
+        if "X-RateLimit-Reset-After" in headers:
+            after = float(headers["X-RateLimit-Reset-After"])
+            self.reset_at = now + after
+            self.period = max(self.period, after)
+        if status != 429:
+            return 0.0
+        retry = headers.get("Retry-After")
+        try:
+            retry = float(json.loads(body).get("retry_after", retry))
+        except (ValueError, AttributeError, TypeError):
+            pass
+        retry = float(retry or 1.0)
+        self.blocked_until = max(self.blocked_until, now + retry)
+        return retry
+
+
+class Dispatcher:
+    def __init__(self, webhook_url: str, ledger: Optional[SentLedger] = None,
+                 max_in_flight: int = MAX_IN_FLIGHT, retries: int = RETRIES,
+                 session: Optional[requests.Session] = None):
+        self.url = webhook_url
+        self.ledger = ledger or SentLedger()
+        self.max_in_flight = max_in_flight
+        self.retries = retries
+        self.session = session or self._session(max_in_flight)
+        self.stats: Dict[str, int] = {"messages": 0, "alerts": 0, "skipped": 0, "rate_limited": 0, "failed": 0}
+
+    @staticmethod
+    def _session(pool: int) -> requests.Session:
+        # One keep-alive pool shared by every post (the blocking call runs off the event loop)
+        s = requests.Session()
+        s.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool))
+        s.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool))
+        return s
+
+    async def _post(self, content: str, limit: RateLimit) -> bool:
+        for _ in range(self.retries + 1):
+            await limit.acquire()
+            try:
+                resp = await asyncio.to_thread(self.session.post, self.url,
+                                               json={"content": content}, timeout=TIMEOUT)
+            except requests.RequestException as e:
+                print(f"⚠️ webhook error: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            limit.update(resp.headers, resp.status_code, resp.text)
+            if resp.status_code == 429:
+                self.stats["rate_limited"] += 1
+                continue
+            if resp.status_code >= 500:
+                await asyncio.sleep(1.0)
+                continue
+            if resp.status_code >= 400:
+                print(f"❌ Failed — Status: {resp.status_code}, Response: {resp.text}")
+                return False
+            return True
+        return False
+
+    async def send(self, alerts: List[Alert]) -> List[Alert]:
+        """Post every not-yet-sent alert; returns the alerts that went out."""
+        fresh = self.ledger.unsent(alerts)
+        self.stats["skipped"] += len(alerts) - len(fresh)
+        if not fresh:
+            return []
+        limit = RateLimit()
+        gate = asyncio.Semaphore(self.max_in_flight)
+        sent: List[Alert] = []
+
+        async def one(chunk: List[Alert]) -> None:
+            async with gate:
+                ok = await self._post(render(chunk), limit)
+            if ok:
+                self.ledger.mark(chunk)
+                sent.extend(chunk)
+                self.stats["messages"] += 1
+                self.stats["alerts"] += len(chunk)
+            else:
+                self.stats["failed"] += len(chunk)
+
+        await asyncio.gather(*(one(c) for c in pack(fresh)))
+        return sent
+
+
+def send_alerts(alerts: List[Alert], webhook_url: str, ledger: Optional[SentLedger] = None) -> List[Alert]:
+    return asyncio.run(Dispatcher(webhook_url, ledger).send(alerts))
+
+
+# ───────── mock webhook ─────────
+class MockWebhook:
+    """Local Discord-ish webhook: 204 on success, per-window bucket with real headers and 429s."""
+
+    def __init__(self, limit: int = 5, window: float = 2.0, latency: float = 0.0):
+        self.limit, self.window, self.latency = limit, window, latency
+        self.messages: List[str] = []
+        self.hits = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._used = 0
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if mock.latency:
+                    time.sleep(mock.latency)
+                status, headers, payload = mock._handle(json.loads(body or b"{}"))
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                data = json.dumps(payload).encode() if payload else b""
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if data:
+                    self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/webhook"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def _handle(self, payload: dict):
+        with self._lock:
+            self.hits += 1
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._window_start, self._used = now, 0
+            reset_after = max(self.window - (now - self._window_start), 0.0)
+            if len(payload.get("content", "")) > CONTENT_LIMIT:
+                return 400, {}, {"message": "content too long"}
+            if self._used >= self.limit:
+                self.rejected += 1
+                return 429, {"Retry-After": f"{reset_after:.3f}"}, {"retry_after": round(reset_after, 3)}
+            self._used += 1
+            self.messages.append(payload.get("content", ""))
+            return 204, {
+                "X-RateLimit-Limit": str(self.limit),
+                "X-RateLimit-Remaining": str(self.limit - self._used),
+                "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            }, None
+
+    def __enter__(self) -> "MockWebhook":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    import tempfile
+    alerts = [Alert(f"T{i:03d}", "2025-07-30", "Straddle", f"📈 `T{i:03d}` — Straddle | " + "x" * 180)
+              for i in range(200)]
+    with tempfile.TemporaryDirectory() as d, MockWebhook(limit=5, window=1.0) as hook:
+        disp = Dispatcher(hook.url, SentLedger(os.path.join(d, "ledger.db")))
+        t0 = time.perf_counter()
+        asyncio.run(disp.send(alerts))
+        first = time.perf_counter() - t0
+        asyncio.run(disp.send(alerts))
+        print(f"{len(alerts)} alerts -> {len(hook.messages)} messages in {first:.2f}s, "
+              f"{hook.rejected} 429s; rerun stats {disp.stats}")
@@ -0,0 +1,159 @@
+# earnings_cache.py — shared earnings dates: the calendar plus a per-ticker fetch ledger whose TTL shrinks toward the next report
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from earnings_calendar import EarningsCalendar, default_calendar, earnings_index, set_default
+
+# ───────── config ─────────
+LEDGER_PATH = os.path.join("data", "earnings_fetch.json")
+DEFAULT_LIMIT = 20           # rows per get_earnings_dates pull; covers the backtests' 20 and column D's 10
+QUARTER_DAYS = 91            # expected gap to the next report when no future date is listed
+HOUR, DAY = 3600.0, 86400.0
+# (days until the expected report >= k, ttl): far out the dates barely move, close in they get confirmed/shifted
+TTL_STEPS = ((45, 14 * DAY), (14, 3 * DAY), (3, DAY), (-7, 6 * HOUR))
+OVERDUE_TTL = 12 * HOUR      # expected date passed a week ago and no newer report is known yet
+UNKNOWN_TTL = 7 * DAY        # ticker has no dates from any source
+FAILED_TTL = HOUR            # last pull errored; retry soon, not every run
+
+
+# ───────── cache ─────────
+class EarningsCache:
+    """Earnings dates for the whole universe as local reads; only stale tickers go back to the provider.
+
+    Fetched dates are merged into the earnings calendar (alongside catalysts and
+    earnings_events.csv); the ledger only records when and how deep each ticker was pulled.
+    """
+
+    def __init__(self, path: str = LEDGER_PATH, calendar: Optional[EarningsCalendar] = None,
+                 scheduler=None, provider=None, clock=time.time):
+        self.path = path
+        self._calendar = calendar
+        self.scheduler = scheduler
+        self.provider = provider
+        self.clock = clock
+        self.ledger: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.ledger = json.load(f)
+
+    @property
+    def calendar(self) -> EarningsCalendar:
+        return self._calendar or default_calendar()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.ledger, f, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def _today(self, now: float) -> np.datetime64:
+        return np.datetime64(time.strftime("%Y-%m-%d", time.localtime(now)), "D")
+
+    # ---- staleness ----
+    def expected_next(self, ticker: str, today) -> Optional[np.datetime64]:
+        # Listed upcoming report, else a quarter after the last one
+        cal = self.calendar
+        nxt = cal.next_event(ticker, today)
+        if nxt is not None:
+            return nxt
+        last = cal.last_event(ticker, today)
+        return None if last is None else last + np.timedelta64(QUARTER_DAYS, "D")
+
+    def ttl(self, ticker: str, now: Optional[float] = None) -> float:
+        now = self.clock() if now is None else now
+        rec = self.ledger.get(ticker.upper())
+        if rec is not None and not rec["ok"]:
+            return FAILED_TTL
+        today = self._today(now)
+        nxt = self.expected_next(ticker, today)
+        if nxt is None:
+            return UNKNOWN_TTL
+        days = int((nxt - today).astype(int))
+        for k, ttl in TTL_STEPS:
+            if days >= k:
+                return ttl
+        return OVERDUE_TTL
+
+    def is_stale(self, ticker: str, limit: int = DEFAULT_LIMIT, now: Optional[float] = None) -> bool:
+        now = self.clock() if now is None else now
+        rec = self.ledger.get(ticker.upper())
+        if rec is None or rec["limit"] < limit:
+            return True
+        return now - rec["fetched"] >= self.ttl(ticker, now)
+
+    def stale(self, tickers: Iterable[str], limit: int = DEFAULT_LIMIT) -> List[str]:
+        now = self.clock()
+        return [t for t in dict.fromkeys(t.upper() for t in tickers) if self.is_stale(t, limit, now)]
+
+    def failed(self, ticker: str) -> bool:
+        rec = self.ledger.get(ticker.upper())
+        return rec is not None and not rec["ok"]
+
+    # ---- refresh ----
+    def refresh(self, tickers: Iterable[str], limit: int = DEFAULT_LIMIT, force: bool = False,
+                scheduler=None) -> List[str]:
+        """Pull stale tickers concurrently (scheduled, rate limited), merge, persist; returns the tickers queried."""
+        from fetch_scheduler import default_scheduler
+        from market_data import default_provider
+        from instrumentation import count, timer
+        todo = list(dict.fromkeys(t.upper() for t in tickers)) if force else self.stale(tickers, limit)
+        count("earnings_cache.hits", len(set(t.upper() for t in tickers)) - len(todo))
+        if not todo:
+            return []
+        provider = self.provider or default_provider()
+        frames = (scheduler or self.scheduler or default_scheduler()).values(
+            lambda t: provider.earnings_dates(t, limit), todo, label="earnings dates")
+        count("earnings_cache.fetched", len(todo))
+
+        now = self.clock()
+        fresh = {}
+        for t, df in zip(todo, frames):
+            self.ledger[t] = {"fetched": now, "limit": limit, "ok": df is not None}
+            if df is not None and not df.empty:
+                fresh[t] = earnings_index(df)
+        if fresh:
+            with timer("earnings_cache.merge"):
+                cal = self.calendar.merge(fresh)
+                cal.save()
+                if self._calendar is None:
+                    set_default(cal)
+                else:
+                    self._calendar = cal
+        self.save()
+        return todo
+
+    # ---- queries (local) ----
+    def past(self, ticker: str, n: int = DEFAULT_LIMIT, today=None) -> List:
+        """Up to n report dates before today, newest first, as Timestamps (the old get_earnings_dates shape)."""
+        import pandas as pd
+        today = self._today(self.clock()) if today is None else np.datetime64(pd.Timestamp(today).date(), "D")
+        dates, _ = self.calendar.events(ticker)
+        dates = dates[dates < today]
+        return [pd.Timestamp(d) for d in dates[::-1][:n]]
+
+    def upcoming(self, ticker: str, today=None) -> Optional[np.datetime64]:
+        return self.calendar.next_event(ticker, self._today(self.clock()) if today is None else today)
+
+
+_default: Optional[EarningsCache] = None
+
+
+def default_earnings() -> EarningsCache:
+    global _default
+    if _default is None:
+        _default = EarningsCache()
+    return _default
+
+
+if __name__ == "__main__":
+    import sys
+    from sheet_mirror import tracker_tickers
+    cache = default_earnings()
+    tickers = [t for t in tracker_tickers() if t]
+    queried = cache.refresh(tickers, force="--force" in sys.argv)
+    print(f"✅ {len(queried)}/{len(tickers)} tickers refreshed, {len(cache.calendar)} events -> {LEDGER_PATH}")
@@ -0,0 +1,250 @@
+# earnings_calendar.py — compact earnings calendar: sorted datetime64[D] arrays + ticker index, binary-search queries
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# ───────── config ─────────
+CALENDAR_PATH = os.path.join("data", "earnings_calendar.npz")
+CATALYSTS_PY = "earnings_calendar2.py"
+EVENTS_CSV = "earnings_events.csv"
+SAME_EVENT_DAYS = 5          # two sources' dates this close are the same report
+SOURCES = ("csv", "catalysts", "yfinance")   # later wins when two sources disagree
+
+Entry = Tuple[np.datetime64, str, int]       # (date, quarter label, bitmask of SOURCES that list it)
+
+
+def _bit(source: str) -> int:
+    return 1 << SOURCES.index(source)
+
+
+def _day(d) -> np.datetime64:
+    if not isinstance(d, (np.datetime64, str)) and callable(getattr(d, "date", None)):
+        d = d.date()
+    return np.datetime64(d, "D")
+
+
+def quarter_label(report_date) -> str:
+    # Reports cover the previous calendar quarter: 2025-04-30 -> "Q1_25", 2025-01-30 -> "Q4_24"
+    y, m = (int(x) for x in str(_day(report_date))[:7].split("-"))
+    q = (m - 1) // 3
+    year = y if q else y - 1
+    return f"Q{q or 4}_{year % 100:02d}"
+
+
+def merge_entries(known: List[Entry], new: Iterable[Entry]) -> List[Entry]:
+    """Fold new events in; a same-report clash takes the date of the highest-priority source."""
+    out = list(known)
+    for d, label, mask in new:
+        clash = [i for i, (k, _, _) in enumerate(out) if abs(int((d - k).astype(int))) <= SAME_EVENT_DAYS]
+        if not clash:
+            out.append((d, label, mask))
+            continue
+        i = clash[0]
+        k, k_label, k_mask = out[i]
+        if mask.bit_length() >= k_mask.bit_length():
+            # Keep an explicit catalysts label (some are fiscal quarters) across a date update
+            k = d
+            k_label = k_label if k_mask & _bit("catalysts") else label
+        out[i] = (k, k_label, k_mask | mask)
+    out.sort(key=lambda e: e[0])
+    return out
+
+
+# ───────── calendar ─────────
+class EarningsCalendar:
+    def __init__(self, tickers: np.ndarray, starts: np.ndarray, dates: np.ndarray,
+                 labels: np.ndarray, source: np.ndarray, stamps: Optional[Dict[str, float]] = None):
+        self.tickers = tickers            # sorted unique, U
+        self.starts = starts              # len(tickers)+1 offsets into the event arrays
+        self.dates = dates                # datetime64[D], sorted within each ticker
+        self.labels = labels
+        self.source = source              # int8 bitmask over SOURCES
+        self.stamps = stamps or {}        # source file mtimes the calendar was built from
+        owner = np.repeat(np.arange(len(tickers)), np.diff(starts))
+        order = np.argsort(dates, kind="stable")
+        self._g_dates = dates[order]      # global date-sorted view for cross-ticker windows
+        self._g_owner = owner[order]
+
+    # ---- construction ----
+    @classmethod
+    def from_entries(cls, entries: Dict[str, List[Entry]], stamps: Optional[Dict[str, float]] = None):
+        tickers = np.array(sorted(t for t, ev in entries.items() if ev), dtype="U12")
+        lens = [len(entries[t]) for t in tickers]
+        starts = np.concatenate([[0], np.cumsum(lens)]).astype(np.int64)
+        flat = [e for t in tickers for e in entries[t]]
+        dates = np.array([e[0] for e in flat], dtype="datetime64[D]")
+        labels = np.array([e[1] for e in flat], dtype="U8")
+        source = np.array([e[2] for e in flat], dtype=np.int8)
+        return cls(tickers, starts, dates, labels, source, stamps)
+
+    def entries(self) -> Dict[str, List[Entry]]:
+        return {str(t): [(self.dates[j], str(self.labels[j]), int(self.source[j]))
+                         for j in range(self.starts[i], self.starts[i + 1])]
+                for i, t in enumerate(self.tickers)}
+
+    def save(self, path: str = CALENDAR_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, tickers=self.tickers, starts=self.starts, dates=self.dates,
+                            labels=self.labels, source=self.source,
+                            stamp_keys=np.array(list(self.stamps), dtype="U64"),
+                            stamp_vals=np.array(list(self.stamps.values()), dtype=float))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = CALENDAR_PATH) -> "EarningsCalendar":
+        with np.load(path) as z:
+            stamps = dict(zip(z["stamp_keys"].tolist(), z["stamp_vals"].tolist()))
+            return cls(z["tickers"], z["starts"], z["dates"], z["labels"], z["source"], stamps)
+
+    def merge(self, by_ticker: Dict[str, Iterable], source: str = "yfinance") -> "EarningsCalendar":
+        """New calendar with a fresh pull folded in (e.g. a batch of get_earnings_dates).
+
+        Over the span the pull covers it replaces the ticker's earlier `source` dates, so a
+        projected date that moved by more than SAME_EVENT_DAYS does not linger as a phantom.
+        Older `source` history is kept, and the other sources are re-read from their files
+        (a clash may have moved their date to the fetched one).
+        """
+        bit = _bit(source)
+        ent = self.entries()
+        static = static_entries() if by_ticker else {}
+        for t, dates in by_ticker.items():
+            t = t.upper()
+            new = [(_day(d), quarter_label(d), bit) for d in dates]
+            if not new:
+                continue
+            lo = min(d for d, _, _ in new) - np.timedelta64(SAME_EVENT_DAYS, "D")
+            older = [(d, lab, bit) for d, lab, mask in ent.get(t, []) if mask & bit and d < lo]
+            base = [(d, lab, mask & ~bit) for d, lab, mask in static.get(t, []) if mask & ~bit]
+            ent[t] = merge_entries(merge_entries(base, older), new)
+        return EarningsCalendar.from_entries(ent, self.stamps)
+
+    # ---- queries ----
+    def _slice(self, ticker: str) -> slice:
+        i = int(np.searchsorted(self.tickers, ticker.upper()))
+        if i == len(self.tickers) or self.tickers[i] != ticker.upper():
+            return slice(0, 0)
+        return slice(int(self.starts[i]), int(self.starts[i + 1]))
+
+    def events(self, ticker: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(dates, labels) for one ticker, oldest first."""
+        s = self._slice(ticker)
+        return self.dates[s], self.labels[s]
+
+    def next_event(self, ticker: str, after, inclusive: bool = True) -> Optional[np.datetime64]:
+        dates = self.dates[self._slice(ticker)]
+        i = int(np.searchsorted(dates, _day(after), side="left" if inclusive else "right"))
+        return dates[i] if i < len(dates) else None
+
+    def last_event(self, ticker: str, before, inclusive: bool = False) -> Optional[np.datetime64]:
+        dates = self.dates[self._slice(ticker)]
+        i = int(np.searchsorted(dates, _day(before), side="right" if inclusive else "left"))
+        return dates[i - 1] if i > 0 else None
+
+    def within(self, date, days: int, back: int = 0) -> List[Tuple[str, np.datetime64]]:
+        """(ticker, event date) for every report in [date - back, date + days], by date."""
+        d = _day(date)
+        lo = int(np.searchsorted(self._g_dates, d - np.timedelta64(back, "D"), side="left"))
+        hi = int(np.searchsorted(self._g_dates, d + np.timedelta64(days, "D"), side="right"))
+        return [(str(self.tickers[o]), self._g_dates[k]) for k, o in zip(range(lo, hi), self._g_owner[lo:hi])]
+
+    def as_dict(self, sources: Optional[Iterable[str]] = None):
+        """Legacy catalysts shape: {ticker: {label: Timestamp}}, optionally limited to some sources."""
+        import pandas as pd
+        keep = None if sources is None else sum(_bit(s) for s in sources)
+        out = {}
+        for t, ev in self.entries().items():
+            d = {lab: pd.Timestamp(day) for day, lab, mask in sorted(ev, key=lambda e: e[0], reverse=True)
+                 if keep is None or mask & keep}
+            if d:
+                out[t] = d
+        return out
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+# ───────── sources ─────────
+def earnings_index(df) -> List:
+    # get_earnings_dates index (tz-aware timestamps) -> plain dates
+    import pandas as pd
+    return list(pd.to_datetime(df.index).tz_localize(None).normalize())
+
+
+def _stamps() -> Dict[str, float]:
+    return {p: os.path.getmtime(p) for p in (CATALYSTS_PY, EVENTS_CSV) if os.path.exists(p)}
+
+
+def static_entries() -> Dict[str, List[Entry]]:
+    """catalysts + earnings_events.csv; pandas is only imported on this (rebuild) path."""
+    import pandas as pd
+    entries: Dict[str, List[Entry]] = {}
+    if os.path.exists(EVENTS_CSV):
+        df = pd.read_csv(EVENTS_CSV)
+        for t, d in zip(df["Ticker"].str.strip().str.upper(), df["Earnings Date"]):
+            d = _day(str(d)[:10])
+            entries[t] = merge_entries(entries.get(t, []), [(d, quarter_label(d), _bit("csv"))])
+    if os.path.exists(CATALYSTS_PY):
+        from earnings_calendar2 import catalysts
+        bit = _bit("catalysts")
+        for t, evs in catalysts.items():
+            new = [(_day(v), k, bit) for k, v in evs.items()]
+            entries[t.upper()] = merge_entries(entries.get(t.upper(), []), new)
+    return entries
+
+
+def build(path: str = CALENDAR_PATH, keep_fetched: bool = True) -> EarningsCalendar:
+    entries = static_entries()
+    if keep_fetched and os.path.exists(path):
+        # Carry over yfinance pulls; they outrank the static sources
+        old = EarningsCalendar.load(path).entries()
+        for t, ev in old.items():
+            fetched = [(d, lab, _bit("yfinance")) for d, lab, mask in ev if mask & _bit("yfinance")]
+            if fetched:
+                entries[t] = merge_entries(entries.get(t, []), fetched)
+    cal = EarningsCalendar.from_entries(entries, _stamps())
+    cal.save(path)
+    return cal
+
+
+def fetch_yfinance(tickers: Iterable[str], limit: int = 12, scheduler=None,
+                   cal: Optional[EarningsCalendar] = None, force: bool = True) -> EarningsCalendar:
+    """Pull get_earnings_dates for tickers (scheduled, rate limited) and merge into the calendar.
+
+    Goes through the shared earnings cache so the per-ticker fetch ledger stays current;
+    force=False only re-queries tickers whose TTL has run out.
+    """
+    from earnings_cache import default_earnings
+    if cal is not None:
+        set_default(cal)
+    cache = default_earnings()
+    cache.refresh(tickers, limit, force=force, scheduler=scheduler)
+    return cache.calendar
+
+
+_default: Optional[EarningsCalendar] = None
+
+
+def default_calendar(path: str = CALENDAR_PATH) -> EarningsCalendar:
+    # Lazy: load the .npz once; rebuild only when a static source file changed
+    global _default
+    if _default is None:
+        cal = EarningsCalendar.load(path) if os.path.exists(path) else None
+        if cal is None or cal.stamps != _stamps():
+            cal = build(path)
+        _default = cal
+    return _default
+
+
+def set_default(cal: EarningsCalendar) -> None:
+    global _default
+    _default = cal
+
+
+if __name__ == "__main__":
+    import sys
+    cal = build()
+    if "--fetch" in sys.argv:
+        cal = fetch_yfinance(cal.tickers.tolist(), cal=cal, force="--force" in sys.argv)
+    print(f"✅ {len(cal)} events for {len(cal.tickers)} tickers -> {CALENDAR_PATH}")
@@ -0,0 +1,169 @@
+# event_features.py — event-aligned feature table: (ticker, quarter label, session offset) -> ATR14, ATR%, OHLC
+import os
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from atr_kernel import rolling_mean, true_range
+from earnings_calendar import default_calendar
+from price_store import PriceStore, default_store
+
+# ───────── config ─────────
+FEATURE_DIR = os.path.join("data", "event_features")
+WINDOW = (-30, 10)           # trading sessions around the event bar, inclusive
+ATR_WINDOW = 14
+FIELDS = ["open", "high", "low", "close", "volume", "atr14", "atr_pct"]
+VERSION = 1                  # bump when feature definitions change
+
+Events = Dict[str, Dict[str, pd.Timestamp]]
+
+
+# ───────── events ─────────
+def load_events(sources: Optional[Iterable[str]] = None) -> Events:
+    """{ticker: {label: date}} from the merged earnings calendar (catalysts, CSV, yfinance pulls)."""
+    return default_calendar().as_dict(sources)
+
+
+# ───────── signatures ─────────
+def _bars_sig(df: pd.DataFrame) -> int:
+    # Changes on new bars and on adjusted-history revisions (splits, dividends)
+    arr = df[["Open", "High", "Low", "Close"]].to_numpy(dtype=np.float64)
+    return zlib.crc32(df.index.asi8.tobytes() + np.ascontiguousarray(arr).tobytes())
+
+
+def _events_sig(events: Dict[str, pd.Timestamp], window: Tuple[int, int]) -> int:
+    key = ";".join(f"{k}={pd.Timestamp(v).date()}" for k, v in sorted(events.items()))
+    return zlib.crc32(f"v{VERSION}|{window}|{key}".encode())
+
+
+# ───────── builder ─────────
+def build_ticker(bars: pd.DataFrame, events: Dict[str, pd.Timestamp],
+                 window: Tuple[int, int] = WINDOW) -> Dict[str, np.ndarray]:
+    """Every event × offset for one ticker in one gather; rows without a bar are dropped.
+
+    The event bar is the first session on/after the report date (offset 0);
+    events with no such bar yet (upcoming reports) are left out.
+    """
+    offsets = np.arange(window[0], window[1] + 1)
+    labels = np.array(sorted(events, key=lambda k: events[k]), dtype=object)
+    ev_dates = np.array([events[k] for k in labels], dtype="datetime64[ns]")
+    dates = bars.index.values
+    anchor = np.searchsorted(dates, ev_dates, side="left")
+    has_bar = anchor < len(dates)
+    labels, ev_dates, anchor = labels[has_bar], ev_dates[has_bar], anchor[has_bar]
+
+    h, l, c = (bars[k].to_numpy(dtype=float) for k in ("High", "Low", "Close"))
+    atr = rolling_mean(true_range(h, l, c), ATR_WINDOW)[:, 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        atr_pct = atr / c
+    cols = {
+        "open": bars["Open"].to_numpy(dtype=float), "high": h, "low": l, "close": c,
+        "volume": bars["Volume"].to_numpy(dtype=float), "atr14": atr, "atr_pct": atr_pct,
+    }
+
+    pos = anchor[:, None] + offsets[None, :]                    # (events, offsets)
+    ok = (pos >= 0) & (pos < len(dates))
+    ev_idx, off_idx = np.nonzero(ok)
+    p = pos[ok]
+    out = {
+        "label": labels[ev_idx].astype(str),
+        "event_date": ev_dates[ev_idx],
+        "offset": offsets[off_idx].astype(np.int16),
+        "date": dates[p],
+    }
+    out.update({f: cols[f][p] for f in FIELDS})
+    return out
+
+
+class EventFeatureStore:
+    """One .npz per ticker, rebuilt only when that ticker's bars or events change."""
+
+    def __init__(self, root: str = FEATURE_DIR, store: Optional[PriceStore] = None,
+                 window: Tuple[int, int] = WINDOW, adjusted: bool = True):
+        self.root = root
+        self.store = store or default_store()
+        self.window = window
+        self.adjusted = adjusted
+        self.rebuilt: List[str] = []
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker.upper()}.npz")
+
+    def _sig(self, ticker: str):
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as z:
+            return int(z["bars_sig"]), int(z["events_sig"]), bool(z["adjusted"])
+
+    def build(self, events: Optional[Events] = None, tickers: Optional[Iterable[str]] = None,
+              fetch: bool = False) -> List[str]:
+        """Refresh stale tickers; returns the tickers that were rebuilt."""
+        events = load_events() if events is None else events
+        tickers = list(tickers) if tickers is not None else sorted(events)
+        if fetch:
+            first = min((min(ev.values()) for t, ev in events.items() if t in tickers and ev), default=None)
+            if first is not None:
+                start = first - pd.Timedelta(days=2 * abs(self.window[0]) + 3 * ATR_WINDOW)
+                self.store.ensure_many(tickers, start)
+        self.rebuilt = []
+        for t in tickers:
+            evs = events.get(t, {})
+            bars = self.store.get(t, adjusted=self.adjusted, fetch=False)
+            sig = (_bars_sig(bars), _events_sig(evs, self.window), self.adjusted)
+            if self._sig(t) == sig:
+                continue
+            cols = build_ticker(bars, evs, self.window)
+            tmp = self._path(t) + ".tmp.npz"
+            np.savez_compressed(
+                tmp, bars_sig=np.int64(sig[0]), events_sig=np.int64(sig[1]), adjusted=sig[2],
+                **{k: (v.astype("U16") if k == "label" else v) for k, v in cols.items()})
+            os.replace(tmp, self._path(t))
+            self.rebuilt.append(t)
+        return self.rebuilt
+
+    # ---- reads ----
+    def load(self, ticker: str) -> pd.DataFrame:
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=["ticker", "label", "event_date", "offset", "date"] + FIELDS)
+        with np.load(path, allow_pickle=False) as z:
+            df = pd.DataFrame({k: z[k] for k in ["label", "event_date", "offset", "date"] + FIELDS})
+        df.insert(0, "ticker", ticker.upper())
+        return df
+
+    def table(self, tickers: Iterable[str]) -> pd.DataFrame:
+        """Long table indexed by (ticker, label, offset)."""
+        frames = [self.load(t) for t in tickers]
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return pd.DataFrame(columns=["event_date", "date"] + FIELDS)
+        return pd.concat(frames, ignore_index=True).set_index(["ticker", "label", "offset"]).sort_index()
+
+    def at(self, tickers: Iterable[str], offset: int, fields: Optional[List[str]] = None) -> pd.DataFrame:
+        # One row per event: the features `offset` sessions from the event bar (e.g. -20 entry, +1 exit)
+        tbl = self.table(tickers)
+        if tbl.empty:
+            return tbl
+        rows = tbl.xs(offset, level="offset")
+        return rows[["event_date", "date"] + (fields or FIELDS)]
+
+
+_default: Optional[EventFeatureStore] = None
+
+
+def default_features() -> EventFeatureStore:
+    global _default
+    if _default is None:
+        _default = EventFeatureStore()
+    return _default
+
+
+if __name__ == "__main__":
+    fs = default_features()
+    evs = load_events()
+    rebuilt = fs.build(evs, fetch=True)
+    print(f"✅ Event features: {len(rebuilt)} of {len(evs)} tickers rebuilt in {fs.root}")
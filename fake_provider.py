@@ -0,0 +1,160 @@
+# fake_provider.py — deterministic offline stand-in for the yfinance calls (load tests, no network)
+import threading
+import time
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from market_data import Chain, MarketDataProvider
+
+EPOCH = "2000-01-03"
+
+
+class FakeRateLimitError(Exception):
+    def __init__(self, msg: str = "429 Too Many Requests"):
+        super().__init__(msg)
+
+
+def fake_universe(n: int) -> List[str]:
+    # AAAA, AAAB, ... — valid-looking, unique, stable
+    out = []
+    for i in range(n):
+        s, k = "", i
+        for _ in range(4):
+            k, r = divmod(k, 26)
+            s = chr(65 + r) + s
+        out.append(s)
+    return out
+
+
+@lru_cache(maxsize=4)
+def _calendar(today: pd.Timestamp) -> pd.DatetimeIndex:
+    # Shared by every ticker; building it is the slow part of a fresh path
+    return pd.bdate_range(EPOCH, today)
+
+
+def _seed(ticker: str, salt: int = 0) -> int:
+    return zlib.crc32(ticker.encode()) ^ salt
+
+
+class FakeProvider(MarketDataProvider):
+    """Random-walk bars, chains and earnings dates that are identical on every run.
+
+    Every call goes through _hit(), so latency and injected 429s/errors apply per
+    ticker (bulk calls included) the way they would against the live API.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, rate_limit_rate: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._paths: Dict[str, pd.DataFrame] = {}
+        self._rng = np.random.default_rng(seed)
+
+    def _hit(self) -> None:
+        with self._lock:
+            self.calls += 1
+            roll = self._rng.random()
+        if self.latency:
+            time.sleep(self.latency)
+        if roll < self.rate_limit_rate:
+            raise FakeRateLimitError()
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise ValueError("fake provider error")
+
+    def _path(self, ticker: str) -> pd.DataFrame:
+        df = self._paths.get(ticker)
+        if df is not None:
+            return df
+        rng = np.random.default_rng(_seed(ticker, self.seed))
+        idx = _calendar(pd.Timestamp.today().normalize())
+        n = len(idx)
+        vol = rng.uniform(0.01, 0.035)
+        close = rng.uniform(20, 400) * np.exp(np.cumsum(rng.normal(0.0002, vol, n)))
+        gap = rng.normal(0, vol / 2, n)
+        open_ = close * np.exp(gap)
+        span = np.abs(rng.normal(0, vol, n)) * close
+        high = np.maximum(open_, close) + span / 2
+        low = np.minimum(open_, close) - span / 2
+        df = pd.DataFrame({
+            "Open": open_, "High": high, "Low": low, "Close": close,
+            "Adj Close": close, "Volume": rng.integers(1e5, 5e7, n).astype(float),
+        }, index=idx)
+        self._paths[ticker] = df
+        return df
+
+    # ---- price bars ----
+    def download(self, ticker: str, start, end) -> pd.DataFrame:
+        self._hit()
+        df = self._path(ticker)
+        return df.loc[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))].copy()
+
+    # ---- options ----
+    def options(self, ticker: str, as_of: Optional[pd.Timestamp] = None) -> Tuple[str, ...]:
+        self._hit()
+        as_of = (as_of or pd.Timestamp.today()).normalize()
+        fridays = pd.date_range(as_of + pd.Timedelta(days=1), periods=8, freq="W-FRI")
+        return tuple(d.date().isoformat() for d in fridays)
+
+    def option_chain(self, ticker: str, expiry: str, as_of: Optional[pd.Timestamp] = None) -> Chain:
+        self._hit()
+        as_of = (as_of or pd.Timestamp.today()).normalize()
+        path = self._path(ticker)
+        spot = float(path["Close"].loc[:as_of].iloc[-1])
+        rng = np.random.default_rng(_seed(ticker + expiry, self.seed))
+        step = 1.0 if spot < 50 else 2.5 if spot < 200 else 5.0
+        strikes = np.round(spot / step) * step + step * np.arange(-10, 11)
+        base_iv = rng.uniform(0.2, 0.6)
+        smile = base_iv * (1 + 0.5 * ((strikes - spot) / spot) ** 2)
+
+        def side(skew: float) -> pd.DataFrame:
+            return pd.DataFrame({
+                "strike": strikes,
+                "impliedVolatility": smile * (1 + skew),
+                "bid": np.nan, "ask": np.nan, "lastPrice": np.nan,
+            })
+        return Chain(side(0.0), side(0.03), expiry)
+
+    # ---- calendar ----
+    def earnings_dates(self, ticker: str, limit: int = 12) -> pd.DataFrame:
+        self._hit()
+        rng = np.random.default_rng(_seed(ticker, self.seed + 1))
+        offset = int(rng.integers(0, 91))
+        today = pd.Timestamp.today().normalize()
+        first = pd.Timestamp(EPOCH) + pd.Timedelta(days=offset)
+        quarters = pd.date_range(first, today + pd.Timedelta(days=200), freq="91D")
+        idx = pd.DatetimeIndex(quarters[-limit:]).tz_localize("America/New_York")
+        return pd.DataFrame({"EPS Estimate": np.nan, "Reported EPS": np.nan}, index=idx[::-1])
+
+    # ---- bulk (one simulated request per ticker) ----
+    def history(self, tickers, start, end):
+        # Any failure fails the whole batch, like a throttled multi-ticker download
+        return {t: self.download(t, start, end) for t in tickers}
+
+    def expiries(self, tickers):
+        return _loop(tickers, self.options)
+
+    def chains(self, requests):
+        return _loop(requests, lambda k: self.option_chain(*k))
+
+    def earnings(self, tickers, limit=12):
+        return _loop(tickers, lambda t: self.earnings_dates(t, limit))
+
+
+def _loop(keys, fn) -> dict:
+    out = {}
+    for k in keys:
+        try:
+            out[k] = fn(k)
+        except Exception:
+            pass
+    return out
@@ -0,0 +1,164 @@
+# fake_worksheet.py — in-memory stand-in for the gspread Worksheet calls these jobs make
+import time
+from typing import Any, Dict, List, Optional
+
+from sheets import a1_to_rc, col_letter
+
+
+class FakeAPIError(Exception):
+    def __init__(self, code: int = 429, msg: str = "Quota exceeded"):
+        super().__init__(f"APIError: [{code}]: {msg}")
+        self.code = code
+
+
+class Cell:
+    def __init__(self, row: int, col: int, value: Any):
+        self.row, self.col, self.value = row, col, value
+
+
+class FakeWorksheet:
+    """Grid of cell values plus request accounting; optional per-minute write quota."""
+
+    def __init__(self, rows: Optional[List[List[Any]]] = None, row_count: int = 1000,
+                 col_count: int = 26, write_quota: Optional[int] = None,
+                 clock=time.monotonic, title: str = "Sheet1"):
+        self.grid: Dict[tuple, Any] = {}
+        for r, row in enumerate(rows or [], start=1):
+            for c, v in enumerate(row, start=1):
+                if v != "":
+                    self.grid[(r, c)] = v
+        self.row_count = max(row_count, len(rows or []))
+        self.col_count = max([col_count] + [len(r) for r in rows or []])
+        self.title = title
+        self.write_quota = write_quota
+        self.clock = clock
+        self.requests = 0
+        self.read_requests = 0
+        self.write_requests = 0
+        self.cells_written = 0
+        self._writes: List[float] = []
+        self.revision = 0
+        self.spreadsheet = self               # revision lookups go through .spreadsheet like gspread
+
+    # ---- accounting ----
+    def _read(self) -> None:
+        self.requests += 1
+        self.read_requests += 1
+
+    def _write(self, n_cells: int) -> None:
+        now = self.clock()
+        if self.write_quota is not None:
+            self._writes = [t for t in self._writes if now - t < 60]
+            if len(self._writes) >= self.write_quota:
+                self.requests += 1
+                raise FakeAPIError(429, "Quota exceeded for 'Write requests per minute per user'")
+            self._writes.append(now)
+        self.requests += 1
+        self.write_requests += 1
+        self.cells_written += n_cells
+
+    def get_lastUpdateTime(self) -> str:
+        self._read()
+        return f"rev-{self.revision}"
+
+    def _bounds(self):
+        if not self.grid:
+            return 0, 0
+        return max(r for r, _ in self.grid), max(c for _, c in self.grid)
+
+    def _set(self, r: int, c: int, v: Any) -> None:
+        self.revision += 1
+        if v in ("", None):
+            self.grid.pop((r, c), None)
+        else:
+            self.grid[(r, c)] = v
+
+    def _range(self, a1: str):
+        a1 = a1.split("!")[-1]
+        start, _, end = a1.partition(":")
+        r0, c0 = a1_to_rc(start)
+        r1, c1 = a1_to_rc(end) if end else (r0, c0)
+        return r0, c0, r1, c1
+
+    # ---- reads ----
+    def get_all_values(self, **kwargs) -> List[List[Any]]:
+        self._read()
+        nr, nc = self._bounds()
+        return [[self.grid.get((r, c), "") for c in range(1, nc + 1)] for r in range(1, nr + 1)]
+
+    def get_all_records(self, **kwargs) -> List[Dict[str, Any]]:
+        values = self.get_all_values()
+        if not values:
+            return []
+        header = values[0]
+        return [dict(zip(header, row)) for row in values[1:]]
+
+    def col_values(self, col: int, **kwargs) -> List[Any]:
+        self._read()
+        nr, _ = self._bounds()
+        vals = [self.grid.get((r, col), "") for r in range(1, nr + 1)]
+        while vals and vals[-1] == "":
+            vals.pop()
+        return vals
+
+    def row_values(self, row: int, **kwargs) -> List[Any]:
+        self._read()
+        _, nc = self._bounds()
+        vals = [self.grid.get((row, c), "") for c in range(1, nc + 1)]
+        while vals and vals[-1] == "":
+            vals.pop()
+        return vals
+
+    def range(self, a1: str) -> List[Cell]:
+        self._read()
+        r0, c0, r1, c1 = self._range(a1)
+        return [Cell(r, c, self.grid.get((r, c), "")) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)]
+
+    # ---- writes ----
+    def _write_block(self, a1: str, values: List[List[Any]]) -> int:
+        r0, c0, _, _ = self._range(a1)
+        n = 0
+        for i, row in enumerate(values):
+            for j, v in enumerate(row):
+                self._set(r0 + i, c0 + j, v)
+                n += 1
+        return n
+
+    def batch_update(self, data: List[Dict[str, Any]], **kwargs) -> dict:
+        self._write(sum(len(row) for d in data for row in d["values"]))
+        for d in data:
+            self._write_block(d["range"], d["values"])
+        return {"totalUpdatedCells": self.cells_written}
+
+    def update(self, *args, range_name: Optional[str] = None, values=None, **kwargs) -> dict:
+        # Accepts both update(range, values) and update(values, range_name=...)
+        for a in args:
+            if isinstance(a, str):
+                range_name = a
+            else:
+                values = a
+        values = values if isinstance(values[0], list) else [values]
+        self._write(sum(len(r) for r in values))
+        self._write_block(range_name, values)
+        return {"updatedRange": range_name}
+
+    def update_cell(self, row: int, col: int, value: Any) -> dict:
+        self._write(1)
+        self._set(row, col, value)
+        return {"updatedRange": f"{col_letter(col)}{row}"}
+
+    def update_cells(self, cells, **kwargs) -> dict:
+        cells = list(cells)
+        self._write(len(cells))
+        for cell in cells:
+            self._set(cell.row, cell.col, cell.value)
+        return {"updatedCells": len(cells)}
+
+    def resize(self, rows: Optional[int] = None, cols: Optional[int] = None) -> None:
+        self._write(0)
+        if rows is not None:
+            self.row_count = rows
+            self.grid = {k: v for k, v in self.grid.items() if k[0] <= rows}
+        if cols is not None:
+            self.col_count = cols
+            self.grid = {k: v for k, v in self.grid.items() if k[1] <= cols}
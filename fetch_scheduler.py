@@ -0,0 +1,170 @@
+# fetch_scheduler.py — bounded, rate-limited, retrying fan-out for per-ticker network calls
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional
+
+from instrumentation import count, timer
+
+# ───────── config ─────────
+MAX_WORKERS = 8
+RATE_PER_SEC = 4.0       # sustained requests/second across all workers
+BURST = 8
+RETRIES = 4
+BACKOFF_BASE = 0.5       # seconds; doubles per attempt, full jitter
+BACKOFF_CAP = 30.0
+
+RETRYABLE_NAMES = {"YFRateLimitError", "Timeout", "ReadTimeout", "ConnectTimeout",
+                   "ConnectionError", "TimeoutError", "FakeRateLimitError", "DownloadError"}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in RETRYABLE_NAMES for cls in type(exc).__mro__):
+        return True
+    msg = str(exc).lower()
+    return "429" in msg or "too many requests" in msg or "rate limit" in msg or "timed out" in msg
+
+
+# ───────── rate limiter ─────────
+class TokenBucket:
+    def __init__(self, rate: float = RATE_PER_SEC, burst: int = BURST,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+# ───────── scheduler ─────────
+@dataclass
+class FetchResult:
+    key: Any
+    value: Any = None
+    error: Optional[BaseException] = None
+    attempts: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class FetchScheduler:
+    """Runs fn(key) for many keys on a thread pool; results come back in input order."""
+
+    def __init__(self, max_workers: int = MAX_WORKERS, rate: float = RATE_PER_SEC, burst: int = BURST,
+                 retries: int = RETRIES, backoff: float = BACKOFF_BASE, backoff_cap: float = BACKOFF_CAP,
+                 sleep: Callable[[float], None] = time.sleep, seed: Optional[int] = None):
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate, burst, sleep=sleep)
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_cap = backoff_cap
+        self.sleep = sleep
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def _delay(self, attempt: int) -> float:
+        with self._rng_lock:
+            return self._rng.uniform(0, min(self.backoff_cap, self.backoff * 2 ** attempt))
+
+    def _call(self, fn: Callable[[Any], Any], key: Any) -> FetchResult:
+        res = FetchResult(key)
+        start = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            res.attempts = attempt + 1
+            try:
+                res.value = fn(key)
+                res.error = None
+                break
+            except Exception as e:
+                res.error = e
+                if attempt == self.retries or not is_retryable(e):
+                    count("fetch.errors")
+                    break
+                count("fetch.retries")
+                self.sleep(self._delay(attempt))
+        res.elapsed = time.perf_counter() - start
+        return res
+
+    def map(self, fn: Callable[[Any], Any], keys: Iterable[Any]) -> List[FetchResult]:
+        keys = list(keys)
+        if not keys:
+            return []
+        workers = max(1, min(self.max_workers, len(keys)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda k: self._call(fn, k), keys))
+
+    def values(self, fn: Callable[[Any], Any], keys: Iterable[Any], default: Any = None,
+               label: str = "fetch") -> List[Any]:
+        out = []
+        with timer(f"fetch.{label}"):
+            results = self.map(fn, keys)
+        for r in results:
+            if not r.ok:
+                print(f"{r.key} error ({label}): {r.error}")
+            out.append(r.value if r.ok else default)
+        return out
+
+
+_default_scheduler: Optional[FetchScheduler] = None
+
+
+def default_scheduler() -> FetchScheduler:
+    global _default_scheduler
+    if _default_scheduler is None:
+        _default_scheduler = FetchScheduler()
+    return _default_scheduler
+
+
+# ───────── offline load test ─────────
+def load_test(n_tickers: int = 1000, workers: int = 32, rate: float = 0.0,
+              rate_limit_rate: float = 0.02, latency: float = 0.005) -> dict:
+    import pandas as pd
+    from fake_provider import FakeProvider, fake_universe
+
+    provider = FakeProvider(latency=latency, rate_limit_rate=rate_limit_rate, seed=7)
+    tickers = fake_universe(n_tickers)
+    end = pd.Timestamp.today().normalize()
+    start = end - pd.DateOffset(years=1)
+    sched = FetchScheduler(max_workers=workers, rate=rate, backoff=0.01, backoff_cap=0.1, seed=7)
+
+    t0 = time.perf_counter()
+    results = sched.map(lambda t: provider.download(t, start, end), tickers)
+    wall = time.perf_counter() - t0
+    assert [r.key for r in results] == tickers
+    return {
+        "tickers": n_tickers,
+        "workers": workers,
+        "wall_s": round(wall, 3),
+        "tickers_per_s": round(n_tickers / wall, 1),
+        "failed": sum(not r.ok for r in results),
+        "retried": sum(r.attempts > 1 for r in results),
+        "provider_calls": provider.calls,
+    }
+
+
+if __name__ == "__main__":
+    print(load_test())
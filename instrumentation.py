@@ -0,0 +1,231 @@
+# instrumentation.py — per-stage timers and I/O counters; JSON run report + Prometheus textfile, no-op when off
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# ───────── config ─────────
+RUNS_DIR = os.path.join("data", "runs")
+ENV_ENABLE = "TRACKER_INSTRUMENT"      # "1" turns timers on for plain `python script.py` runs
+ENV_PROM = "TRACKER_PROM_FILE"         # node_exporter textfile path, optional
+PROM_PREFIX = "tracker"
+
+_enabled = os.environ.get(ENV_ENABLE, "") not in ("", "0")
+
+
+# ───────── registry ─────────
+class _Null:
+    # Shared do-nothing context manager handed out while disabled
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _Null()
+
+
+class Registry:
+    """Thread-safe timer totals and counters for one run."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timers: Dict[str, list] = {}      # name -> [calls, total_s, max_s]
+        self.counters: Dict[str, float] = {}
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self.lock:
+            t = self.timers.get(name)
+            if t is None:
+                self.timers[name] = [1, seconds, seconds]
+            else:
+                t[0] += 1
+                t[1] += seconds
+                t[2] = max(t[2], seconds)
+
+    def add(self, name: str, n: float = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            timers = {k: {"calls": c, "total_s": round(s, 6), "max_s": round(m, 6), "mean_s": round(s / c, 6)}
+                      for k, (c, s, m) in sorted(self.timers.items())}
+            return {"timers": timers, "counters": dict(sorted(self.counters.items()))}
+
+    def reset(self) -> None:
+        with self.lock:
+            self.timers.clear()
+            self.counters.clear()
+
+
+registry = Registry()
+
+
+class _Timer:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.add_time(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+# ───────── api ─────────
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True) -> None:
+    global _enabled
+    _enabled = on
+
+
+def timer(name: str):
+    """`with timer("net.prices"):` — wall time per stage; a shared no-op when disabled."""
+    return _Timer(name) if _enabled else _NULL
+
+
+def timed(name: Optional[str] = None):
+    # Decorator form of timer(); the disabled path is one global read
+    def deco(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                registry.add_time(label, time.perf_counter() - t0)
+        return wrapper
+    return deco
+
+
+def count(name: str, n: float = 1) -> None:
+    """Counters: network calls, bytes, cache hits/misses, retries, rows written."""
+    if _enabled:
+        registry.add(name, n)
+
+
+def frame_bytes(obj) -> int:
+    # In-memory size of a fetched payload (DataFrame / tuple of frames); wire bytes aren't visible through yfinance
+    if obj is None:
+        return 0
+    if isinstance(obj, (tuple, list)):
+        return sum(frame_bytes(o) for o in obj)
+    usage = getattr(obj, "memory_usage", None)
+    return int(usage(index=True).sum()) if callable(usage) else 0
+
+
+# ───────── reports ─────────
+def report(job: str, wall: float, ok: bool, started: float) -> dict:
+    return {"job": job, "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+            "wall_s": round(wall, 6), "ok": ok, "pid": os.getpid(), **registry.snapshot()}
+
+
+def write_json(rep: dict, path: Optional[str] = None) -> str:
+    path = path or os.path.join(RUNS_DIR, f"{rep['job']}-{rep['started'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump(rep, fh, indent=2)
+    return path
+
+
+def _esc(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def prometheus_text(rep: dict) -> str:
+    job = _esc(rep["job"])
+    p = PROM_PREFIX
+    lines = [
+        f"# HELP {p}_run_seconds Wall time of the last run.",
+        f"# TYPE {p}_run_seconds gauge",
+        f'{p}_run_seconds{{job="{job}"}} {rep["wall_s"]}',
+        f"# HELP {p}_run_success 1 if the last run finished without an exception.",
+        f"# TYPE {p}_run_success gauge",
+        f'{p}_run_success{{job="{job}"}} {int(rep["ok"])}',
+        f"# HELP {p}_run_timestamp_seconds Unix time the last run finished.",
+        f"# TYPE {p}_run_timestamp_seconds gauge",
+        f'{p}_run_timestamp_seconds{{job="{job}"}} {int(time.time())}',
+        f"# HELP {p}_stage_seconds Time spent per stage in the last run.",
+        f"# TYPE {p}_stage_seconds gauge",
+    ]
+    lines += [f'{p}_stage_seconds{{job="{job}",stage="{_esc(k)}"}} {v["total_s"]}' for k, v in rep["timers"].items()]
+    lines += [f"# HELP {p}_stage_calls Calls per stage in the last run.", f"# TYPE {p}_stage_calls gauge"]
+    lines += [f'{p}_stage_calls{{job="{job}",stage="{_esc(k)}"}} {v["calls"]}' for k, v in rep["timers"].items()]
+    lines += [f"# HELP {p}_events Counters (calls, bytes, hits, retries, rows) in the last run.",
+              f"# TYPE {p}_events gauge"]
+    lines += [f'{p}_events{{job="{job}",name="{_esc(k)}"}} {v}' for k, v in rep["counters"].items()]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(rep: dict, path: str) -> None:
+    # Atomic replace so the textfile collector never reads half a file
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fh:
+        fh.write(prometheus_text(rep))
+    os.replace(tmp, path)
+
+
+@contextmanager
+def run(job: str, report_path: Optional[str] = None, prom_path: Optional[str] = None, quiet: bool = False):
+    """Instrument one job: enable, reset, time the whole block, then write the reports."""
+    prev = _enabled
+    enable(True)
+    registry.reset()
+    started, t0, ok = time.time(), time.perf_counter(), False
+    try:
+        yield registry
+        ok = True
+    finally:
+        rep = report(job, time.perf_counter() - t0, ok, started)
+        path = write_json(rep, report_path)
+        prom_path = prom_path or os.environ.get(ENV_PROM)
+        if prom_path:
+            write_prometheus(rep, prom_path)
+        enable(prev)
+        if not quiet:
+            print(summary(rep))
+            print(f"Run report: {path}")
+
+
+def _report_at_exit(started: float, t0: float) -> None:
+    # TRACKER_INSTRUMENT=1 on a plain script run: one report for the whole process
+    if registry.timers or registry.counters:
+        job = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+        rep = report(job, time.perf_counter() - t0, True, started)
+        write_json(rep)
+        if os.environ.get(ENV_PROM):
+            write_prometheus(rep, os.environ[ENV_PROM])
+
+
+if _enabled:
+    atexit.register(_report_at_exit, time.time(), time.perf_counter())
+
+
+def summary(rep: dict, top: int = 8) -> str:
+    stages = sorted(rep["timers"].items(), key=lambda kv: -kv[1]["total_s"])[:top]
+    lines = [f"⏱  {rep['job']}: {rep['wall_s']:.2f}s"]
+    lines += [f"   {k:<28} {v['total_s']:8.3f}s  ×{v['calls']}" for k, v in stages]
+    if rep["counters"]:
+        lines.append("   " + ", ".join(f"{k}={v:g}" for k, v in rep["counters"].items()))
+    return "\n".join(lines)
@@ -0,0 +1,259 @@
+# iv_archive.py — append-only daily ATM IV archive with O(1) IV rank / percentile queries
+import csv
+import gzip
+import io
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# ───────── config ─────────
+ARCHIVE_DIR = os.path.join("data", "iv_archive")
+FIELDS = ["date", "expiry", "dte", "spot", "strike", "call_iv", "put_iv"]
+TARGET_DTE = 30          # constant-maturity point the daily series tracks
+MIN_DTE = 7              # skip expiries that are about to roll off
+MAX_EXPIRIES = 6         # expiries captured per snapshot
+DEFAULT_LOOKBACK = 252
+MIN_HISTORY = 20         # observations needed before a rank means anything
+STALE_DAYS = 5           # as-of reach for a query date past the last snapshot
+
+
+# ───────── index ─────────
+@dataclass
+class RollingIndex:
+    first_day: np.datetime64       # calendar day of day_pos[0]
+    day_pos: np.ndarray            # calendar-day offset -> last row on or before it
+    dates: np.ndarray              # datetime64[D], one row per snapshot day
+    iv: np.ndarray                 # ATM IV at TARGET_DTE
+    lo: np.ndarray                 # rolling min over the look-back
+    hi: np.ndarray                 # rolling max over the look-back
+    pct: np.ndarray                # share of the look-back strictly below today
+
+    def row(self, date) -> int:
+        day = np.datetime64(pd.Timestamp(date).date(), "D")
+        off = int((day - self.first_day).astype(int))
+        if off < 0 or not len(self.dates):
+            return -1
+        r = int(self.day_pos[min(off, len(self.day_pos) - 1)])
+        return r if (day - self.dates[r]).astype(int) <= STALE_DAYS else -1
+
+
+def _rolling_index(dates: np.ndarray, iv: np.ndarray, lookback: int) -> RollingIndex:
+    s = pd.Series(iv)
+    lo = s.rolling(lookback, min_periods=MIN_HISTORY).min().to_numpy()
+    hi = s.rolling(lookback, min_periods=MIN_HISTORY).max().to_numpy()
+
+    pad = np.concatenate([np.full(lookback, np.nan), iv])   # one spare slot so an empty archive still windows
+    win = np.lib.stride_tricks.sliding_window_view(pad, lookback)[1:]
+    valid = ~np.isnan(win)
+    below = (win < iv[:, None]) & valid
+    n_valid = valid.sum(axis=1)
+    pct = np.where(n_valid >= MIN_HISTORY, below.sum(axis=1) / np.maximum(n_valid, 1), np.nan)
+
+    first = dates[0] if len(dates) else np.datetime64("1970-01-01", "D")
+    span = int((dates[-1] - first).astype(int)) + 1 if len(dates) else 0
+    offsets = (dates - first).astype(int)
+    day_pos = np.full(span, -1, dtype=np.int32)
+    day_pos[offsets] = np.arange(len(dates), dtype=np.int32)
+    day_pos = np.maximum.accumulate(day_pos) if span else day_pos
+    return RollingIndex(first, day_pos, dates, iv, lo, hi, pct)
+
+
+# ───────── archive ─────────
+class IVArchive:
+    """Per-ticker gzip CSV; each snapshot appends one gzip member, nothing is rewritten."""
+
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = root
+        self._index: Dict[tuple, RollingIndex] = {}
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker.upper()}.csv.gz")
+
+    def _idx_path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker.upper()}.idx.npz")
+
+    def _signature(self, ticker: str) -> int:
+        path = self._path(ticker)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    # ---- writes ----
+    def append(self, ticker: str, rows: List[dict]) -> None:
+        if not rows:
+            return
+        path = self._path(ticker)
+        new = not os.path.exists(path)
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=FIELDS)
+        if new:
+            writer.writeheader()
+        writer.writerows(rows)
+        with gzip.open(path, "at", newline="") as fh:
+            fh.write(buf.getvalue())
+        for key in [k for k in self._index if k[0] == ticker]:
+            del self._index[key]
+
+    # ---- reads ----
+    def load(self, ticker: str) -> pd.DataFrame:
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=FIELDS)
+        df = pd.read_csv(path, compression="gzip", parse_dates=["date", "expiry"])
+        return df.drop_duplicates(["date", "expiry"], keep="last").sort_values(["date", "expiry"])
+
+    def daily_series(self, ticker: str) -> pd.Series:
+        # One ATM IV per day: the expiry closest to TARGET_DTE, call/put averaged
+        df = self.load(ticker)
+        if df.empty:
+            return pd.Series(dtype=float)
+        df = df.loc[df["dte"] >= MIN_DTE].copy()
+        df["atm_iv"] = df[["call_iv", "put_iv"]].mean(axis=1)
+        df = df.dropna(subset=["atm_iv"]).loc[lambda d: d["atm_iv"] > 0]
+        df["gap"] = (df["dte"] - TARGET_DTE).abs()
+        best = df.sort_values(["date", "gap"]).drop_duplicates("date", keep="first")
+        return best.set_index("date")["atm_iv"].sort_index()
+
+    def index(self, ticker: str, lookback: int = DEFAULT_LOOKBACK) -> RollingIndex:
+        key = (ticker, lookback)
+        if key in self._index:
+            return self._index[key]
+        sig = self._signature(ticker)
+        idx = self._read_index(ticker, lookback, sig)
+        if idx is None:
+            s = self.daily_series(ticker)
+            dates = s.index.values.astype("datetime64[D]")
+            idx = _rolling_index(dates, s.to_numpy(dtype=float), lookback)
+            if lookback == DEFAULT_LOOKBACK:
+                self._write_index(ticker, idx, sig)
+        self._index[key] = idx
+        return idx
+
+    def _read_index(self, ticker: str, lookback: int, sig: int) -> Optional[RollingIndex]:
+        path = self._idx_path(ticker)
+        if lookback != DEFAULT_LOOKBACK or not os.path.exists(path):
+            return None
+        with np.load(path) as z:
+            if int(z["sig"]) != sig:
+                return None
+            return RollingIndex(z["first_day"][()], z["day_pos"], z["dates"], z["iv"],
+                                z["lo"], z["hi"], z["pct"])
+
+    def _write_index(self, ticker: str, idx: RollingIndex, sig: int) -> None:
+        tmp = self._idx_path(ticker) + ".tmp.npz"
+        np.savez(tmp, sig=sig, first_day=idx.first_day, day_pos=idx.day_pos, dates=idx.dates,
+                 iv=idx.iv, lo=idx.lo, hi=idx.hi, pct=idx.pct)
+        os.replace(tmp, self._idx_path(ticker))
+
+    # ---- queries ----
+    def atm_iv(self, ticker: str, date) -> Optional[float]:
+        idx = self.index(ticker)
+        r = idx.row(date)
+        return None if r < 0 else float(idx.iv[r])
+
+    def iv_rank(self, ticker: str, date, lookback: int = DEFAULT_LOOKBACK) -> Optional[float]:
+        idx = self.index(ticker, lookback)
+        r = idx.row(date)
+        if r < 0 or np.isnan(idx.lo[r]):
+            return None
+        lo, hi = idx.lo[r], idx.hi[r]
+        return 0.5 if hi == lo else float((idx.iv[r] - lo) / (hi - lo))
+
+    def iv_percentile(self, ticker: str, date, lookback: int = DEFAULT_LOOKBACK) -> Optional[float]:
+        idx = self.index(ticker, lookback)
+        r = idx.row(date)
+        return None if r < 0 or np.isnan(idx.pct[r]) else float(idx.pct[r])
+
+    def last_snapshot(self, ticker: str) -> Optional[pd.Timestamp]:
+        idx = self.index(ticker)
+        return pd.Timestamp(idx.dates[-1]) if len(idx.dates) else None
+
+
+# ───────── snapshot job ─────────
+def _atm_row(chain, spot: float, expiry=None, as_of=None) -> Optional[dict]:
+    # ATM call/put IV inverted from our own quotes (iv_solver), vendor IV only where that fails
+    from iv_solver import atm_iv, chain_ivs
+    calls, puts = chain.calls, chain.puts
+    if calls.empty:
+        return None
+    strike, call_iv, put_iv = atm_iv(chain_ivs(calls, puts, spot, expiry, as_of), spot)
+    return {"strike": strike, "call_iv": call_iv, "put_iv": put_iv}
+
+
+def _expiries(ticker: str, as_of: pd.Timestamp, provider) -> List[str]:
+    # The first MAX_EXPIRIES listed, minus any that already expired
+    return [e for e in list(provider.options(ticker))[:MAX_EXPIRIES] if pd.Timestamp(e) >= as_of]
+
+
+def _expiry_row(ticker: str, expiry: str, spot: float, as_of: pd.Timestamp, provider) -> Optional[dict]:
+    atm = _atm_row(provider.option_chain(ticker, expiry), spot, expiry, as_of)
+    if atm is None:
+        return None
+    return {"date": as_of.date().isoformat(), "expiry": expiry, "dte": (pd.Timestamp(expiry) - as_of).days,
+            "spot": round(spot, 4), **atm}
+
+
+def snapshot_ticker(ticker: str, spot: float, as_of: Optional[pd.Timestamp] = None,
+                    provider=None) -> List[dict]:
+    from market_data import default_provider
+    provider = provider or default_provider()
+    as_of = (as_of or pd.Timestamp.today()).normalize()
+    rows = [_expiry_row(ticker, exp, spot, as_of, provider) for exp in _expiries(ticker, as_of, provider)]
+    return [r for r in rows if r is not None]
+
+
+def snapshot_all(tickers: Iterable[str], archive: Optional[IVArchive] = None, store=None,
+                 scheduler=None, provider=None) -> int:
+    """Every request is its own scheduled unit: one token and its own retries per expiry list and per chain."""
+    from fetch_scheduler import default_scheduler
+    from market_data import default_provider
+    from price_store import default_store
+    archive = archive or IVArchive()
+    store = store or default_store()
+    scheduler = scheduler or default_scheduler()
+    provider = provider or default_provider()
+    today = pd.Timestamp.today().normalize()
+
+    todo = [t for t in dict.fromkeys(tickers) if archive.last_snapshot(t) != today]
+    store.ensure_many(todo, today - pd.Timedelta(days=10), scheduler=scheduler)
+    spots = {}
+    for t in todo:
+        bars = store.get(t, today - pd.Timedelta(days=10), fetch=False)
+        if not bars.empty:
+            spots[t] = float(bars["Close"].iloc[-1])
+
+    names = list(spots)
+    listed = scheduler.values(lambda t: _expiries(t, today, provider), names, default=[], label="iv expiries")
+    jobs = [(t, exp) for t, exps in zip(names, listed) for exp in exps]
+    found = scheduler.values(lambda job: _expiry_row(job[0], job[1], spots[job[0]], today, provider), jobs,
+                             label="iv chains")
+    rows: Dict[str, List[dict]] = {t: [] for t in names}
+    for (t, _), row in zip(jobs, found):
+        if row is not None:
+            rows[t].append(row)
+
+    written = 0
+    for t in names:
+        archive.append(t, rows[t])
+        print(f"{t}: {len(rows[t])} expiries archived")
+        written += len(rows[t])
+    return written
+
+
+_default_archive: Optional[IVArchive] = None
+
+
+def default_archive() -> IVArchive:
+    global _default_archive
+    if _default_archive is None:
+        _default_archive = IVArchive()
+    return _default_archive
+
+
+if __name__ == "__main__":
+    from sheet_mirror import tracker_tickers
+    from sheets import is_valid_ticker
+    tickers = [t for t in tracker_tickers() if is_valid_ticker(t)]
+    print(f"✅ {snapshot_all(tickers)} ATM IV rows archived.")
@@ -0,0 +1,242 @@
+# iv_solver.py — batched implied-vol inversion (Newton + bisection fallback) over whole option chains
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from option_pricing import RISK_FREE, _d1d2, bs_price, norm_cdf, norm_pdf
+
+# ───────── config ─────────
+VOL_LO, VOL_HI = 1e-4, 5.0   # search bracket (annualized)
+TOL = 1e-8                   # price tolerance, as a fraction of the option's price scale
+MAX_ITER = 60
+MIN_VEGA = 1e-10             # below this a Newton step is not trusted
+MIN_T = 1 / 365 / 24         # an hour; shorter expiries are treated as expired
+
+# Status codes, one per quote
+OK, NO_PRICE, CROSSED, BELOW_INTRINSIC, ABOVE_MAX, EXPIRED, NO_CONVERGE = range(7)
+STATUS = ("ok", "no_price", "crossed", "below_intrinsic", "above_max", "expired", "no_converge")
+
+
+@dataclass
+class IVResult:
+    iv: np.ndarray           # NaN wherever status != OK
+    status: np.ndarray       # int8 codes, see STATUS
+    iterations: np.ndarray
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> np.ndarray:
+        return self.status == OK
+
+    def stats(self) -> dict:
+        n = len(self.iv)
+        ok = self.ok
+        return {
+            "quotes": n,
+            "solved": int(ok.sum()),
+            "solved_pct": round(float(100 * ok.mean()), 2) if n else 0.0,
+            "mean_iter": round(float(self.iterations[ok].mean()), 2) if ok.any() else 0.0,
+            "max_iter": int(self.iterations[ok].max()) if ok.any() else 0,
+            "elapsed_ms": round(self.elapsed * 1000, 2),
+            **{STATUS[c]: int((self.status == c).sum()) for c in range(1, len(STATUS))},
+        }
+
+
+# ───────── solver ─────────
+def _price_vega(S, K, T, r, sigma, is_call, q):
+    # Just what a Newton step needs; cheaper than the full greeks
+    d1, d2 = _d1d2(S, K, T, r, sigma, q)
+    sign = np.where(is_call, 1.0, -1.0)
+    fs, fk = S * np.exp(-q * T), K * np.exp(-r * T)
+    price = sign * (fs * norm_cdf(sign * d1) - fk * norm_cdf(sign * d2))
+    return price, fs * norm_pdf(d1) * np.sqrt(T)
+
+
+def bounds(S, K, T, r, is_call, q=0.0) -> Tuple[np.ndarray, np.ndarray]:
+    # No-arbitrage price range: discounted intrinsic .. underlying (call) / discounted strike (put)
+    fwd_s, fwd_k = S * np.exp(-q * T), K * np.exp(-r * T)
+    lower = np.where(is_call, np.maximum(fwd_s - fwd_k, 0), np.maximum(fwd_k - fwd_s, 0))
+    upper = np.where(is_call, fwd_s, fwd_k)
+    return lower, upper
+
+
+def implied_vol(price, S, K, T, is_call, r: float = RISK_FREE, q: float = 0.0,
+                tol: float = TOL, max_iter: int = MAX_ITER) -> IVResult:
+    """Invert Black-Scholes for every quote at once; every argument broadcasts.
+
+    Each quote keeps a [lo, hi] bracket that always contains the root. A Newton step
+    is taken when it lands inside the bracket, otherwise the quote bisects. Quotes
+    that violate the no-arbitrage bounds are masked out instead of being solved.
+    """
+    t0 = time.perf_counter()
+    price, S, K, T, is_call = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (price, S, K, T, is_call)))
+    is_call = is_call.astype(bool)
+    n, shape = price.size, price.shape
+    price, S, K, T, is_call = (a.ravel() for a in (price, S, K, T, is_call))
+    status = np.full(n, OK, dtype=np.int8)
+    lower, upper = bounds(S, K, T, r, is_call, q)
+    status[~(price > 0) | ~np.isfinite(S) | ~np.isfinite(K)] = NO_PRICE
+    status[(status == OK) & (T < MIN_T)] = EXPIRED
+    scale = np.maximum(price, 1e-4 * S)
+    status[(status == OK) & (price < lower - tol * scale)] = BELOW_INTRINSIC
+    status[(status == OK) & (price >= upper)] = ABOVE_MAX
+    # Time value too small to carry information (deep ITM at intrinsic)
+    status[(status == OK) & (price - lower <= tol * scale)] = BELOW_INTRINSIC
+
+    act = np.flatnonzero(status == OK)
+    iv = np.full(n, np.nan)
+    iters = np.zeros(n, dtype=np.int16)
+    if len(act):
+        p, s, k, t, c, sc = price[act], S[act], K[act], T[act], is_call[act], scale[act]
+        lo = np.full(len(act), VOL_LO)
+        hi = np.full(len(act), VOL_HI)
+        # Brenner-Subrahmanyam start, clipped into the bracket
+        x = np.clip(np.sqrt(2 * np.pi / t) * p / s, 0.05, 2.0)
+        done = np.zeros(len(act), dtype=bool)
+        it = np.zeros(len(act), dtype=np.int16)
+        live = np.arange(len(act))
+        for _ in range(max_iter):
+            px, vega = _price_vega(s[live], k[live], t[live], r, x[live], c[live], q)
+            diff = px - p[live]
+            conv = np.abs(diff) <= tol * sc[live]
+            it[live] += 1
+            # Tighten the bracket: price is increasing in vol
+            high = diff > 0
+            hi[live] = np.where(high, np.minimum(hi[live], x[live]), hi[live])
+            lo[live] = np.where(~high, np.maximum(lo[live], x[live]), lo[live])
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                newton = x[live] - diff / vega
+            ok_step = (vega > MIN_VEGA) & (newton > lo[live]) & (newton < hi[live])
+            step = np.where(ok_step, newton, 0.5 * (lo[live] + hi[live]))
+            x[live] = np.where(conv, x[live], step)
+            done[live] = conv | (hi[live] - lo[live] < 1e-12)
+            live = live[~done[live]]
+            if not len(live):
+                break
+        final = bs_price(s, k, t, r, x, c, q)
+        good = np.abs(final - p) <= max(tol, 1e-6) * sc
+        iv[act] = np.where(good, x, np.nan)
+        status[act[~good]] = NO_CONVERGE
+        iters[act] = it
+    return IVResult(iv.reshape(shape), status.reshape(shape), iters.reshape(shape), time.perf_counter() - t0)
+
+
+# ───────── chains ─────────
+def quote_prices(frame: pd.DataFrame, field: str = "mid") -> Tuple[np.ndarray, np.ndarray]:
+    """(price, crossed) for one side of a yfinance-shaped chain.
+
+    field is "bid", "ask", "mid" or "last". mid falls back to lastPrice when there
+    is no two-sided market, which happens after hours.
+    """
+    bid = frame["bid"].to_numpy(dtype=float) if "bid" in frame else np.full(len(frame), np.nan)
+    ask = frame["ask"].to_numpy(dtype=float) if "ask" in frame else np.full(len(frame), np.nan)
+    last = frame["lastPrice"].to_numpy(dtype=float) if "lastPrice" in frame else np.full(len(frame), np.nan)
+    two_sided = (bid > 0) & (ask > 0)
+    crossed = two_sided & (bid > ask)
+    if field == "bid":
+        px = bid
+    elif field == "ask":
+        px = ask
+    elif field == "last":
+        px = last
+    else:
+        px = np.where(two_sided, 0.5 * (bid + ask), last)
+    return px, crossed
+
+
+def solve_chain(calls: pd.DataFrame, puts: pd.DataFrame, spot: float, expiry, as_of=None,
+                r: float = RISK_FREE, fields: Iterable[str] = ("bid", "mid", "ask")) -> pd.DataFrame:
+    """One row per quote (calls then puts): strike, type and iv_<field> + status_<field>."""
+    as_of = pd.Timestamp(as_of or pd.Timestamp.today()).normalize()
+    T = max((pd.Timestamp(expiry) - as_of).days, 0) / 365.0
+    sides = [(calls, True), (puts, False)]
+    strikes = np.concatenate([f["strike"].to_numpy(dtype=float) for f, _ in sides])
+    is_call = np.concatenate([np.full(len(f), c) for f, c in sides])
+    out = pd.DataFrame({"strike": strikes, "call": is_call})
+    for fld in fields:
+        px, crossed = zip(*(quote_prices(f, fld) for f, _ in sides))
+        px, crossed = np.concatenate(px), np.concatenate(crossed)
+        res = implied_vol(px, spot, strikes, T, is_call, r)
+        status = np.where(crossed, CROSSED, res.status)
+        out[f"iv_{fld}"] = np.where(status == OK, res.iv, np.nan)
+        out[f"status_{fld}"] = status
+    return out
+
+
+def solve_universe(chains: Dict[Tuple[str, str], Tuple[pd.DataFrame, pd.DataFrame]], spots: Dict[str, float],
+                   as_of=None, r: float = RISK_FREE, field: str = "mid") -> Tuple[pd.DataFrame, IVResult]:
+    """Every strike of every (ticker, expiry) chain in a single implied_vol call."""
+    as_of = pd.Timestamp(as_of or pd.Timestamp.today()).normalize()
+    keys, cols = [], {"strike": [], "call": [], "price": [], "crossed": [], "spot": [], "T": []}
+    for (t, exp), (calls, puts) in chains.items():
+        spot = spots.get(t)
+        if spot is None:
+            continue
+        T = max((pd.Timestamp(exp) - as_of).days, 0) / 365.0
+        for frame, is_call in ((calls, True), (puts, False)):
+            px, crossed = quote_prices(frame, field)
+            m = len(frame)
+            keys.append((t, exp, m))
+            cols["strike"].append(frame["strike"].to_numpy(dtype=float))
+            cols["call"].append(np.full(m, is_call))
+            cols["price"].append(px)
+            cols["crossed"].append(crossed)
+            cols["spot"].append(np.full(m, spot))
+            cols["T"].append(np.full(m, T))
+    if not keys:
+        empty = IVResult(np.array([]), np.array([], dtype=np.int8), np.array([], dtype=np.int16))
+        return pd.DataFrame(columns=["ticker", "expiry", "strike", "call", "iv", "status"]), empty
+    flat = {k: np.concatenate(v) for k, v in cols.items()}
+    res = implied_vol(flat["price"], flat["spot"], flat["strike"], flat["T"], flat["call"], r)
+    res.status = np.where(flat["crossed"], CROSSED, res.status).astype(np.int8)
+    res.iv = np.where(res.status == OK, res.iv, np.nan)
+    df = pd.DataFrame({
+        "ticker": np.repeat([k[0] for k in keys], [k[2] for k in keys]),
+        "expiry": np.repeat([k[1] for k in keys], [k[2] for k in keys]),
+        "strike": flat["strike"], "call": flat["call"], "iv": res.iv, "status": res.status,
+    })
+    return df, res
+
+
+def chain_ivs(calls: pd.DataFrame, puts: pd.DataFrame, spot: float, expiry=None, as_of=None) -> pd.DataFrame:
+    """(strike, call, iv) from our own solve where quotes allow it, else yfinance's impliedVolatility.
+
+    The provider column is only used for strikes we could not solve, and zeros in
+    it are treated as missing.
+    """
+    vendor = pd.concat([calls["impliedVolatility"], puts["impliedVolatility"]], ignore_index=True).to_numpy(dtype=float)
+    vendor = np.where(vendor > 1e-4, vendor, np.nan)
+    if expiry is None:
+        return pd.DataFrame({"strike": np.concatenate([calls["strike"], puts["strike"]]),
+                             "call": np.r_[np.ones(len(calls), bool), np.zeros(len(puts), bool)], "iv": vendor})
+    solved = solve_chain(calls, puts, spot, expiry, as_of, fields=("mid",))
+    solved["iv"] = solved["iv_mid"].where(solved["iv_mid"].notna(), vendor)
+    return solved[["strike", "call", "iv"]]
+
+
+def atm_iv(ivs: pd.DataFrame, spot: float) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+    # (strike, call iv, put iv) at the strike nearest spot
+    if ivs.empty:
+        return None, None, None
+    strike = float(ivs["strike"].iloc[(ivs["strike"] - spot).abs().to_numpy().argmin()])
+    at = ivs.loc[ivs["strike"] == strike]
+    c = at.loc[at["call"], "iv"]
+    p = at.loc[~at["call"], "iv"]
+    return strike, (float(c.iloc[0]) if len(c) else np.nan), (float(p.iloc[0]) if len(p) else np.nan)
+
+
+if __name__ == "__main__":
+    from fake_provider import fake_universe
+    from synthetic import option_chain
+    rng = np.random.default_rng(0)
+    tickers = fake_universe(500)
+    spots = dict(zip(tickers, rng.uniform(20, 400, len(tickers))))
+    today = pd.Timestamp.today().normalize()
+    expiries = [(today + pd.Timedelta(days=d)).date().isoformat() for d in (7, 14, 30, 60, 90, 180)]
+    chains = {(t, e): option_chain(spots[t], seed=i * 10 + j, n_strikes=41, T=(pd.Timestamp(e) - today).days / 365)
+              for i, t in enumerate(tickers) for j, e in enumerate(expiries)}
+    df, res = solve_universe(chains, spots, today)
+    print(f"✅ {len(chains):,} chains, {res.stats()}")
@@ -3,60 +3,57 @@
 import datetime as dt
 from dataclasses import dataclass
 from functools import lru_cache
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import yfinance as yf
-from earnings_calendar2 import catalysts  # Make sure this file is in the same directory
+from earnings_calendar import default_calendar
+from price_store import default_store
+from atr_kernel import atr_series
+from iv_archive import default_archive
+from instrumentation import count, timed
+from option_pricing import IV_CRUSH, OPTION_DTE, price_events
+from results_store import record_run
 
 # ───────── config ─────────
-TICKERS = list(catalysts.keys())
 START_DATE = "2023-01-01"
 END_DATE = dt.date.today().isoformat()
 MIN_ATR_PCT = 0.02
 LOW_IV_RANK = 0.30
 HIGH_IV_RANK = 0.60
-OPTION_DTE = 30
 
 # ───────── helpers ─────────
+def load_catalysts() -> Dict[str, Dict[str, pd.Timestamp]]:
+    # catalysts universe from the compact calendar, loaded on first use rather than at import
+    return default_calendar().as_dict(sources=("catalysts",))
+
 @lru_cache(maxsize=None)
 def get_price_history(ticker: str,
                       start: str = START_DATE,
-                      end: str = END_DATE) -> pd.DataFrame:
-    df = yf.download(ticker, start=start, end=end, progress=False, auto_adjust=False).dropna()
+                      end: str = END_DATE,
+                      fetch: bool = True) -> pd.DataFrame:
+    # Local store: one network call per ticker, none on a same-day re-run (fetch=False: stored bars only)
+    df = default_store().get(ticker, start, end, fetch=fetch).dropna()
     df = df.loc[~df.index.duplicated(keep="first")]
     df = df.loc[:, ~df.columns.duplicated(keep="last")]
     return df
 
 def compute_atr(df: pd.DataFrame, window: int = 14) -> pd.Series:
-    high_low = df["High"] - df["Low"]
-    high_close = (df["High"] - df["Close"].shift()).abs()
-    low_close = (df["Low"] - df["Close"].shift()).abs()
-    tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-    return tr.rolling(window).mean()
-
-def get_option_chain(ticker: str, as_of: dt.date) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    tkr = yf.Ticker(ticker)
-    if not tkr.options:
-        return pd.DataFrame(), pd.DataFrame()
-    as_of_ts = pd.Timestamp(as_of)
-    target_exp = next((exp for exp in tkr.options
-                       if (pd.Timestamp(exp) - as_of_ts).days >= OPTION_DTE),
-                      tkr.options[-1])
-    chain = tkr.option_chain(target_exp)
-    return chain.calls, chain.puts
-
-def calc_iv_rank(current_iv: float, hist: List[float]) -> float:
-    iv_min, iv_max = min(hist), max(hist)
-    return 0.5 if iv_max == iv_min else (current_iv - iv_min) / (iv_max - iv_min)
+    return atr_series(df, window)
+
+def realized_vol_rank(close: pd.Series, window: int = 20, lookback: int = 252) -> Tuple[pd.Series, pd.Series]:
+    # Stand-in for days the IV archive has no snapshot: annualized return std and its rank
+    rv = close.pct_change().rolling(window).std() * np.sqrt(252)
+    lo = rv.rolling(lookback, min_periods=window).min()
+    hi = rv.rolling(lookback, min_periods=window).max()
+    return rv, ((rv - lo) / (hi - lo)).where(hi > lo, 0.5)
 
 # ───────── data class ─────────
 @dataclass
 class Trade:
     ticker: str
     open_date: pd.Timestamp
+    close_date: pd.Timestamp
     strategy: str
     entry_price: float
     exit_price: float
@@ -65,9 +62,12 @@ class Trade:
     pnl: float
 
 # ───────── backtest engine ─────────
+@timed("backtest.simulate")
 def simulate_trades(ticker: str,
-                    events: Dict[str, pd.Timestamp]) -> List[Trade]:
-    df = get_price_history(ticker)
+                    events: Dict[str, pd.Timestamp],
+                    df: Optional[pd.DataFrame] = None) -> List[Trade]:
+    # df: price history to use instead of get_price_history (parallel workers pass memmapped bars)
+    df = get_price_history(ticker) if df is None else df
     df = df.loc[:, ~df.columns.duplicated(keep="last")]
 
     atr = compute_atr(df)
@@ -82,59 +82,74 @@ def simulate_trades(ticker: str,
     atr_pct = atr / close_ser
     atr_pct.name = "ATR_pct"
 
-    for col in ["ATR14", "ATR_pct"]:
+    rv, rv_rank = realized_vol_rank(close_ser)
+
+    for col in ["ATR14", "ATR_pct", "RV", "RV_rank"]:
         if col in df.columns:
             df.drop(columns=col, inplace=True)
 
     df["ATR14"] = atr
     df["ATR_pct"] = atr_pct
+    df["RV"] = rv
+    df["RV_rank"] = rv_rank
 
-    trades: List[Trade] = []
-    iv_hist: List[float] = []
+    archive = default_archive()
+    rows = []
 
     for evt, evt_dt in events.items():
         if evt_dt not in df.index or df.index.get_loc(evt_dt) < 20:
             continue
-        open_idx = df.index.get_loc(evt_dt) - 20
-        open_row = df.iloc[open_idx]
+        evt_idx = df.index.get_loc(evt_dt)
+        if evt_idx + 1 >= len(df):
+            continue                      # no post-event bar to close on yet
+        open_row = df.iloc[evt_idx - 20]
+        close_row = df.iloc[evt_idx + 1]
         spot = float(open_row["Close"])
         atr_val = float(open_row["ATR_pct"])
-        open_dt = open_row.name
-
-        calls, _ = get_option_chain(ticker, open_dt.date())
-        if calls.empty:
+        open_dt, close_dt = open_row.name, close_row.name
+
+        # Archived ATM IV as of the open date; realized vol when there is no snapshot
+        iv_now = archive.atm_iv(ticker, open_dt)
+        iv_rank = archive.iv_rank(ticker, open_dt)
+        if iv_now is None or iv_rank is None:
+            iv_now, iv_rank = float(open_row["RV"]), float(open_row["RV_rank"])
+        if np.isnan(iv_now) or np.isnan(iv_rank):
             continue
-        atm_call = calls.iloc[(calls["strike"] - spot).abs().argsort()[:1]]
-        iv_now = float(atm_call["impliedVolatility"].values[0])
-        iv_hist.append(iv_now)
-        iv_rank = calc_iv_rank(iv_now, iv_hist)
+        iv_exit = archive.atm_iv(ticker, close_dt)
+        if iv_exit is None or np.isnan(iv_exit):
+            iv_exit = iv_now * IV_CRUSH
 
         if atr_val >= MIN_ATR_PCT and iv_rank <= LOW_IV_RANK:
-            strat, pnl = "Long ATM Straddle", atr_val * 100
+            strat = "Long ATM Straddle"
         elif atr_val >= MIN_ATR_PCT and iv_rank >= HIGH_IV_RANK:
-            strat, pnl = "Iron Condor", 0.5 * atr_val * 100
+            strat = "Iron Condor"
         else:
-            strat, pnl = "Vertical Call", 0.75 * atr_val * 100
-
-        trades.append(
-            Trade(ticker, open_dt, strat,
-                  spot, spot * (1 + atr_val),
-                  iv_now, iv_now * 0.8, pnl)
-        )
+            strat = "Vertical Call"
+        rows.append((open_dt, close_dt, strat, spot, float(close_row["Close"]), iv_now, iv_exit, (close_dt - open_dt).days))
+
+    count("backtest.events", len(events))
+    if not rows:
+        return []
+    # Every event's structure priced at open and close in one vectorized pass ($ per 1-lot)
+    _, _, strats, s0, s1, v0, v1, hold = zip(*rows)
+    pnl = price_events(strats, s0, s1, v0, v1, hold, OPTION_DTE)["pnl"]
+    trades: List[Trade] = [Trade(ticker, *row[:7], float(p)) for row, p in zip(rows, pnl)]
+    count("backtest.trades", len(trades))
     return trades
 
 # ───────── main ─────────
 def main():
+    catalysts = load_catalysts()
     all_trades: List[Trade] = []
-    for tk in TICKERS:
-        all_trades.extend(simulate_trades(tk, catalysts.get(tk, {})))
+    for tk in catalysts:
+        all_trades.extend(simulate_trades(tk, catalysts[tk]))
 
     if not all_trades:
         print("No trades generated – tweak thresholds or events.")
         return
 
     res = pd.DataFrame([t.__dict__ for t in all_trades])
-    print("Trade summary:")
+    print("Trade summary ($ P/L per 1-lot):")
     print(res.groupby("strategy")["pnl"].describe())
 
     # Additional output
@@ -145,6 +160,8 @@ def main():
 
     res.to_csv("backtest_results.csv", index=False)
     print("Saved to backtest_results.csv")
+    # Stored run + main_cleaned's cube (all recorded history, queried via rollup_cube)
+    record_run("main_cleaned", res)
 
 if __name__ == "__main__":
     main()
@@ -1,161 +1,117 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import yfinance as yf
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from price_store import default_store
+from asof import asof, nearest_value
+from atr_kernel import atr_series
+from iv_archive import default_archive
+from sheet_mirror import tracker_tickers
+from instrumentation import count, timer
+from earnings_cache import default_earnings
+from option_pricing import IV_CRUSH, add_option_pnl, realized_vol
+from results_store import record_run
 
-# ========== Google Sheets Setup ==========
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-creds = ServiceAccountCredentials.from_json_keyfile_name("gcreds.json", scope)
-client = gspread.authorize(creds)
-sheet = client.open("Earnings Tracker").sheet1
-tickers = sheet.col_values(1)[1:]  # Skip header
+# ========== Config ==========
+LOOKUP_TOLERANCE = pd.Timedelta(days=30)  # same reach as the old per-event download window
 
 # ========== Helper Functions ==========
 
 def get_earnings_dates(ticker, n=20):
-    try:
-        tkr = yf.Ticker(ticker)
-        df = tkr.get_earnings_dates(limit=n)
-        if df is None or df.empty:
-            return []
-        dates = pd.to_datetime(df.index).tz_localize(None)
-        today = pd.Timestamp.today().normalize()
-        past_dates = [d for d in dates if d < today]
-        return sorted(past_dates, reverse=True)[:n]
-    except Exception as e:
-        print(f"{ticker} error (earnings_dates): {e}")
-        return []
+    # Local read: past reports from the shared earnings cache (yfinance + catalysts + earnings_events.csv)
+    return default_earnings().past(ticker, n)
 
 def compute_atr(df, window=14):
-    high = df["High"]
-    low = df["Low"]
-    close = df["Close"]
-    tr1 = high - low
-    tr2 = abs(high - close.shift())
-    tr3 = abs(low - close.shift())
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    return tr.rolling(window).mean()
+    return atr_series(df, window)
 
 def fetch_nearest_price(df, date, col=None):
-    idx = df.index
-    if date in idx:
-        val = df.loc[date][col] if col else df.loc[date]
-        return float(val)
-    prev_dates = [d for d in idx if d <= date]
-    if prev_dates:
-        nearest_date = max(prev_dates)
-        val = df.loc[nearest_date][col] if col else df.loc[nearest_date]
-        return float(val)
-    next_dates = [d for d in idx if d > date]
-    if next_dates:
-        nearest_date = min(next_dates)
-        val = df.loc[nearest_date][col] if col else df.loc[nearest_date]
-        return float(val)
-    return None
+    # Exact/previous bar, else the next one; plain float or None
+    return nearest_value(df, date, col)
 
 def fetch_iv_rank(ticker, date, lookback=252):
-    try:
-        tkr = yf.Ticker(ticker)
-        option_dates = tkr.options
-        if not option_dates:
-            return None
-        expiry = None
-        for edate in option_dates:
-            if pd.to_datetime(edate) > date + timedelta(days=7):
-                expiry = edate
-                break
-        if expiry is None:
-            expiry = option_dates[-1]
-        chain = tkr.option_chain(expiry)
-        calls = chain.calls
-        price = fetch_nearest_price(yf.download(ticker, start=date - timedelta(days=10), end=date + timedelta(days=2), progress=False, auto_adjust=True), date, "Close")
-        if price is None or calls.empty:
-            return None
-        calls["dist"] = (calls["strike"] - price).abs()
-        atm_call = calls.sort_values("dist").iloc[0]
-        iv_now = atm_call["impliedVolatility"]
+    # Historical ATM IV rank as of `date` from the local archive (no options calls)
+    return default_archive().iv_rank(ticker, date, lookback)
 
-        ivs = []
-        for e in option_dates:
-            try:
-                if pd.to_datetime(e) < date and len(ivs) < lookback:
-                    chain_hist = tkr.option_chain(e)
-                    calls_hist = chain_hist.calls
-                    calls_hist["dist"] = (calls_hist["strike"] - price).abs()
-                    atm_hist = calls_hist.sort_values("dist").iloc[0]
-                    ivs.append(atm_hist["impliedVolatility"])
-            except:
-                continue
-        if not ivs:
-            return None
-        iv_rank = (iv_now - min(ivs)) / (max(ivs) - min(ivs)) if max(ivs) != min(ivs) else 0.5
-        return iv_rank
-    except Exception as e:
-        print(f"{ticker} error (iv_rank): {e}")
-        return None
+def fetch_atm_iv(ticker, date, fallback):
+    # Archived ATM IV level for option pricing; realized vol / crushed entry IV when missing
+    iv = default_archive().atm_iv(ticker, date)
+    return fallback if iv is None or np.isnan(iv) else iv
 
 # ========== Main Backtest ==========
-results = []
+def main():
+    tickers = [t for t in tracker_tickers() if t]  # local sheet mirror
+    store = default_store()
+    results = []
 
-for ticker in tickers:
-    earnings_dates = get_earnings_dates(ticker, n=20)
-    print(f"Running: {ticker} ({len(earnings_dates)} earnings)")
-    try:
-        for earn_date in earnings_dates:
-            entry_date = earn_date - pd.Timedelta(days=20)
-            exit_date = earn_date + pd.Timedelta(days=1)
-            # Download price data for ATR and entries
-            df_price = yf.download(
-                ticker,
-                start=entry_date - pd.Timedelta(days=30),
-                end=exit_date + pd.Timedelta(days=2),
-                progress=False,
-                auto_adjust=True
-            )
-            if df_price.empty:
-                print(f"{ticker} skipped: price data incomplete")
-                continue
-            df_price.index = pd.to_datetime(df_price.index).tz_localize(None)
-            # ATR
-            atr_series = compute_atr(df_price)
-            atr14 = fetch_nearest_price(atr_series, entry_date)
-            price_entry = fetch_nearest_price(df_price, entry_date, "Open")
-            price_exit = fetch_nearest_price(df_price, exit_date, "Close")
-            if price_entry is None or price_exit is None or atr14 is None:
-                print(f"{ticker} skipped: could not find price/ATR at required dates")
+    # Network work fans out up front (bounded, rate-limited); the loop only reads local data
+    # Only tickers whose cached dates have gone stale are re-queried
+    default_earnings().refresh(tickers, limit=20)
+    earnings_by_ticker = {t: get_earnings_dates(t, n=20) for t in tickers}
+    with timer("backtest.prices"):
+        store.ensure_many([t for t in tickers if earnings_by_ticker[t]])
+
+    for ticker in tickers:
+        earnings_dates = earnings_by_ticker[ticker]
+        print(f"Running: {ticker} ({len(earnings_dates)} earnings)")
+        try:
+            if not earnings_dates:
                 continue
-            atr_pct = atr14 / price_entry if price_entry else None
-            # IV Rank
-            iv_rank = fetch_iv_rank(ticker, entry_date)
-            # Example strategy selector
-            if atr_pct is not None and iv_rank is not None:
-                if atr_pct > 0.025 and iv_rank > 0.6:
-                    strat = "Straddle"
-                elif atr_pct < 0.015 and iv_rank < 0.3:
-                    strat = "Iron Condor"
+            # One fetch per ticker, then every event's lookups in two batched as-of calls
+            with timer("backtest.load_bars"):
+                df_price = store.get(ticker, adjusted=True)
+            count("backtest.events", len(earnings_dates))
+            frame = df_price.assign(ATR14=compute_atr(df_price), RV=realized_vol(df_price["Close"]))
+            events = pd.DatetimeIndex(earnings_dates)
+            entry_dates = events - pd.Timedelta(days=20)
+            exit_dates = events + pd.Timedelta(days=1)
+            at_entry = asof(frame, entry_dates, ["ATR14", "Open", "RV"], fallback=True, tolerance=LOOKUP_TOLERANCE)
+            at_exit = asof(frame, exit_dates, "Close", fallback=True, tolerance=LOOKUP_TOLERANCE)
+            for i, earn_date in enumerate(earnings_dates):
+                entry_date, exit_date = entry_dates[i], exit_dates[i]
+                atr14, price_entry, rv = (float(v) for v in at_entry[i])
+                price_exit = float(at_exit[i])
+                if np.isnan(price_entry) or np.isnan(price_exit) or np.isnan(atr14):
+                    print(f"{ticker} skipped: could not find price/ATR at required dates")
+                    continue
+                atr_pct = atr14 / price_entry if price_entry else None
+                # IV Rank
+                iv_rank = fetch_iv_rank(ticker, entry_date)
+                # Example strategy selector
+                if atr_pct is not None and iv_rank is not None:
+                    if atr_pct > 0.025 and iv_rank > 0.6:
+                        strat = "Straddle"
+                    elif atr_pct < 0.015 and iv_rank < 0.3:
+                        strat = "Iron Condor"
+                    else:
+                        strat = "Vertical Call"
                 else:
-                    strat = "Vertical Call"
-            else:
-                strat = "N/A"
-            pnl = (price_exit - price_entry) / price_entry if (price_entry and price_exit) else None
-            results.append({
-                "Ticker": ticker,
-                "Earnings Date": earn_date.date(),
-                "Entry Date": entry_date.date(),
-                "Exit Date": exit_date.date(),
-                "Entry Price": price_entry,
-                "Exit Price": price_exit,
-                "ATR(14)": atr14,
-                "ATR%": atr_pct,
-                "IV Rank": iv_rank,
-                "Strategy": strat,
-                "P/L": pnl
-            })
-    except Exception as e:
-        print(f"{ticker} error: {e}")
+                    strat = "N/A"
+                pnl = (price_exit - price_entry) / price_entry if (price_entry and price_exit) else None
+                iv_entry = fetch_atm_iv(ticker, entry_date, rv)
+                iv_exit = fetch_atm_iv(ticker, exit_date, iv_entry * IV_CRUSH)
+                results.append({
+                    "Ticker": ticker,
+                    "Earnings Date": earn_date.date(),
+                    "Entry Date": entry_date.date(),
+                    "Exit Date": exit_date.date(),
+                    "Entry Price": price_entry,
+                    "Exit Price": price_exit,
+                    "ATR(14)": atr14,
+                    "ATR%": atr_pct,
+                    "IV Rank": iv_rank,
+                    "Strategy": strat,
+                    "P/L": pnl,
+                    "Entry IV": iv_entry,
+                    "Exit IV": iv_exit
+                })
+        except Exception as e:
+            print(f"{ticker} error: {e}")
+
+    count("backtest.trades", len(results))
+    # Save results; option P&L for every row in one vectorized pricing pass
+    results_df = add_option_pnl(pd.DataFrame(results))
+    results_df.to_csv("earnings_strategy_backtest.csv", index=False)
+    print("✅ All done. Results saved to earnings_strategy_backtest.csv")
+    record_run("main_cleaned_updated2", results_df)
+
 
-# Save results
-results_df = pd.DataFrame(results)
-results_df.to_csv("earnings_strategy_backtest.csv", index=False)
-print("✅ All done. Results saved to earnings_strategy_backtest.csv")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
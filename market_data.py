@@ -0,0 +1,424 @@
+# market_data.py — pluggable market-data providers: yfinance, or a local on-disk universe served at memory speed
+import json
+import os
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import count, frame_bytes, timer
+
+# ───────── config ─────────
+LOCAL_DIR = os.path.join("data", "market")
+ENV_PROVIDER = "TRACKER_PROVIDER"      # "yfinance" (default) or "local[:path]"
+BULK_CHUNK = 50                        # tickers per yf.download call
+COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+Chain = namedtuple("Chain", ["calls", "puts", "expiry"], defaults=(None,))
+
+# yf.download keeps its results in module globals (shared._DFS / _ERRORS) and resets them on
+# every call, so two calls in flight can drop or swap tickers; only one runs at a time
+_YF_DOWNLOAD = threading.Lock()
+NO_DATA_ERRORS = ("YFPricesMissingError", "no price data found", "possibly delisted")
+
+
+class DownloadError(RuntimeError):
+    """yf.download logged a failure (429, network, ...) and returned empty instead of raising."""
+
+
+def _empty_bars() -> pd.DataFrame:
+    return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([]), dtype=float)
+
+
+# ───────── interface ─────────
+class MarketDataProvider(ABC):
+    """Bulk methods take many tickers per call.
+
+    history() raises when the request fails. A ticker missing from its result got
+    no bars back, either because its own fetch failed or because the range really
+    is empty. Callers must not take that as coverage; the store only does for
+    short weekend/holiday gaps. For the other bulk methods a missing key means
+    the lookup failed.
+
+    The single-ticker methods mirror the yfinance calls the jobs used to make and
+    raise on failure, so FetchScheduler can still retry them per ticker.
+    """
+
+    name = "base"
+
+    # ---- bulk ----
+    @abstractmethod
+    def history(self, tickers: Sequence[str], start, end) -> Dict[str, pd.DataFrame]:
+        """Daily bars in [start, end) per ticker, COLUMNS, unadjusted plus Adj Close."""
+
+    @abstractmethod
+    def expiries(self, tickers: Sequence[str]) -> Dict[str, Tuple[str, ...]]:
+        """Listed option expiries (ISO dates, nearest first) per ticker."""
+
+    @abstractmethod
+    def chains(self, requests: Sequence[Tuple[str, str]]) -> Dict[Tuple[str, str], Chain]:
+        """(calls, puts, expiry) per (ticker, expiry)."""
+
+    @abstractmethod
+    def earnings(self, tickers: Sequence[str], limit: int = 12) -> Dict[str, pd.DataFrame]:
+        """get_earnings_dates-shaped frame (tz-aware index, newest first) per ticker."""
+
+    # ---- single ticker ----
+    def download(self, ticker: str, start, end) -> pd.DataFrame:
+        return self.history([ticker], start, end).get(ticker, _empty_bars())
+
+    def options(self, ticker: str) -> Tuple[str, ...]:
+        return self.expiries([ticker]).get(ticker, ())
+
+    def option_chain(self, ticker: str, expiry: str) -> Chain:
+        return self.chains([(ticker, expiry)])[(ticker, expiry)]
+
+    def earnings_dates(self, ticker: str, limit: int = 12) -> pd.DataFrame:
+        return self.earnings([ticker], limit).get(ticker, pd.DataFrame())
+
+    def front_chain(self, ticker: str) -> Optional[Chain]:
+        exps = self.options(ticker)
+        return self.option_chain(ticker, exps[0]) if exps else None
+
+
+# ───────── yfinance ─────────
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def __init__(self, chunk: int = BULK_CHUNK):
+        self.chunk = chunk
+
+    def history(self, tickers, start, end):
+        tickers = list(dict.fromkeys(tickers))
+        out = {}
+        for i in range(0, len(tickers), self.chunk):
+            batch = tickers[i:i + self.chunk]
+            df, errors = _yf_download(batch, start=start, end=end, progress=False, auto_adjust=False,
+                                      actions=False, group_by="ticker", threads=True)
+            # A throttled/network failure fails the batch so the scheduler retries it; tickers
+            # yfinance logged as errors come back all-NaN and are left out of the result
+            transient = {t: e for t, e in errors.items() if not _no_data(e)}
+            if transient:
+                t, e = next(iter(transient.items()))
+                raise DownloadError(f"{len(transient)}/{len(batch)} tickers failed, e.g. {t}: {e}")
+            if df.empty:
+                continue
+            if not isinstance(df.columns, pd.MultiIndex):
+                if batch[0].upper() not in errors and not df.dropna(how="all").empty:
+                    out[batch[0]] = df.dropna(how="all")
+                continue
+            for t in batch:
+                if t.upper() not in errors and t in df.columns.get_level_values(0):
+                    sub = df[t].dropna(how="all")
+                    if not sub.empty:
+                        out[t] = sub
+        return out
+
+    def download(self, ticker, start, end):
+        # Single-ticker path raises on failure so the scheduler can retry it; a confirmed
+        # "no price data" answer comes back empty and the store decides what that means
+        df, errors = _yf_download(ticker, start=start, end=end, progress=False, auto_adjust=False, actions=False)
+        err = errors.get(ticker.upper())
+        if err is not None and not _no_data(err):
+            raise DownloadError(f"{ticker}: {err}")
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(0)
+        df = df.dropna(how="all")
+        if df.empty and err is None:
+            raise DownloadError(f"{ticker}: empty result and no error reported")
+        return df
+
+    def options(self, ticker):
+        import yfinance as yf
+        with timer("net.options"):
+            exps = tuple(yf.Ticker(ticker).options)
+        count("net.option_chain.calls")
+        return exps
+
+    def option_chain(self, ticker, expiry):
+        import yfinance as yf
+        with timer("net.option_chain"):
+            ch = yf.Ticker(ticker).option_chain(expiry)
+        count("net.option_chain.calls")
+        count("net.option_chain.bytes", frame_bytes((ch.calls, ch.puts)))
+        return Chain(ch.calls, ch.puts, expiry)
+
+    def earnings_dates(self, ticker, limit=12):
+        import yfinance as yf
+        with timer("net.earnings_dates"):
+            df = yf.Ticker(ticker).get_earnings_dates(limit=limit)
+        count("net.earnings_dates.calls")
+        count("net.earnings_dates.bytes", frame_bytes(df))
+        return df if isinstance(df, pd.DataFrame) else pd.DataFrame()
+
+    # yfinance has no multi-ticker options or calendar endpoint: bulk = loop, skipping failures
+    def expiries(self, tickers):
+        return _loop(tickers, self.options, "options")
+
+    def chains(self, requests):
+        return _loop(requests, lambda k: self.option_chain(*k), "option chain")
+
+    def earnings(self, tickers, limit=12):
+        return _loop(tickers, lambda t: self.earnings_dates(t, limit), "earnings dates")
+
+
+def _yf_download(tickers, **kw) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    # (frame, {TICKER: error}) read back under the lock before the next call resets them
+    import yfinance as yf
+    from yfinance import shared
+    with _YF_DOWNLOAD:
+        with timer("net.prices"):
+            df = yf.download(tickers, **kw)
+        errors = dict(getattr(shared, "_ERRORS", None) or {})
+    count("net.prices.calls")
+    count("net.prices.bytes", frame_bytes(df))
+    return (df if isinstance(df, pd.DataFrame) else pd.DataFrame()), errors
+
+
+def _no_data(err: str) -> bool:
+    return any(s in err for s in NO_DATA_ERRORS)
+
+
+def _loop(keys, fn, label: str) -> dict:
+    out = {}
+    for k in keys:
+        try:
+            out[k] = fn(k)
+        except Exception as e:
+            print(f"{k} error ({label}): {e}")
+    return out
+
+
+# ───────── local ─────────
+class LocalProvider(MarketDataProvider):
+    """A recorded or synthetic universe on disk: bars memmapped (ticker, day, field), no network.
+
+    Layout under root: meta.json (tickers, columns), dates.npy (datetime64[D]),
+    bars.npy (N, T, 6, NaN where a ticker has no bar), earnings.npz (flat dates
+    + offsets) and optionally chains.npz with recorded front chains.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str = LOCAL_DIR):
+        self.root = root
+        with open(os.path.join(root, "meta.json")) as fh:
+            meta = json.load(fh)
+        self.tickers: List[str] = meta["tickers"]
+        self.columns: List[str] = meta["columns"]
+        self._pos = {t: i for i, t in enumerate(self.tickers)}
+        self.dates = np.load(os.path.join(root, "dates.npy"))
+        self.bars = np.load(os.path.join(root, "bars.npy"), mmap_mode="r")
+        with np.load(os.path.join(root, "earnings.npz")) as z:
+            self._ev_dates, self._ev_starts = z["dates"], z["starts"]
+        self._chains: Dict[Tuple[str, str], Chain] = {}
+        path = os.path.join(root, "chains.npz")
+        if os.path.exists(path):
+            self._load_chains(path)
+
+    def _load_chains(self, path: str) -> None:
+        with np.load(path) as z:
+            keys, starts, data = z["keys"], z["starts"], z["data"]   # data: strike, call_iv, put_iv
+        for k, (s0, s1) in zip(keys, zip(starts[:-1], starts[1:])):
+            t, exp = str(k).split("|")
+            block = data[s0:s1]
+            self._chains[(t, exp)] = Chain(_side(block[:, 0], block[:, 1]), _side(block[:, 0], block[:, 2]), exp)
+
+    def _days(self, start, end) -> slice:
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start).date(), "D"), side="left")
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end).date(), "D"), side="left")
+        return slice(int(lo), int(hi))
+
+    def history(self, tickers, start, end):
+        s = self._days(start, end)
+        idx = pd.DatetimeIndex(self.dates[s].astype("datetime64[ns]"))
+        out = {}
+        for t in tickers:
+            i = self._pos.get(t.upper())
+            if i is None:
+                continue
+            block = np.asarray(self.bars[i, s])
+            keep = ~np.isnan(block[:, self.columns.index("Close")])
+            if keep.any():
+                out[t] = pd.DataFrame(block[keep], index=idx[keep], columns=self.columns)
+        count("local.prices.calls")
+        return out
+
+    def _spot(self, ticker: str) -> Optional[float]:
+        i = self._pos.get(ticker.upper())
+        if i is None:
+            return None
+        close = np.asarray(self.bars[i, :, self.columns.index("Close")])
+        ok = np.flatnonzero(~np.isnan(close))
+        return float(close[ok[-1]]) if len(ok) else None
+
+    def expiries(self, tickers):
+        today = pd.Timestamp.today().normalize()
+        fridays = tuple(d.date().isoformat() for d in
+                        pd.date_range(today + pd.Timedelta(days=1), periods=8, freq="W-FRI"))
+        out = {}
+        for t in tickers:
+            if t.upper() in self._pos:
+                recorded = tuple(sorted(e for (k, e) in self._chains if k == t.upper()))
+                out[t] = recorded or fridays
+        return out
+
+    def chains(self, requests):
+        from synthetic import option_chain
+        out = {}
+        for t, exp in requests:
+            ch = self._chains.get((t.upper(), exp))
+            if ch is None:
+                spot = self._spot(t)
+                if spot is None:
+                    continue
+                T = max((pd.Timestamp(exp) - pd.Timestamp.today().normalize()).days, 1) / 365
+                ch = Chain(*option_chain(spot, zlib.crc32(f"{t.upper()}|{exp}".encode()), T=T), exp)
+            out[(t, exp)] = ch
+        return out
+
+    def option_chain(self, ticker, expiry):
+        ch = self.chains([(ticker, expiry)]).get((ticker, expiry))
+        if ch is None:
+            raise KeyError(f"{ticker} not in local universe {self.root}")
+        return ch
+
+    def earnings(self, tickers, limit=12):
+        out = {}
+        for t in tickers:
+            i = self._pos.get(t.upper())
+            if i is None:
+                continue
+            d = self._ev_dates[self._ev_starts[i]:self._ev_starts[i + 1]][::-1][:limit]
+            idx = pd.DatetimeIndex(d.astype("datetime64[ns]")).tz_localize("America/New_York")
+            out[t] = pd.DataFrame({"EPS Estimate": np.nan, "Reported EPS": np.nan}, index=idx)
+        return out
+
+
+def _side(strikes: np.ndarray, iv: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame({"strike": strikes, "impliedVolatility": iv, "bid": np.nan, "ask": np.nan, "lastPrice": np.nan})
+
+
+# ───────── writing a local universe ─────────
+def write_local(root: str, frames: Dict[str, pd.DataFrame], events: Dict[str, Iterable],
+                chains: Optional[Dict[Tuple[str, str], Chain]] = None) -> str:
+    """Lay frames/events/chains out in the LocalProvider format (atomic directory swap)."""
+    import shutil
+    tickers = [t.upper() for t in frames]
+    dates = np.unique(np.concatenate([f.index.values.astype("datetime64[D]") for f in frames.values()]
+                                     or [np.array([], "datetime64[D]")]))
+    tmp = root + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    bars = np.lib.format.open_memmap(os.path.join(tmp, "bars.npy"), mode="w+", dtype="f8",
+                                     shape=(len(tickers), len(dates), len(COLUMNS)))
+    bars[:] = np.nan
+    for i, df in enumerate(frames.values()):
+        if df.empty:
+            continue
+        pos = np.searchsorted(dates, df.index.values.astype("datetime64[D]"))
+        bars[i, pos] = df.reindex(columns=COLUMNS).to_numpy(dtype=float)
+    bars.flush()
+    del bars
+    np.save(os.path.join(tmp, "dates.npy"), dates)
+
+    ev = [np.unique(np.array([np.datetime64(pd.Timestamp(d).date(), "D") for d in events.get(t, ())],
+                             dtype="datetime64[D]")) for t in frames]
+    starts = np.concatenate([[0], np.cumsum([len(e) for e in ev])]).astype(np.int64)
+    flat = np.concatenate(ev) if ev else np.array([], "datetime64[D]")
+    np.savez(os.path.join(tmp, "earnings.npz"), dates=flat, starts=starts)
+
+    if chains:
+        keys, blocks = [], []
+        for (t, exp), ch in chains.items():
+            puts = ch.puts.set_index("strike")["impliedVolatility"]
+            strikes = ch.calls["strike"].to_numpy(dtype=float)
+            blocks.append(np.column_stack([strikes, ch.calls["impliedVolatility"].to_numpy(dtype=float),
+                                           puts.reindex(strikes).to_numpy(dtype=float)]))
+            keys.append(f"{t.upper()}|{exp}")
+        cstarts = np.concatenate([[0], np.cumsum([len(b) for b in blocks])]).astype(np.int64)
+        np.savez(os.path.join(tmp, "chains.npz"), keys=np.array(keys), starts=cstarts, data=np.concatenate(blocks))
+
+    with open(os.path.join(tmp, "meta.json"), "w") as fh:
+        json.dump({"tickers": tickers, "columns": COLUMNS}, fh)
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp, root)
+    return root
+
+
+def build_synthetic(root: str = LOCAL_DIR, n_tickers: int = 500, years: float = 5, seed: int = 0,
+                    end: Optional[str] = None) -> str:
+    """Synthetic universe ending today (or `end`), for air-gapped runs and profiling."""
+    import synthetic
+    end = end or pd.Timestamp.today().normalize().isoformat()
+    panel = synthetic.price_panel(n_tickers, years, seed, end=end)
+    events = synthetic.earnings_events(panel, seed=seed)
+    frames = {t: panel.frame(j) for j, t in enumerate(panel.tickers)}
+    return write_local(root, frames, {t: ev.values() for t, ev in events.items()})
+
+
+def record(tickers: Iterable[str], start, end=None, root: str = LOCAL_DIR,
+           source: Optional[MarketDataProvider] = None, limit: int = 12) -> str:
+    """Snapshot a live provider into a local universe (bars, earnings dates, front chains)."""
+    source = source or YFinanceProvider()
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    end = end or (pd.Timestamp.today().normalize() + pd.Timedelta(days=1))
+    frames = source.history(tickers, start, end)
+    frames = {t: frames.get(t, _empty_bars()) for t in tickers}
+    events = {t: list(pd.to_datetime(df.index).tz_localize(None)) for t, df in source.earnings(tickers, limit).items()}
+    fronts = {t: exps[0] for t, exps in source.expiries(tickers).items() if exps}
+    chains = source.chains(list(fronts.items()))
+    return write_local(root, frames, events, chains)
+
+
+# ───────── default ─────────
+_default_provider: Optional[MarketDataProvider] = None
+
+
+def provider_from_spec(spec: str) -> MarketDataProvider:
+    kind, _, arg = spec.partition(":")
+    if kind == "local":
+        return LocalProvider(arg or LOCAL_DIR)
+    if kind in ("", "yfinance"):
+        return YFinanceProvider()
+    raise ValueError(f"unknown provider {spec!r} (yfinance | local[:path])")
+
+
+def default_provider() -> MarketDataProvider:
+    global _default_provider
+    if _default_provider is None:
+        _default_provider = provider_from_spec(os.environ.get(ENV_PROVIDER, "yfinance"))
+    return _default_provider
+
+
+def set_provider(provider: MarketDataProvider) -> None:
+    global _default_provider
+    _default_provider = provider
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Build a local market-data universe")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("synthetic")
+    p.add_argument("--tickers", type=int, default=500)
+    p.add_argument("--years", type=float, default=5)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--root", default=LOCAL_DIR)
+    p = sub.add_parser("record")
+    p.add_argument("tickers", nargs="*", help="default: tracker sheet tickers")
+    p.add_argument("--start", default="2015-01-01")
+    p.add_argument("--root", default=LOCAL_DIR)
+    args = ap.parse_args()
+    if args.cmd == "synthetic":
+        build_synthetic(args.root, args.tickers, args.years, args.seed)
+    else:
+        from sheet_mirror import tracker_tickers
+        from sheets import is_valid_ticker
+        record(args.tickers or [t for t in tracker_tickers() if is_valid_ticker(t)], args.start, root=args.root)
+    lp = LocalProvider(args.root)
+    print(f"✅ {len(lp.tickers)} tickers × {len(lp.dates)} days -> {args.root}")
@@ -0,0 +1,287 @@
+# metrics_engine.py — single-pass Earnings Tracker metrics (B, C, D, P, Q, R, S, AD + backtest history columns)
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from earnings_cache import default_earnings
+from fetch_scheduler import FetchScheduler, default_scheduler
+from instrumentation import timer
+from iv_solver import chain_ivs
+from market_data import default_provider
+from price_store import PriceStore, default_store
+from rolling_state import RollingStates, TickerState
+from sheet_mirror import SheetMirror, default_mirror
+from sheet_sync import SheetWriter
+from sheets import col_letter, is_valid_ticker, open_tracker
+
+# ───────── config ─────────
+HISTORY_MONTHS = 12          # panel span for columns that want full history
+DEFAULT_LAYOUT = ["B", "C", "D", "P", "Q", "R", "S", "AD", "CONF", "PLE"]
+SETUP_HEADER = "Setup Rec"
+SECTOR_HEADER = "Sector"
+
+
+# ───────── context ─────────
+@dataclass
+class MetricsContext:
+    tickers: List[str]                         # unique, valid tickers
+    states: Dict[str, TickerState]             # rolling state, advanced to the latest bar
+    today: pd.Timestamp
+    store: Optional[PriceStore] = None
+    chains: Dict[str, Optional[Tuple[pd.DataFrame, pd.DataFrame]]] = field(default_factory=dict)
+    cache: Dict[str, object] = field(default_factory=dict)    # per-run values shared between columns
+    _panel: Optional[pd.DataFrame] = field(default=None, repr=False)
+
+    @property
+    def panel(self) -> pd.DataFrame:
+        # (field, ticker) adjusted bars; only loaded if a column asks for it
+        if self._panel is None:
+            start = self.today - pd.DateOffset(months=HISTORY_MONTHS)
+            self._panel = (self.store or default_store()).panel(self.tickers, start, fetch=False)
+        return self._panel
+
+    def window(self, months: int) -> pd.DataFrame:
+        # Same span as yfinance's period="{months}mo"
+        start = self.today - pd.DateOffset(months=months)
+        return self.panel.loc[self.panel.index >= start]
+
+    def fields(self, months: int, *names: str) -> List[pd.DataFrame]:
+        win = self.window(months)
+        return [win[n].reindex(columns=self.tickers) for n in names]
+
+    def from_state(self, metric: Callable[[TickerState], float], min_bars: int,
+                   digits: int = 4) -> Dict[str, object]:
+        out = {}
+        for t in self.tickers:
+            st = self.states.get(t)
+            out[t] = _round(metric(st), digits) if st is not None and st.count >= min_bars else "N/A"
+        return out
+
+
+@dataclass
+class Column:
+    letter: str
+    header: str
+    compute: Callable[[MetricsContext], Dict[str, object]]
+    needs_chain: bool = False
+    needs_earnings: bool = False
+    needs_prices: bool = True
+    by_header: bool = False      # placed wherever the sheet has `header`; the key is not a letter
+
+
+COLUMNS: Dict[str, Column] = {}
+
+
+def column(letter: str, header: str, needs_chain: bool = False, needs_earnings: bool = False,
+           needs_prices: bool = True, by_header: bool = False):
+    # Register a sheet column; compute() returns {ticker: value}
+    def deco(fn):
+        COLUMNS[letter] = Column(letter, header, fn, needs_chain, needs_earnings, needs_prices, by_header)
+        return fn
+    return deco
+
+
+# ───────── helpers ─────────
+def _round(val, digits: int = 4):
+    try:
+        val = float(val)
+    except (TypeError, ValueError):
+        return "N/A"
+    return round(val, digits) if np.isfinite(val) else "N/A"
+
+
+# ───────── columns ─────────
+@column("B", "ATR %")
+def atr_pct_col(ctx: MetricsContext):
+    return ctx.from_state(TickerState.atr_pct_now, 15)
+
+
+@column("C", "IV Rank", needs_chain=True)
+def iv_rank_col(ctx: MetricsContext):
+    out = {}
+    for t in ctx.tickers:
+        chain = ctx.chains.get(t)
+        if chain is None:
+            out[t] = "N/A"
+            continue
+        # Our own inversion of the quotes; stale/zero vendor IVs only fill strikes we could not solve
+        st = ctx.states.get(t)
+        spot = st.prev_close if st is not None else np.nan
+        if np.isfinite(spot):
+            all_iv = chain_ivs(chain.calls, chain.puts, spot, getattr(chain, "expiry", None), ctx.today)["iv"].dropna()
+        else:
+            all_iv = chain_ivs(chain.calls, chain.puts, spot)["iv"].dropna()
+        if all_iv.empty:
+            out[t] = "N/A"
+            continue
+        iv_now, iv_min, iv_max = all_iv.mean(), all_iv.min(), all_iv.max()
+        iv_rank = ((iv_now - iv_min) / (iv_max - iv_min)) * 100 if (iv_max - iv_min) != 0 else 50
+        out[t] = _round(iv_rank)
+    return out
+
+
+@column("D", "Next Earnings", needs_earnings=True, needs_prices=False)
+def next_earnings_col(ctx: MetricsContext):
+    # Local read of the shared cache; a failed pull still falls back on the catalysts / CSV dates
+    cache = default_earnings()
+    out = {}
+    for t in ctx.tickers:
+        nxt = cache.upcoming(t, ctx.today)
+        if nxt is not None:
+            out[t] = str(nxt)
+        else:
+            out[t] = "Error" if cache.failed(t) else "N/A"
+    return out
+
+
+@column("P", "IV Rank Change (5-day delta)")
+def iv_rank_change_col(ctx: MetricsContext):
+    # Realized-vol proxy: rank of 20-day return std, today vs 5 sessions ago
+    return ctx.from_state(TickerState.vol_rank_change, 30)
+
+
+@column("Q", "ATR% Z-Score")
+def atr_zscore_col(ctx: MetricsContext):
+    return ctx.from_state(TickerState.atr_pct_z, 25)
+
+
+@column("R", "20 Day ATR")
+def atr20_col(ctx: MetricsContext):
+    return ctx.from_state(TickerState.atr20_value, 22)
+
+
+@column("S", "ATR20 Z (6mo)")
+def atr20_zscore_col(ctx: MetricsContext):
+    return ctx.from_state(TickerState.atr20_z, 30)
+
+
+@column("AD", "ATM Strike", needs_chain=True)
+def atm_strike_col(ctx: MetricsContext):
+    out = {}
+    for t in ctx.tickers:
+        chain = ctx.chains.get(t)
+        st = ctx.states.get(t)
+        spot = st.prev_close if st is not None else np.nan
+        if chain is None or chain[0].empty or not np.isfinite(spot):
+            out[t] = "N/A"
+            continue
+        strikes = chain[0]["strike"].to_numpy(dtype=float)
+        out[t] = int(round(strikes[np.abs(strikes - spot).argmin()]))  # No decimals!
+    return out
+
+
+def _history(ctx: MetricsContext) -> Dict[str, Optional[dict]]:
+    # Backtest history for each row's recommended setup, from the rollup cube (local read)
+    if "history" not in ctx.cache:
+        from rollup_cube import default_cube
+        recs = {r["ticker"]: r for r in default_mirror().records()}
+        asks = {}
+        for t in ctx.tickers:
+            rec = recs.get(t, {})
+            setup = str(rec.get(SETUP_HEADER) or "").strip()
+            if setup and setup != "N/A":
+                asks[t] = (t, setup, str(rec.get(SECTOR_HEADER) or "").strip() or None)
+        found = dict(zip(asks, default_cube().estimate_many(asks.values())))
+        ctx.cache["history"] = {t: found.get(t) for t in ctx.tickers}
+    return ctx.cache["history"]
+
+
+@column("CONF", "Confidence (3 MAX)", needs_prices=False, by_header=True)
+def confidence_col(ctx: MetricsContext):
+    from rollup_cube import default_cube
+    cube = default_cube()
+    return {t: "N/A" if est is None else cube.confidence(est) for t, est in _history(ctx).items()}
+
+
+@column("PLE", "P/L Estimate (units of ATR%)", needs_prices=False, by_header=True)
+def pl_estimate_col(ctx: MetricsContext):
+    return {t: "N/A" if est is None else _round(est["mean"], 2) for t, est in _history(ctx).items()}
+
+
+# ───────── snapshots ─────────
+def fetch_front_chain(ticker: str) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+    return default_provider().front_chain(ticker)  # front month, (calls, puts)
+
+
+def build_context(tickers: Iterable[str], letters: Iterable[str],
+                  store: Optional[PriceStore] = None,
+                  scheduler: Optional[FetchScheduler] = None,
+                  states: Optional[RollingStates] = None) -> MetricsContext:
+    store = store or default_store()
+    scheduler = scheduler or default_scheduler()
+    cols = [COLUMNS[L] for L in letters]
+    uniq = list(dict.fromkeys(t for t in tickers if is_valid_ticker(t)))
+    today = pd.Timestamp.today().normalize()
+
+    ctx = MetricsContext(uniq, {}, today, store)
+    if any(c.needs_prices for c in cols):
+        # Nightly path: only bars after each ticker's saved state are fetched and folded in
+        with timer("metrics.prices"):
+            ctx.states = (states or RollingStates()).refresh(uniq, store, scheduler)
+    # Failures stay None per ticker; columns render them as N/A / Error
+    if any(c.needs_chain for c in cols):
+        ctx.chains = dict(zip(uniq, scheduler.values(fetch_front_chain, uniq, label="option chain")))
+    if any(c.needs_earnings for c in cols):
+        # Only tickers past their TTL are re-queried; the rest are already in the calendar
+        with timer("metrics.earnings"):
+            default_earnings().refresh(uniq, scheduler=scheduler)
+    return ctx
+
+
+# ───────── engine ─────────
+def compute(rows: List[str], letters: Iterable[str] = DEFAULT_LAYOUT,
+            store: Optional[PriceStore] = None) -> Dict[str, List[object]]:
+    """Values per column letter, aligned with ``rows`` (the sheet's column A)."""
+    letters = list(letters)
+    ctx = build_context(rows, letters, store)
+    out = {}
+    for L in letters:
+        with timer(f"metrics.column.{L}"):
+            vals = COLUMNS[L].compute(ctx)
+        out[L] = [vals.get(t, "N/A") if t else "" for t in rows]
+    return out
+
+
+def sheet_letter(key: str, header: List[str]) -> Optional[str]:
+    # Column key -> A1 letter; by-header columns are looked up in the mirrored header row
+    col = COLUMNS.get(key)
+    if col is None or not col.by_header:
+        return key
+    names = [h.strip() for h in header]
+    return col_letter(names.index(col.header) + 1) if col.header in names else None
+
+
+def write(sheet, columns: Dict[str, List[object]], start_row: int = 2) -> int:
+    # Diff against one grid read; only changed cells go out, in one batch_update
+    writer = SheetWriter(sheet)
+    for L, vals in columns.items():
+        writer.set_column(L, vals, start_row)
+    return writer.flush()
+
+
+def run(letters: Iterable[str] = DEFAULT_LAYOUT, sheet=None,
+        store: Optional[PriceStore] = None, mirror: Optional[SheetMirror] = None) -> Dict[str, List[object]]:
+    sheet = sheet or open_tracker()
+    mirror = mirror or default_mirror()
+    with timer("sheets.mirror_refresh"):
+        mirror.refresh(sheet)                  # full fetch only if the revision moved
+    rows = mirror.tickers()
+    columns = compute(rows, letters, store)
+    header = mirror.header()
+    placed = {}
+    for key, vals in columns.items():
+        letter = sheet_letter(key, header)
+        if letter is None:
+            print(f"⚠️ No '{COLUMNS[key].header}' column in the sheet; skipped")
+        else:
+            placed[letter] = vals
+    if write(sheet, placed):
+        mirror.invalidate()
+    print(f"✅ Columns {', '.join(placed)} updated for {len(rows)} rows.")
+    return columns
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,202 @@
+# parallel_backtest.py — main_cleaned.simulate_trades sharded over a process pool, bars shared via memmapped .npy
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import count, timer
+
+# ───────── config ─────────
+MMAP_DIR = os.path.join("data", "bt_mmap")
+TASKS_PER_WORKER = 4     # small tasks keep every core busy to the end (uneven histories)
+
+TRADE_DTYPE = np.dtype([
+    ("ticker", "i4"), ("open_date", "i8"), ("close_date", "i8"), ("strategy", "i1"),
+    ("entry_price", "f8"), ("exit_price", "f8"), ("entry_iv", "f8"), ("exit_iv", "f8"), ("pnl", "f8"),
+])
+STRATEGIES = ("Long ATM Straddle", "Iron Condor", "Vertical Call")
+
+
+# ───────── shared bars ─────────
+def export_bars(tickers: Sequence[str], root: str = MMAP_DIR) -> str:
+    """Write every ticker's cleaned history into one flat bars/dates pair plus offsets."""
+    from main_cleaned import END_DATE, START_DATE, get_price_history
+    from price_store import default_store
+
+    # One bulk, scheduled prefetch; the loop below only reads the store
+    with timer("backtest.prefetch"):
+        default_store().ensure_many(tickers, START_DATE, END_DATE)
+    frames, columns = [], None
+    for t in tickers:
+        try:
+            df = get_price_history(t, fetch=False)
+        except Exception as e:
+            print(f"{t} error (prices): {e}")
+            df = pd.DataFrame()
+        if columns is None and not df.empty:
+            columns = list(df.columns)
+        frames.append(df)
+    columns = columns or ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+    lengths = [len(f) for f in frames]
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+
+    tmp = root + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    bars = np.lib.format.open_memmap(os.path.join(tmp, "bars.npy"), mode="w+", dtype="f8",
+                                     shape=(int(offsets[-1]), len(columns)))
+    dates = np.lib.format.open_memmap(os.path.join(tmp, "dates.npy"), mode="w+", dtype="i8",
+                                      shape=(int(offsets[-1]),))
+    for i, df in enumerate(frames):
+        if df.empty:
+            continue
+        o0, o1 = offsets[i], offsets[i + 1]
+        bars[o0:o1] = df.reindex(columns=columns).to_numpy(dtype=float)
+        dates[o0:o1] = df.index.asi8
+    bars.flush()
+    dates.flush()
+    del bars, dates
+    np.save(os.path.join(tmp, "offsets.npy"), offsets)
+    with open(os.path.join(tmp, "meta.json"), "w") as fh:
+        json.dump({"tickers": list(tickers), "columns": columns}, fh)
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp, root)
+    return root
+
+
+class Bars:
+    """Read-only view over an export; frames are built from memmap slices, never pickled."""
+
+    def __init__(self, root: str = MMAP_DIR):
+        with open(os.path.join(root, "meta.json")) as fh:
+            meta = json.load(fh)
+        self.tickers: List[str] = meta["tickers"]
+        self.columns: List[str] = meta["columns"]
+        self.bars = np.load(os.path.join(root, "bars.npy"), mmap_mode="r")
+        self.dates = np.load(os.path.join(root, "dates.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(root, "offsets.npy"))
+
+    def rows(self, i: int) -> int:
+        return int(self.offsets[i + 1] - self.offsets[i])
+
+    def frame(self, i: int) -> pd.DataFrame:
+        o0, o1 = self.offsets[i], self.offsets[i + 1]
+        index = pd.DatetimeIndex(np.asarray(self.dates[o0:o1]).view("M8[ns]"), name="Date")
+        return pd.DataFrame(self.bars[o0:o1], index=index, columns=self.columns)
+
+
+# ───────── compact results ─────────
+def pack_trades(idx: int, trades) -> np.ndarray:
+    out = np.empty(len(trades), dtype=TRADE_DTYPE)
+    for k, t in enumerate(trades):
+        out[k] = (idx, pd.Timestamp(t.open_date).value, pd.Timestamp(t.close_date).value,
+                  STRATEGIES.index(t.strategy), t.entry_price, t.exit_price, t.entry_iv, t.exit_iv, t.pnl)
+    return out
+
+
+def unpack_trades(arr: np.ndarray, tickers: Sequence[str]):
+    from main_cleaned import Trade
+    return [Trade(tickers[r["ticker"]], pd.Timestamp(int(r["open_date"])), pd.Timestamp(int(r["close_date"])),
+                  STRATEGIES[r["strategy"]], float(r["entry_price"]), float(r["exit_price"]),
+                  float(r["entry_iv"]), float(r["exit_iv"]), float(r["pnl"])) for r in arr]
+
+
+# ───────── workers ─────────
+_bars: Optional[Bars] = None
+_events: Dict[str, Dict[str, pd.Timestamp]] = {}
+
+
+def _init(root: str, events: Dict[str, Dict[str, pd.Timestamp]]) -> None:
+    global _bars, _events
+    _bars, _events = Bars(root), events
+
+
+def _simulate(ids: List[int]) -> List[Tuple[int, np.ndarray]]:
+    from main_cleaned import simulate_trades
+    out = []
+    for i in ids:
+        t = _bars.tickers[i]
+        try:
+            trades = simulate_trades(t, _events.get(t, {}), _bars.frame(i)) if _bars.rows(i) else []
+        except Exception as e:
+            print(f"{t} error: {e}")
+            trades = []
+        out.append((i, pack_trades(i, trades)))
+    return out
+
+
+def _shards(bars: Bars, n_tasks: int) -> List[List[int]]:
+    # Longest-first round robin so each task gets a similar number of bars
+    order = sorted(range(len(bars.tickers)), key=lambda i: -bars.rows(i))
+    n_tasks = max(1, min(n_tasks, len(order)))
+    return [order[k::n_tasks] for k in range(n_tasks)]
+
+
+def run(tickers: Optional[Sequence[str]] = None, events: Optional[Dict[str, Dict[str, pd.Timestamp]]] = None,
+        workers: Optional[int] = None, root: str = MMAP_DIR, export: bool = True) -> np.ndarray:
+    """All trades as one TRADE_DTYPE array, in ticker order then event order (same as the serial loop)."""
+    if events is None:
+        from main_cleaned import load_catalysts
+        events = load_catalysts()
+    tickers = list(tickers if tickers is not None else events)
+    if export:
+        with timer("backtest.export_bars"):
+            export_bars(tickers, root)
+    bars = Bars(root)
+    workers = workers or os.cpu_count() or 1
+    shards = _shards(bars, workers * TASKS_PER_WORKER)
+    sub_events = {t: events.get(t, {}) for t in tickers}
+
+    # Worker processes have their own registries; the pool is timed as one stage from here
+    with timer("backtest.pool"):
+        if workers == 1:
+            _init(root, sub_events)
+            parts = [p for ids in shards for p in _simulate(ids)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init, initargs=(root, sub_events)) as pool:
+                parts = [p for chunk in pool.map(_simulate, shards) for p in chunk]
+    count("backtest.trades", sum(len(p[1]) for p in parts))
+
+    # Deterministic merge: by ticker position, each ticker's trades keep their event order
+    parts.sort(key=lambda p: p[0])
+    return np.concatenate([p[1] for p in parts]) if parts else np.empty(0, TRADE_DTYPE)
+
+
+def to_frame(arr: np.ndarray, tickers: Sequence[str]) -> pd.DataFrame:
+    return pd.DataFrame([t.__dict__ for t in unpack_trades(arr, tickers)])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Parallel main_cleaned backtest")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--compare", action="store_true", help="also run the serial loop and check equality")
+    ap.add_argument("--out", default="backtest_results.csv")
+    args = ap.parse_args(argv)
+
+    from main_cleaned import load_catalysts, simulate_trades
+    catalysts = load_catalysts()
+    tickers = list(catalysts)
+    t0 = time.perf_counter()
+    arr = run(tickers, catalysts, args.workers)
+    res = to_frame(arr, tickers)
+    print(f"✅ {len(arr)} trades from {len(tickers)} tickers in {time.perf_counter() - t0:.2f}s")
+    if args.compare:
+        serial = pd.DataFrame([t.__dict__ for tk in tickers for t in simulate_trades(tk, catalysts[tk])])
+        same = serial.reset_index(drop=True).equals(res.reset_index(drop=True))
+        print("Serial run identical" if same else "❌ Serial run differs")
+    if not res.empty:
+        res["win"] = res["pnl"] > 0         # same columns as main_cleaned's backtest_results.csv
+        res.to_csv(args.out, index=False)
+        print(f"Saved to {args.out}")
+        from results_store import record_run
+        record_run("parallel_backtest", res)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+# price_store.py — persistent per-ticker OHLCV store (one compressed columnar file per ticker)
+import os
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import count, timer
+
+# ───────── config ─────────
+STORE_DIR = os.path.join("data", "prices")
+COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+DEFAULT_START = "2015-01-01"
+BULK_CHUNK = 50          # tickers per provider.history call in ensure_many
+QUIET_BDAYS = 2          # a gap this short may really have no bars (weekend/holiday edges)
+
+Fetcher = Callable[[str, pd.Timestamp, pd.Timestamp], pd.DataFrame]
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    if df is None or df.empty:
+        return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([]), dtype=float)
+    df = df.loc[:, ~df.columns.duplicated(keep="last")]
+    if "Adj Close" not in df.columns:
+        df = df.assign(**{"Adj Close": df["Close"]})
+    df = df.reindex(columns=COLUMNS).astype(float)
+    idx = pd.to_datetime(df.index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    df.index = idx.normalize()
+    df = df.loc[~df.index.duplicated(keep="last")].sort_index()
+    return df.dropna(subset=["Close"])
+
+
+def adjust(df: pd.DataFrame) -> pd.DataFrame:
+    # Same ratio yfinance applies for auto_adjust=True
+    ratio = df["Adj Close"] / df["Close"]
+    out = df.drop(columns="Adj Close").copy()
+    for col in ("Open", "High", "Low", "Close"):
+        out[col] = out[col] * ratio
+    return out
+
+
+# ───────── store ─────────
+class PriceStore:
+    """Daily bars per ticker on disk, served from memory after first load.
+
+    Each file records the date range [lo, hi) the network has answered for,
+    so holidays/weekends at the edges never trigger a refetch and a second
+    run on the same day makes no network calls at all. A gap only joins the
+    range if it came back with bars or is too short to be sure it had any;
+    an empty answer for anything longer is treated as a failed fetch.
+
+    Bars come from ``provider`` (default_provider() when None) unless a
+    per-ticker ``fetcher`` is given.
+    """
+
+    def __init__(self, root: str = STORE_DIR, fetcher: Optional[Fetcher] = None, provider=None):
+        self.root = root
+        self.fetcher = fetcher
+        self.provider = provider
+        self.fetch_count = 0
+        self._lock = threading.Lock()
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._ranges: Dict[str, tuple] = {}
+        os.makedirs(root, exist_ok=True)
+
+    # ---- disk ----
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker.upper()}.npz")
+
+    def _load(self, ticker: str) -> None:
+        if ticker in self._frames:
+            return
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            self._frames[ticker] = _normalize(None)
+            self._ranges[ticker] = None
+            return
+        with np.load(path) as z:
+            idx = pd.DatetimeIndex(z["dates"].astype("datetime64[D]").astype("datetime64[ns]"))
+            self._frames[ticker] = pd.DataFrame({c: z[c] for c in COLUMNS}, index=idx)
+            self._ranges[ticker] = (pd.Timestamp(z["lo"].item()), pd.Timestamp(z["hi"].item()))
+
+    def _save(self, ticker: str) -> None:
+        df = self._frames[ticker]
+        lo, hi = self._ranges[ticker]
+        tmp = self._path(ticker) + ".tmp.npz"
+        np.savez_compressed(
+            tmp,
+            dates=df.index.values.astype("datetime64[D]"),
+            lo=np.datetime64(lo.date(), "D"),
+            hi=np.datetime64(hi.date(), "D"),
+            **{c: df[c].to_numpy(dtype=float) for c in COLUMNS},
+        )
+        os.replace(tmp, self._path(ticker))
+
+    # ---- fetch ----
+    def _provider(self):
+        if self.provider is None:
+            from market_data import default_provider
+            return default_provider()
+        return self.provider
+
+    def _fetch(self, ticker: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        with self._lock:
+            self.fetch_count += 1
+        count("prices.fetch_calls")
+        with timer("prices.fetch"):
+            if self.fetcher is not None:
+                return self.fetcher(ticker, start, end)
+            return self._provider().download(ticker, start, end)
+
+    @staticmethod
+    def _span(start, end):
+        start = pd.Timestamp(start).normalize()
+        end = pd.Timestamp(end).normalize() if end is not None else pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+        return start, end
+
+    def _missing(self, ticker: str, start: pd.Timestamp, end: pd.Timestamp):
+        today = pd.Timestamp.today().normalize()
+        end = min(end, today + pd.Timedelta(days=1))
+        rng = self._ranges.get(ticker)
+        if rng is None:
+            return [(start, end)]
+        lo, hi = rng
+        gaps = []
+        if start < lo:
+            gaps.append((start, lo))
+        if end > hi:
+            # Re-pull the last stored bar too: it may have been a partial session
+            df = self._frames[ticker]
+            last = df.index[-1] if len(df) else hi
+            gaps.append((min(hi, last), end))
+        return gaps
+
+    def ensure(self, ticker: str, start=DEFAULT_START, end=None) -> bool:
+        """Make sure [start, end) is on disk; returns True if the network was hit.
+
+        A gap whose fetch raised is left uncovered and the error re-raised once the
+        others are saved, so a scheduler retry only re-pulls what is still missing.
+        """
+        start, end = self._span(start, end)
+        self._load(ticker)
+        gaps = self._missing(ticker, start, end)
+        if not gaps:
+            count("prices.cache_hit")
+            return False
+        count("prices.cache_miss")
+        fetched, error = [], None
+        for g0, g1 in gaps:
+            if g0 >= g1:
+                continue
+            try:
+                fetched.append(((g0, g1), self._fetch(ticker, g0, g1)))
+            except Exception as e:
+                error = error or e
+        self._commit(ticker, fetched)
+        if error is not None:
+            raise error
+        return True
+
+    def _quiet(self, ticker: str, g0: pd.Timestamp, g1: pd.Timestamp) -> bool:
+        # No bars is believable only for a short gap holding none of our stored sessions
+        days = pd.bdate_range(g0, g1 - pd.Timedelta(days=1))
+        return len(days) <= QUIET_BDAYS and not days.isin(self._frames[ticker].index).any()
+
+    def _commit(self, ticker: str, fetched) -> bool:
+        """Fold [((g0, g1), frame)] in; returns True if every gap now counts as covered."""
+        frames, covered = [self._frames[ticker]], []
+        for (g0, g1), f in fetched:
+            f = _normalize(f)
+            frames.append(f)
+            if len(f) or self._quiet(ticker, g0, g1):
+                covered.append((g0, g1))
+            else:
+                count("prices.empty_gap")
+        merged = pd.concat(frames)
+        merged = merged.loc[~merged.index.duplicated(keep="last")].sort_index()
+        self._frames[ticker] = merged
+
+        rng = self._ranges.get(ticker)
+        for g0, g1 in sorted(covered):
+            if rng is None:
+                rng = (g0, g1)
+            elif g0 <= rng[1] and g1 >= rng[0]:
+                rng = (min(rng[0], g0), max(rng[1], g1))
+        self._ranges[ticker] = rng
+        if rng is not None:
+            with timer("disk.prices_save"):
+                self._save(ticker)
+        return len(covered) == len(fetched)
+
+    def ensure_many(self, tickers: Iterable[str], start=DEFAULT_START, end=None,
+                    scheduler=None) -> int:
+        """ensure() for many tickers; returns how many hit the network and came back covered."""
+        from fetch_scheduler import default_scheduler
+        scheduler = scheduler or default_scheduler()
+        tickers = list(dict.fromkeys(tickers))
+        if self.fetcher is not None:
+            # Concurrent: each ticker owns its own file and frame, so workers never collide
+            hits = scheduler.values(lambda t: self.ensure(t, start, end), tickers, default=False, label="prices")
+            return sum(bool(h) for h in hits)
+        return self._ensure_bulk(tickers, start, end, scheduler)
+
+    def _ensure_bulk(self, tickers, start, end, scheduler) -> int:
+        # Tickers sharing a gap go to the provider together, BULK_CHUNK per call
+        start, end = self._span(start, end)
+        gaps: Dict[str, list] = {}
+        by_gap: Dict[tuple, list] = {}
+        for t in tickers:
+            self._load(t)
+            g = [(g0, g1) for g0, g1 in self._missing(t, start, end) if g0 < g1]
+            count("prices.cache_miss" if g else "prices.cache_hit")
+            if g:
+                gaps[t] = g
+                for gap in g:
+                    by_gap.setdefault(gap, []).append(t)
+        jobs = [(gap, ts[i:i + BULK_CHUNK]) for gap, ts in by_gap.items() for i in range(0, len(ts), BULK_CHUNK)]
+        provider = self._provider()
+
+        def pull(job):
+            (g0, g1), batch = job
+            count("prices.fetch_calls")
+            with timer("prices.fetch"):
+                return provider.history(batch, g0, g1)
+
+        fetched: Dict[str, list] = {t: [] for t in gaps}
+        failed = set()
+        for r in scheduler.map(pull, jobs):
+            (gap, batch) = r.key
+            if not r.ok:
+                print(f"{len(batch)} tickers error (prices): {r.error}")
+                failed.update(batch)
+                continue
+            for t in batch:
+                fetched[t].append((gap, r.value.get(t)))
+        with self._lock:
+            self.fetch_count += len(jobs)
+        # A ticker only records its new range if every one of its gap requests succeeded. One left
+        # out of a batch result got no bars: _commit only counts that as covered for a weekend/
+        # holiday edge, otherwise the range stays put and the next run asks again
+        done, empty = 0, []
+        for t in gaps:
+            if t in failed:
+                continue
+            if self._commit(t, fetched[t]):
+                done += 1
+            else:
+                empty.append(t)
+        if empty:
+            count("prices.empty_tickers", len(empty))
+            print(f"{len(empty)} tickers came back without bars (prices): {', '.join(sorted(empty)[:10])}")
+        return done
+
+    # ---- reads ----
+    def get(self, ticker: str, start=None, end=None, adjusted: bool = False,
+            fetch: bool = True) -> pd.DataFrame:
+        """Bars in [start, end) like ``yf.download``; fetches gaps unless ``fetch=False``."""
+        if fetch:
+            self.ensure(ticker, start if start is not None else DEFAULT_START, end)
+        else:
+            self._load(ticker)
+        df = self._frames[ticker]
+        if start is not None:
+            df = df.loc[df.index >= pd.Timestamp(start)]
+        if end is not None:
+            df = df.loc[df.index < pd.Timestamp(end)]
+        return adjust(df) if adjusted else df.copy()
+
+    def panel(self, tickers: Iterable[str], start=None, end=None, adjusted: bool = True,
+              fetch: bool = True) -> pd.DataFrame:
+        """Multi-ticker frame with (field, ticker) columns on the union of trading dates."""
+        tickers = list(dict.fromkeys(tickers))
+        if fetch:
+            self.ensure_many(tickers, start if start is not None else DEFAULT_START, end)
+        frames = {t: self.get(t, start, end, adjusted=adjusted, fetch=False) for t in tickers}
+        if not frames:
+            return pd.DataFrame()
+        wide = pd.concat(frames, axis=1)  # (ticker, field)
+        return wide.swaplevel(axis=1).sort_index(axis=1, level=0)
+
+    def last_date(self, ticker: str) -> Optional[pd.Timestamp]:
+        self._load(ticker)
+        df = self._frames[ticker]
+        return df.index[-1] if len(df) else None
+
+
+_default_store: Optional[PriceStore] = None
+
+
+def default_store() -> PriceStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = PriceStore()
+    return _default_store
@@ -0,0 +1,111 @@
+# result_cache.py — per-event backtest results in SQLite, keyed by (ticker, event, params hash) and stamped with a data version
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ───────── config ─────────
+CACHE_PATH = os.path.join("data", "backtest_cache.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    engine      TEXT NOT NULL,
+    ticker      TEXT NOT NULL,
+    event_date  TEXT NOT NULL,
+    params      TEXT NOT NULL,
+    version     TEXT NOT NULL,
+    record      TEXT,              -- JSON row; NULL when the event was evaluated and skipped
+    computed_at REAL NOT NULL,
+    PRIMARY KEY (engine, ticker, event_date, params)
+);
+"""
+
+
+# ───────── keys ─────────
+def params_hash(params: dict) -> str:
+    """Stable short hash of the strategy parameters (anything that changes a result)."""
+    blob = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+def window_version(bars: pd.DataFrame, start, end, extra: Iterable = ()) -> str:
+    # Bars the event actually reads (warm-up through exit) plus any other inputs, e.g. archived IVs.
+    # New bars after `end` leave it alone; split/dividend re-adjustments change it.
+    idx = bars.index
+    lo, hi = idx.searchsorted(pd.Timestamp(start)), idx.searchsorted(pd.Timestamp(end), side="right")
+    arr = bars[["Open", "High", "Low", "Close"]].to_numpy(dtype=np.float64)[lo:hi]
+    crc = zlib.crc32(idx.asi8[lo:hi].tobytes() + np.ascontiguousarray(arr).tobytes())
+    crc = zlib.crc32(json.dumps(list(extra), default=str).encode(), crc)
+    return f"{crc:08x}"
+
+
+# ───────── cache ─────────
+class ResultCache:
+    """Write-through store for event results; committed per batch so an interrupted run resumes where it stopped."""
+
+    def __init__(self, engine: str, path: str = CACHE_PATH):
+        self.engine = engine
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    @staticmethod
+    def _date(d) -> str:
+        return str(pd.Timestamp(d).date())
+
+    def lookup(self, ticker: str, params: str, versions: Dict[object, str]) -> Tuple[Dict[object, Optional[dict]], List[object]]:
+        """Split {event_date: version} into (cached results, dates to compute)."""
+        rows = self.db.execute(
+            "SELECT event_date, version, record FROM results WHERE engine = ? AND ticker = ? AND params = ?",
+            (self.engine, ticker, params)).fetchall()
+        have = {d: (v, rec) for d, v, rec in rows}
+        cached, todo = {}, []
+        for d, version in versions.items():
+            hit = have.get(self._date(d))
+            if hit is not None and hit[0] == version:
+                cached[d] = None if hit[1] is None else json.loads(hit[1])
+            else:
+                todo.append(d)
+        return cached, todo
+
+    def store(self, ticker: str, params: str, results: Dict[object, Tuple[str, Optional[dict]]]) -> None:
+        # {event_date: (version, record or None)} in one transaction
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(self.engine, ticker, self._date(d), params, v, None if rec is None else json.dumps(rec, default=str), now)
+                 for d, (v, rec) in results.items()])
+
+    def forget(self, ticker: str, event_dates: Iterable) -> int:
+        """Drop the ticker's results for dates no longer among its events (from the oldest listed on).
+
+        A report date the calendar withdrew (e.g. a projection that moved) must not stay a cached trade.
+        """
+        keep = sorted({self._date(d) for d in event_dates})
+        if not keep:
+            return 0
+        marks = ",".join("?" * len(keep))
+        with self.db:
+            cur = self.db.execute(
+                f"DELETE FROM results WHERE engine = ? AND ticker = ? AND event_date >= ? AND event_date NOT IN ({marks})",
+                (self.engine, ticker, keep[0], *keep))
+        return cur.rowcount
+
+    def prune(self, params: str) -> int:
+        """Drop rows computed under other parameter sets for this engine."""
+        with self.db:
+            cur = self.db.execute("DELETE FROM results WHERE engine = ? AND params != ?", (self.engine, params))
+        return cur.rowcount
+
+    def close(self) -> None:
+        self.db.close()
@@ -0,0 +1,378 @@
+# results_store.py — typed, append-only backtest results: columnar .npy parts per (run, ticker), manifest pushdown, memmapped reads
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ───────── config ─────────
+RESULTS_DIR = os.path.join("data", "results")
+MANIFEST = "manifest.json"
+
+# Declared schema: one .npy per column per part. `strategy` is a code into manifest["strategies"];
+# the ticker is the partition key and is not stored per row.
+SCHEMA: Dict[str, str] = {
+    "event_date": "datetime64[D]",
+    "entry_date": "datetime64[D]",
+    "exit_date": "datetime64[D]",
+    "strategy": "i2",
+    "entry_price": "f8",
+    "exit_price": "f8",
+    "ret": "f8",              # underlying exit / entry - 1
+    "pnl": "f8",              # the engine's headline P/L as it reported it
+    "atr": "f8",
+    "atr_pct": "f8",
+    "iv_rank": "f8",
+    "entry_iv": "f8",
+    "exit_iv": "f8",
+    "option_entry": "f8",
+    "option_exit": "f8",
+    "option_pnl": "f8",
+    "max_loss": "f8",
+    "ror": "f8",
+    "delta": "f8",
+    "vega": "f8",
+    "theta": "f8",
+}
+DATE_COLS = ("event_date", "entry_date", "exit_date")
+
+# Every column name the engines / legacy CSVs have used -> schema name
+ALIASES = {
+    "Ticker": "ticker", "ticker": "ticker",
+    "Earnings Date": "event_date",
+    "Entry Date": "entry_date", "open_date": "entry_date", "Buy Date": "entry_date",
+    "Exit Date": "exit_date", "close_date": "exit_date", "Sell Date": "exit_date",
+    "Strategy": "strategy",
+    "Entry Price": "entry_price", "Buy Price": "entry_price",
+    "Exit Price": "exit_price", "Sell Price": "exit_price",
+    "P/L": "ret", "Return (%)": "ret_pct",
+    "ATR(14)": "atr", "ATR%": "atr_pct", "IV Rank": "iv_rank",
+    "Entry IV": "entry_iv", "Exit IV": "exit_iv",
+    "Option Entry": "option_entry", "Option Exit": "option_exit", "Option P/L": "option_pnl",
+    "Max Loss": "max_loss", "Return on Risk": "ror", "Delta": "delta", "Vega": "vega", "Theta": "theta",
+}
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|NaN")
+
+
+# ───────── normalize ─────────
+def _scalar(cell) -> float:
+    # Legacy writers stored whole pandas Series reprs ("Ticker\nAAPL    209.0\nName: ..., dtype: float64");
+    # a one-row Series is its value, anything longer is ambiguous -> NaN
+    if not isinstance(cell, str):
+        return np.nan if cell is None else float(cell)
+    s = cell.strip()
+    try:
+        return float(s)
+    except ValueError:
+        pass
+    rows = [ln for ln in s.splitlines()[1:] if ln.strip() and not ln.lstrip().startswith(("Name:", "dtype:", "Length:", ".."))]
+    if len(rows) != 1:
+        return np.nan
+    nums = _NUMBER.findall(rows[0])
+    return float(nums[-1]) if nums else np.nan
+
+
+def _numeric(col: pd.Series) -> np.ndarray:
+    if col.dtype == object:
+        col = col.map(_scalar)
+    return pd.to_numeric(col, errors="coerce").to_numpy(dtype="f8")
+
+
+def normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Any engine / legacy frame -> schema columns with schema dtypes (strategy still as text)."""
+    df = df.rename(columns={c: ALIASES[c] for c in df.columns if c in ALIASES})
+    df = df.loc[:, ~df.columns.duplicated()]
+    n = len(df)
+    out = {"ticker": np.full(n, "", dtype=object)}
+    if "ticker" in df:
+        codes, uniq = pd.factorize(df["ticker"].astype(str))
+        out["ticker"] = np.array([u.upper() for u in uniq], dtype=object)[codes] if len(uniq) else out["ticker"]
+    for col, dtype in SCHEMA.items():
+        if col == "strategy":
+            out[col] = df[col].astype(object).fillna("").astype(str).to_numpy() if col in df else np.full(n, "")
+        elif col in DATE_COLS:
+            out[col] = (pd.to_datetime(df[col], errors="coerce").to_numpy().astype(dtype) if col in df
+                        else np.full(n, np.datetime64("NaT"), dtype=dtype))
+        else:
+            out[col] = _numeric(df[col]) if col in df else np.full(n, np.nan)
+    if "ret_pct" in df:
+        out["ret"] = np.where(np.isnan(out["ret"]), _numeric(df["ret_pct"]) / 100, out["ret"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        derived = out["exit_price"] / out["entry_price"] - 1
+    out["ret"] = np.where(np.isnan(out["ret"]), derived, out["ret"])
+    return pd.DataFrame(out)
+
+
+def _date_stats(arr: np.ndarray) -> Tuple[Optional[str], Optional[str]]:
+    ok = arr[~np.isnat(arr)]
+    return (str(ok.min()), str(ok.max())) if len(ok) else (None, None)
+
+
+# ───────── store ─────────
+class ResultsStore:
+    """Parts are written once (tmp dir + rename) and never rewritten; the manifest is the commit point."""
+
+    def __init__(self, root: str = RESULTS_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    # ---- manifest ----
+    def _read_manifest(self) -> dict:
+        path = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(path):
+            return {"schema": SCHEMA, "strategies": [], "runs": {}, "parts": []}
+        with open(path) as fh:
+            return json.load(fh)
+
+    def _write_manifest(self) -> None:
+        path = os.path.join(self.root, MANIFEST)
+        with open(path + ".tmp", "w") as fh:
+            json.dump(self.manifest, fh, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def _code(self, name: str) -> int:
+        names = self.manifest["strategies"]
+        if name not in names:
+            names.append(name)
+        return names.index(name)
+
+    # ---- runs ----
+    def new_run(self, engine: str, meta: Optional[dict] = None) -> str:
+        run = f"{time.strftime('%Y%m%dT%H%M%S')}-{engine}"
+        while run in self.manifest["runs"]:
+            run += "_"
+        self.manifest["runs"][run] = {"engine": engine, "created": time.time(), **(meta or {})}
+        self._write_manifest()
+        return run
+
+    def runs(self, engine: Optional[str] = None) -> List[str]:
+        return sorted(r for r, m in self.manifest["runs"].items() if engine is None or m["engine"] == engine)
+
+    def latest_run(self, engine: Optional[str] = None) -> Optional[str]:
+        runs = self.runs(engine)
+        return runs[-1] if runs else None
+
+    def drop_run(self, run: str) -> None:
+        self.manifest["parts"] = [p for p in self.manifest["parts"] if p["run"] != run]
+        self.manifest["runs"].pop(run, None)
+        self._write_manifest()
+        shutil.rmtree(os.path.join(self.root, f"run={run}"), ignore_errors=True)
+
+    # ---- writes ----
+    def append(self, run: str, df: pd.DataFrame) -> int:
+        """Normalize and append rows to `run`, one new part per ticker; returns rows written."""
+        if run not in self.manifest["runs"]:
+            raise KeyError(f"unknown run {run!r}; create it with new_run()")
+        if df is None or df.empty:
+            return 0
+        norm = normalize(df)
+        names, inv = np.unique(norm["strategy"].to_numpy(dtype=str), return_inverse=True)
+        norm["strategy"] = np.array([self._code(s) for s in names], dtype=SCHEMA["strategy"])[inv]
+        written = 0
+        seqs = Counter(p["ticker"] for p in self.manifest["parts"] if p["run"] == run)
+        for ticker, rows in norm.groupby("ticker", sort=True):
+            seq = seqs[ticker]
+            rel = os.path.join(f"run={run}", f"ticker={ticker}", f"part-{seq:05d}")
+            final = os.path.join(self.root, rel)
+            tmp = final + ".tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            for col, dtype in SCHEMA.items():
+                np.save(os.path.join(tmp, f"{col}.npy"), rows[col].to_numpy().astype(dtype))
+            os.replace(tmp, final)
+            ev = rows["event_date"].to_numpy().astype("datetime64[D]")
+            en = rows["entry_date"].to_numpy().astype("datetime64[D]")
+            self.manifest["parts"].append({
+                "run": run, "ticker": ticker, "path": rel, "rows": len(rows),
+                "event_date": list(_date_stats(ev)), "entry_date": list(_date_stats(en)),
+                "nat": {"event_date": int(np.isnat(ev).sum()), "entry_date": int(np.isnat(en).sum())},
+                "strategies": sorted(int(c) for c in np.unique(rows["strategy"])),
+            })
+            written += len(rows)
+        self._write_manifest()
+        return written
+
+    # ---- reads ----
+    def parts(self, run=None, tickers: Optional[Iterable[str]] = None, start=None, end=None,
+              strategies: Optional[Iterable[str]] = None, on: str = "event_date") -> List[dict]:
+        """Manifest-level pruning: only parts that can hold a matching row."""
+        runs = {run} if isinstance(run, str) else (set(run) if run is not None else None)
+        tickers = {t.upper() for t in tickers} if tickers is not None else None
+        codes = self._codes(strategies)
+        lo = str(pd.Timestamp(start).date()) if start is not None else None
+        hi = str(pd.Timestamp(end).date()) if end is not None else None
+        out = []
+        for p in self.manifest["parts"]:
+            if runs is not None and p["run"] not in runs:
+                continue
+            if tickers is not None and p["ticker"] not in tickers:
+                continue
+            if codes is not None and not codes.intersection(p["strategies"]):
+                continue
+            pmin, pmax = p[on]
+            if (lo or hi) and pmin is None:
+                continue
+            if (lo and pmax < lo) or (hi and pmin > hi):
+                continue
+            out.append(p)
+        return out
+
+    def _codes(self, strategies) -> Optional[set]:
+        if strategies is None:
+            return None
+        names = self.manifest["strategies"]
+        return {names.index(s) for s in ([strategies] if isinstance(strategies, str) else strategies) if s in names}
+
+    def scan(self, run=None, tickers=None, start=None, end=None, strategies=None,
+             columns: Optional[Sequence[str]] = None, on: str = "event_date") -> Iterator[Tuple[dict, Dict[str, np.ndarray]]]:
+        """(part, {column: array}) per matching part; arrays are memmaps unless a row filter applied."""
+        columns = list(columns or SCHEMA)
+        codes = self._codes(strategies)
+        lo = np.datetime64(pd.Timestamp(start).date()) if start is not None else None
+        hi = np.datetime64(pd.Timestamp(end).date()) if end is not None else None
+        for p in self.parts(run, tickers, start, end, strategies, on):
+            base = os.path.join(self.root, p["path"])
+
+            def col(name):
+                return np.load(os.path.join(base, f"{name}.npy"), mmap_mode="r")
+
+            # Row filters only where the part's stats don't already guarantee a match
+            mask = None
+            if codes is not None and not set(p["strategies"]) <= codes:
+                mask = np.isin(col("strategy"), list(codes))
+            if lo is not None or hi is not None:
+                pmin, pmax = p[on]
+                undated = p.get("nat", {}).get(on, 1)       # parts written before NaT counts: assume some
+                if (undated or (lo is not None and np.datetime64(pmin) < lo)
+                        or (hi is not None and np.datetime64(pmax) > hi)):
+                    d = col(on)
+                    m = ~np.isnat(d)
+                    if lo is not None:
+                        m &= d >= lo
+                    if hi is not None:
+                        m &= d <= hi
+                    mask = m if mask is None else mask & m
+            if mask is not None and not mask.any():
+                continue
+            arrays = {c: col(c) for c in columns}
+            if mask is not None and not mask.all():
+                arrays = {c: a[mask] for c, a in arrays.items()}
+            yield p, arrays
+
+    def query(self, run=None, tickers=None, start=None, end=None, strategies=None,
+              columns: Optional[Sequence[str]] = None, on: str = "event_date") -> pd.DataFrame:
+        """Matching rows as one DataFrame with ticker / strategy as categoricals."""
+        columns = list(columns or SCHEMA)
+        frames = []
+        for p, arrays in self.scan(run, tickers, start, end, strategies, columns, on):
+            n = len(next(iter(arrays.values()))) if arrays else p["rows"]
+            frames.append((p, n, arrays))
+        total = sum(n for _, n, _ in frames)
+        out = {"run": np.empty(total, dtype=object), "ticker": np.empty(total, dtype=object)}
+        out.update({c: np.empty(total, dtype=SCHEMA[c]) for c in columns})
+        i = 0
+        for p, n, arrays in frames:
+            out["run"][i:i + n] = p["run"]
+            out["ticker"][i:i + n] = p["ticker"]
+            for c in columns:
+                out[c][i:i + n] = arrays[c]
+            i += n
+        df = pd.DataFrame(out)
+        df["run"] = df["run"].astype("category")
+        df["ticker"] = df["ticker"].astype("category")
+        if "strategy" in df:
+            df["strategy"] = pd.Categorical.from_codes(df["strategy"].astype(int),
+                                                       categories=self.manifest["strategies"] or [""])
+        return df
+
+
+# ───────── legacy import ─────────
+LEGACY_CSVS = ("backtest_results.csv", "earnings_backtest_results.csv", "earnings_strategy_backtest.csv")
+
+
+def import_csv(path: str, store: Optional[ResultsStore] = None, engine: Optional[str] = None) -> Optional[str]:
+    """One legacy CSV -> a new run (engine defaults to the file stem); None if it holds no rows."""
+    store = store or default_results()
+    try:
+        df = pd.read_csv(path)
+    except pd.errors.EmptyDataError:
+        return None
+    if df.empty:
+        return None
+    run = store.new_run(engine or os.path.splitext(os.path.basename(path))[0],
+                        {"source": path, "imported": True})
+    store.append(run, df)
+    return run
+
+
+_default: Optional[ResultsStore] = None
+
+
+def default_results() -> ResultsStore:
+    global _default
+    if _default is None:
+        _default = ResultsStore()
+    return _default
+
+
+def record_run(engine: str, df: pd.DataFrame, meta: Optional[dict] = None) -> Optional[str]:
+    # Engine hook: one new run per backtest invocation
+    if df is None or df.empty:
+        return None
+    store = default_results()
+    run = store.new_run(engine, meta)
+    n = store.append(run, df)
+    print(f"Stored {n} rows as run {run} in {store.root}")
+    from rollup_cube import record
+    record(engine, df)                 # keep that engine's aggregate cube current
+    return run
+
+
+# ───────── main ─────────
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Typed backtest results store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("import", help="load legacy CSV outputs as runs")
+    p.add_argument("paths", nargs="*", default=list(LEGACY_CSVS))
+    sub.add_parser("runs", help="list runs")
+    p = sub.add_parser("query", help="filtered rows (pushdown on run / ticker / date / strategy)")
+    p.add_argument("--run", default=None, help="run id, or 'latest'")
+    p.add_argument("--engine", default=None, help="with --run latest")
+    p.add_argument("--ticker", nargs="+", default=None)
+    p.add_argument("--strategy", nargs="+", default=None)
+    p.add_argument("--start", default=None)
+    p.add_argument("--end", default=None)
+    p.add_argument("--on", choices=list(DATE_COLS), default="event_date")
+    p.add_argument("--out", default=None, help="write CSV instead of printing")
+    args = ap.parse_args(argv)
+
+    store = default_results()
+    if args.cmd == "import":
+        for path in args.paths:
+            run = import_csv(path, store) if os.path.exists(path) else None
+            print(f"{path}: {'run ' + run if run else 'nothing to import'}")
+    elif args.cmd == "runs":
+        for run in store.runs():
+            parts = [p for p in store.manifest["parts"] if p["run"] == run]
+            print(f"{run:<48} {len(parts):5d} parts {sum(p['rows'] for p in parts):9d} rows")
+    else:
+        run = store.latest_run(args.engine) if args.run == "latest" else args.run
+        t0 = time.perf_counter()
+        df = store.query(run, args.ticker, args.start, args.end, args.strategy, on=args.on)
+        print(f"{len(df):,} rows in {(time.perf_counter() - t0) * 1000:.1f} ms")
+        if args.out:
+            df.to_csv(args.out, index=False)
+        else:
+            print(df.head(20).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# rolling_state.py — persisted per-ticker rolling state: O(1) daily updates for ATR, ATR% z and vol proxies
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from atr_kernel import rolling_mean, rolling_std, true_range
+
+# ───────── config ─────────
+STATE_PATH = os.path.join("data", "rolling_state.json")
+Z_LOOKBACK = 20          # ATR% z-score window (column Q)
+VOL_WINDOW = 20          # return-std IV proxy (column P)
+LONG_WINDOW = 126        # ~6 months of sessions for the P rank and S z-score
+REBUILD_MONTHS = 9       # history replayed when state is missing or stale
+RESYNC_EVERY = 512       # re-derive running sums from the buffer to cap float drift
+MAX_GAP_DAYS = 10        # more calendar days than this between bars -> rebuild
+
+
+# ───────── ring buffer ─────────
+class Ring:
+    """Fixed-size window with running sum / sum of squares (NaNs tracked, not summed)."""
+
+    def __init__(self, size: int, values: Optional[Iterable[float]] = None):
+        self.size = size
+        self.buf = np.full(size, np.nan)
+        self.head = 0           # next write slot
+        self.n = 0              # filled slots
+        self.pushes = 0
+        self._resync()
+        for v in values or ():
+            self.push(v)
+
+    def _resync(self) -> None:
+        vals = self.buf[~np.isnan(self.buf)]
+        self.total = float(vals.sum())
+        self.total_sq = float((vals * vals).sum())
+        self.nans = int(self.n - len(vals))
+
+    def push(self, x: float) -> float:
+        old = self.buf[self.head] if self.n == self.size else np.nan
+        if self.n == self.size:
+            if np.isnan(old):
+                self.nans -= 1
+            else:
+                self.total -= old
+                self.total_sq -= old * old
+        else:
+            self.n += 1
+        self.buf[self.head] = x
+        if np.isnan(x):
+            self.nans += 1
+        else:
+            self.total += x
+            self.total_sq += x * x
+        self.head = (self.head + 1) % self.size
+        self.pushes += 1
+        if self.pushes % RESYNC_EVERY == 0:
+            self._resync()
+        return old
+
+    def last(self, k: int = 0) -> float:
+        # k-th most recent value (0 = newest)
+        if k >= self.n:
+            return np.nan
+        return float(self.buf[(self.head - 1 - k) % self.size])
+
+    def values(self) -> np.ndarray:
+        if self.n < self.size:
+            return self.buf[:self.n].copy()
+        return np.roll(self.buf, -self.head)
+
+    @property
+    def full(self) -> bool:
+        return self.n == self.size and self.nans == 0
+
+    def mean(self) -> float:
+        # Like rolling(size).mean(): only defined on a full, NaN-free window
+        return self.total / self.size if self.full else np.nan
+
+    def std(self) -> float:
+        if not self.full:
+            return np.nan
+        var = (self.total_sq - self.total * self.total / self.size) / (self.size - 1)
+        return float(np.sqrt(max(var, 0.0)))
+
+    def to_list(self) -> List[Optional[float]]:
+        return [None if np.isnan(v) else float(v) for v in self.values()]
+
+
+# ───────── per-ticker state ─────────
+@dataclass
+class TickerState:
+    last_date: Optional[pd.Timestamp] = None
+    prev_close: float = np.nan
+    count: int = 0
+    tr14: Ring = field(default_factory=lambda: Ring(14))
+    tr20: Ring = field(default_factory=lambda: Ring(20))
+    atr_pct: Ring = field(default_factory=lambda: Ring(Z_LOOKBACK))
+    ret: Ring = field(default_factory=lambda: Ring(VOL_WINDOW))
+    vol: Ring = field(default_factory=lambda: Ring(LONG_WINDOW))
+    atr20: Ring = field(default_factory=lambda: Ring(LONG_WINDOW))
+
+    RINGS = ("tr14", "tr20", "atr_pct", "ret", "vol", "atr20")
+
+    def update(self, date, high: float, low: float, close: float) -> bool:
+        """Fold one daily bar in; bars on or before last_date are ignored."""
+        date = pd.Timestamp(date).normalize()
+        if self.last_date is not None and date <= self.last_date:
+            return False
+        pc = self.prev_close
+        tr = high - low if np.isnan(pc) else max(high - low, abs(high - pc), abs(low - pc))
+        self.tr14.push(tr)
+        self.tr20.push(tr)
+        atr14, atr20 = self.tr14.mean(), self.tr20.mean()
+        self.atr_pct.push(atr14 / close * 100 if close else np.nan)
+        self.ret.push(close / pc - 1 if pc and not np.isnan(pc) else np.nan)
+        self.vol.push(self.ret.std())
+        self.atr20.push(atr20)
+        self.prev_close = close
+        self.last_date = date
+        self.count += 1
+        return True
+
+    # ---- metrics (same definitions as the sheet columns) ----
+    def atr14(self) -> float:
+        return self.tr14.mean()
+
+    def atr20_value(self) -> float:
+        return self.tr20.mean()
+
+    def atr_pct_now(self) -> float:
+        return self.atr_pct.last()
+
+    def atr_pct_z(self) -> float:
+        std = self.atr_pct.std()
+        if np.isnan(std):
+            return np.nan
+        return (self.atr_pct.last() - self.atr_pct.mean()) / std if std > 0 else 0.0
+
+    def vol_rank_change(self, days: int = 5) -> float:
+        vals = self.vol.values()
+        vals = vals[~np.isnan(vals)]
+        if len(vals) <= days:
+            return np.nan
+        lo, hi = vals.min(), vals.max()
+        return (vals[-1] - vals[-1 - days]) / (hi - lo) if hi > lo else np.nan
+
+    def atr20_z(self) -> float:
+        vals = self.atr20.values()
+        vals = vals[~np.isnan(vals)]
+        if len(vals) < 2:
+            return np.nan
+        std = vals.std(ddof=1)
+        return (vals[-1] - vals.mean()) / std if std > 0 else np.nan
+
+    # ---- persistence ----
+    def to_dict(self) -> dict:
+        d = {
+            "last_date": self.last_date.date().isoformat() if self.last_date is not None else None,
+            "prev_close": None if np.isnan(self.prev_close) else float(self.prev_close),
+            "count": self.count,
+        }
+        d.update({name: getattr(self, name).to_list() for name in self.RINGS})
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "TickerState":
+        st = cls()
+        st.last_date = pd.Timestamp(d["last_date"]) if d.get("last_date") else None
+        st.prev_close = np.nan if d.get("prev_close") is None else float(d["prev_close"])
+        st.count = int(d.get("count", 0))
+        for name in cls.RINGS:
+            ring = getattr(st, name)
+            for v in d.get(name, []):
+                ring.push(np.nan if v is None else v)
+        return st
+
+    @classmethod
+    def from_bars(cls, bars: pd.DataFrame) -> "TickerState":
+        """Seed from history with the ATR kernel (one vectorized pass, no replay)."""
+        st = cls()
+        if bars.empty:
+            return st
+        h, l, c = (bars[k].to_numpy(dtype=float) for k in ("High", "Low", "Close"))
+        tr = true_range(h, l, c)
+        atr14, atr20 = rolling_mean(tr, 14), rolling_mean(tr, 20)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            atr_pct = atr14 / c[:, None] * 100
+        ret = np.full((len(c), 1), np.nan)
+        ret[1:, 0] = c[1:] / c[:-1] - 1
+        vol = rolling_std(ret, VOL_WINDOW)
+        for name, arr in (("tr14", tr), ("tr20", tr), ("atr_pct", atr_pct), ("ret", ret),
+                          ("vol", vol), ("atr20", atr20)):
+            ring = getattr(st, name)
+            for v in arr[-ring.size:, 0]:
+                ring.push(v)
+        st.prev_close = float(c[-1])
+        st.last_date = pd.Timestamp(bars.index[-1]).normalize()
+        st.count = len(c)
+        return st
+
+
+# ───────── universe ─────────
+class RollingStates:
+    def __init__(self, path: str = STATE_PATH):
+        self.path = path
+        self.states: Dict[str, TickerState] = {}
+        if os.path.exists(path):
+            with open(path) as fh:
+                raw = json.load(fh)
+            self.states = {t: TickerState.from_dict(d) for t, d in raw.items()}
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as fh:
+            json.dump({t: st.to_dict() for t, st in self.states.items()}, fh)
+        os.replace(tmp, self.path)
+
+    def get(self, ticker: str) -> Optional[TickerState]:
+        return self.states.get(ticker)
+
+    def rebuild(self, ticker: str, store) -> TickerState:
+        start = pd.Timestamp.today().normalize() - pd.DateOffset(months=REBUILD_MONTHS)
+        st = TickerState.from_bars(store.get(ticker, start, adjusted=True, fetch=False))
+        self.states[ticker] = st
+        return st
+
+    def advance(self, ticker: str, store) -> TickerState:
+        """Apply bars newer than the state; rebuild when missing, revised or gapped."""
+        st = self.states.get(ticker)
+        if st is None or st.last_date is None:
+            return self.rebuild(ticker, store)
+        bars = store.get(ticker, st.last_date, adjusted=True, fetch=False)
+        if bars.empty or bars.index[0] != st.last_date:
+            return self.rebuild(ticker, store)
+        # Adjusted history shifted under us (split/dividend) -> the rings are stale
+        if abs(bars["Close"].iloc[0] / st.prev_close - 1) > 1e-3:
+            return self.rebuild(ticker, store)
+        new = bars.iloc[1:]
+        if len(new) and (new.index[0] - st.last_date).days > MAX_GAP_DAYS:
+            return self.rebuild(ticker, store)
+        for date, row in zip(new.index, new[["High", "Low", "Close"]].to_numpy()):
+            st.update(date, *row)
+        return st
+
+    def refresh(self, tickers: Iterable[str], store, scheduler=None) -> Dict[str, TickerState]:
+        # Only the tail after each state's last bar is requested from the network
+        tickers = list(dict.fromkeys(tickers))
+        today = pd.Timestamp.today().normalize()
+        rebuild_start = today - pd.DateOffset(months=REBUILD_MONTHS)
+        fresh = [t for t in tickers if self.states.get(t) and self.states[t].last_date is not None]
+        cold = [t for t in tickers if t not in fresh]
+        if fresh:
+            since = min(self.states[t].last_date for t in fresh)
+            store.ensure_many(fresh, since, scheduler=scheduler)
+        if cold:
+            store.ensure_many(cold, rebuild_start, scheduler=scheduler)
+        out = {t: self.advance(t, store) for t in tickers}
+        self.save()
+        return out
@@ -0,0 +1,364 @@
+# rollup_cube.py — count / wins / sum / sum² of trade P/L per (ticker, strategy, quarter, sector), upserted incrementally
+import argparse
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from option_pricing import CONTRACT
+
+# ───────── config ─────────
+CUBE_DIR = os.path.join("data", "rollup")
+DIMS = ("ticker", "strategy", "quarter", "sector")
+SHEET_ENGINE = "backtest052925"       # the engine whose history feeds the sheet columns
+MIN_TRADES = 5                        # below this a (ticker, setup) cell backs off to sector, then strategy
+WIN_RATE_OK = 0.55
+T_STAT_OK = 1.0
+UNKNOWN = "Unknown"
+SHIFTS = (40, 32, 16, 0)              # bit offsets of ticker, strategy, quarter + 1, sector in a packed cell key
+
+
+# ───────── measures ─────────
+def pnl_atr(norm: pd.DataFrame) -> np.ndarray:
+    """P/L in units of one ATR% move: option $ per lot over the lot's ATR, else the underlying return over ATR%."""
+    atr = norm["atr_pct"].to_numpy(dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        opt = norm["option_pnl"].to_numpy(dtype=float) / (CONTRACT * norm["entry_price"].to_numpy(dtype=float) * atr)
+        und = norm["ret"].to_numpy(dtype=float) / atr
+    out = np.where(np.isfinite(opt), opt, und)
+    return np.where(np.isfinite(out), out, np.nan)
+
+
+def pnl_dollars(norm: pd.DataFrame) -> np.ndarray:
+    # main_cleaned / parallel_backtest headline: option $ per 1-lot (no ATR on those rows)
+    return norm["pnl"].to_numpy(dtype=float)
+
+
+MEASURES = {"pnl_atr": pnl_atr, "pnl": pnl_dollars}
+ENGINE_MEASURE = {"main_cleaned": "pnl", "parallel_backtest": "pnl"}
+
+
+def quarter_code(dates: np.ndarray) -> np.ndarray:
+    # datetime64 -> year * 4 + (quarter - 1); -1 for NaT
+    d = np.asarray(dates, dtype="datetime64[M]")
+    months = d.astype(np.int64)                       # months since 1970-01
+    out = (months // 12 + 1970) * 4 + (months % 12) // 3
+    return np.where(np.isnat(d), -1, out)
+
+
+def quarter_label(code: int) -> str:
+    return "N/A" if code < 0 else f"{code // 4}Q{code % 4 + 1}"
+
+
+def _quarter_value(q) -> int:
+    # "2024Q3" / Timestamp-like -> code
+    if isinstance(q, (int, np.integer)):
+        return int(q)
+    s = str(q).upper()
+    if "Q" in s:
+        y, n = s.split("Q")
+        return int(y) * 4 + int(n) - 1
+    return int(quarter_code(np.array([pd.Timestamp(q).to_datetime64()]))[0])
+
+
+def _pack(cells: np.ndarray) -> np.ndarray:
+    # (n, 4) codes -> one int64 per cell; 1-D keys sort and hash far faster than rows
+    c = cells.astype(np.int64)
+    return (c[:, 0] << SHIFTS[0]) | (c[:, 1] << SHIFTS[1]) | ((c[:, 2] + 1) << SHIFTS[2]) | (c[:, 3] << SHIFTS[3])
+
+
+# ───────── cube ─────────
+class RollupCube:
+    """Sparse cells with additive measures plus a per-trade ledger, so re-recorded trades replace rather than double count."""
+
+    def __init__(self, engine: str = SHEET_ENGINE, root: str = CUBE_DIR, measure: Optional[str] = None,
+                 fresh: bool = False):
+        self.engine = engine
+        self.path = os.path.join(root, f"{engine}.npz")
+        self.measure = measure or ENGINE_MEASURE.get(engine, "pnl_atr")
+        self.names: Dict[str, List[str]] = {"ticker": [], "strategy": [], "sector": []}
+        self._lookup: Dict[str, Dict[str, int]] = {k: {} for k in self.names}
+        self.cells = np.zeros((0, 4), dtype=np.int32)      # ticker, strategy, quarter, sector codes
+        self.stats = np.zeros((0, 4), dtype=np.float64)    # count, wins, sum, sumsq
+        self._cell_ix: Dict[int, int] = {}                 # packed key -> row in cells / stats
+        self.ledger = pd.DataFrame({"cell": pd.Series(dtype=np.int64), "value": pd.Series(dtype=float)})
+        if os.path.exists(self.path) and not fresh:
+            self._load()
+
+    # ---- persistence ----
+    def _load(self) -> None:
+        with np.load(self.path, allow_pickle=False) as z:
+            self.measure = str(z["measure"])
+            for k in self.names:
+                self.names[k] = [str(s) for s in z[f"names_{k}"]]
+            self.cells, self.stats = z["cells"], z["stats"]
+            self.ledger = pd.DataFrame({"cell": z["ledger_cell"], "value": z["ledger_value"]},
+                                       index=pd.Index(z["ledger_key"].astype(str), name="key"))
+        self._lookup = {k: {s: i for i, s in enumerate(v)} for k, v in self.names.items()}
+        self._cell_ix = dict(zip(_pack(self.cells).tolist(), range(len(self.cells))))
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, measure=np.str_(self.measure), cells=self.cells, stats=self.stats,
+                 ledger_key=self.ledger.index.to_numpy(dtype=str), ledger_cell=self.ledger["cell"].to_numpy(),
+                 ledger_value=self.ledger["value"].to_numpy(),
+                 **{f"names_{k}": np.array(v, dtype=str) for k, v in self.names.items()})
+        os.replace(tmp, self.path)
+
+    # ---- writes ----
+    def _codes(self, dim: str, values: Iterable[str]) -> np.ndarray:
+        uniq, inv = np.unique(np.asarray(list(values), dtype=str), return_inverse=True)
+        lut = self._lookup[dim]
+        for u in uniq:
+            if u not in lut:
+                lut[u] = len(self.names[dim])
+                self.names[dim].append(u)
+        return np.array([lut[u] for u in uniq], dtype=np.int32)[inv] if len(uniq) else np.zeros(0, np.int32)
+
+    def _cells_for(self, dims: np.ndarray) -> np.ndarray:
+        # Dict lookups per distinct cell, not per trade
+        uniq, first, inv = np.unique(_pack(dims), return_index=True, return_inverse=True)
+        ids = np.empty(len(uniq), dtype=np.int64)
+        new = []
+        for i, k in enumerate(uniq.tolist()):
+            ix = self._cell_ix.get(k)
+            if ix is None:
+                ix = self._cell_ix[k] = len(self._cell_ix)
+                new.append(first[i])
+            ids[i] = ix
+        if new:
+            self.cells = np.vstack([self.cells, dims[new].astype(np.int32)])
+            self.stats = np.vstack([self.stats, np.zeros((len(new), 4))])
+        return ids[inv.ravel()]
+
+    def _apply(self, cells: np.ndarray, values: np.ndarray, sign: float) -> None:
+        n = len(self.stats)
+        self.stats[:, 0] += sign * np.bincount(cells, minlength=n)
+        self.stats[:, 1] += sign * np.bincount(cells, weights=(values > 0).astype(float), minlength=n)
+        self.stats[:, 2] += sign * np.bincount(cells, weights=values, minlength=n)
+        self.stats[:, 3] += sign * np.bincount(cells, weights=values * values, minlength=n)
+
+    def upsert(self, df: pd.DataFrame, sectors: Optional[Dict[str, str]] = None, replace: bool = False) -> int:
+        """Fold trades (any engine / legacy column names) in; a trade seen before is retracted first. Returns rows changed.
+
+        replace: the frame is a whole run, so a ticker's trades it no longer has (from its
+        earliest date in the frame on) are retracted, e.g. events the calendar withdrew.
+        """
+        from results_store import normalize
+        if df is None or df.empty:
+            return 0
+        norm = normalize(df)
+        values = MEASURES[self.measure](norm)
+        date = np.where(np.isnat(norm["event_date"].to_numpy()), norm["entry_date"].to_numpy(), norm["event_date"].to_numpy())
+        ok = np.isfinite(values) & (norm["strategy"].to_numpy(dtype=str) != "")
+        norm, values, date = norm[ok], values[ok], date[ok]
+        if not len(norm):
+            return 0
+        sectors = sectors or {}
+        tickers = norm["ticker"].to_numpy(dtype=str)
+        # One trade per (ticker, event); a re-run that picks another setup moves it between cells
+        keys = pd.Index(np.char.add(np.char.add(tickers, "|"), np.datetime_as_string(date.astype("datetime64[D]"))))
+        dims = np.column_stack([
+            self._codes("ticker", tickers),
+            self._codes("strategy", norm["strategy"].astype(str)),
+            quarter_code(date).astype(np.int32),
+            self._codes("sector", (sectors.get(t) or UNKNOWN for t in tickers)),
+        ])
+        cells = self._cells_for(dims)
+
+        new = pd.DataFrame({"cell": cells, "value": values}, index=keys)
+        new = new[~new.index.duplicated(keep="last")]
+        gone = self._retract_missing(new.index, tickers, date) if replace else 0
+        old = self.ledger.reindex(new.index)
+        seen = old["cell"].notna().to_numpy()
+        # CSV round trips perturb the last digit; only a real change counts
+        same_value = np.isclose(old["value"].to_numpy(), new["value"].to_numpy(), rtol=1e-12, atol=0)
+        changed = ~seen | (old["cell"].to_numpy() != new["cell"].to_numpy()) | ~same_value
+        retract = seen & changed
+        if retract.any():
+            self._apply(old["cell"].to_numpy()[retract].astype(np.int64), old["value"].to_numpy()[retract], -1.0)
+        if changed.any():
+            self._apply(new["cell"].to_numpy()[changed], new["value"].to_numpy()[changed], 1.0)
+            fresh = new[changed]
+            self.ledger = pd.concat([self.ledger.drop(fresh.index[seen[changed]]), fresh])
+        return int(changed.sum()) + gone
+
+    def _retract_missing(self, keys: pd.Index, tickers: np.ndarray, dates: np.ndarray) -> int:
+        # Ledger trades of the run's tickers, dated from each one's earliest run date on, that the run lacks
+        if not len(self.ledger):
+            return 0
+        since = pd.Series(dates.astype("datetime64[D]")).groupby(tickers).min()
+        lk = self.ledger.index.to_numpy(dtype=str)
+        parts = np.char.partition(lk, "|")
+        ld = parts[:, 2].astype("datetime64[D]")
+        lo = since.reindex(parts[:, 0]).to_numpy(dtype="datetime64[D]")
+        gone = (ld >= lo) & ~np.isin(lk, keys.to_numpy(dtype=str))
+        if gone.any():
+            old = self.ledger[gone]
+            self._apply(old["cell"].to_numpy().astype(np.int64), old["value"].to_numpy(), -1.0)
+            self.ledger = self.ledger[~gone]
+        return int(gone.sum())
+
+    # ---- reads ----
+    def frame(self) -> pd.DataFrame:
+        # Occupied cells with readable dimension values
+        live = self.stats[:, 0] > 0
+        c = self.cells[live]
+        return pd.DataFrame({
+            "ticker": np.array(self.names["ticker"], dtype=object)[c[:, 0]] if len(c) else [],
+            "strategy": np.array(self.names["strategy"], dtype=object)[c[:, 1]] if len(c) else [],
+            "quarter": [quarter_label(q) for q in c[:, 2]],
+            "sector": np.array(self.names["sector"], dtype=object)[c[:, 3]] if len(c) else [],
+            "count": self.stats[live, 0], "wins": self.stats[live, 1],
+            "sum": self.stats[live, 2], "sumsq": self.stats[live, 3],
+        })
+
+    def _mask(self, where: Dict[str, object]) -> np.ndarray:
+        m = self.stats[:, 0] > 0
+        for dim, val in (where or {}).items():
+            j = DIMS.index(dim)
+            if dim == "quarter":
+                lo, hi = val if isinstance(val, tuple) else (val, val)
+                lo = -1 if lo is None else _quarter_value(lo)
+                hi = np.iinfo(np.int32).max if hi is None else _quarter_value(hi)
+                m &= (self.cells[:, j] >= lo) & (self.cells[:, j] <= hi)
+            else:
+                vals = [val] if isinstance(val, str) else list(val)
+                codes = [self._lookup[dim][v] for v in vals if v in self._lookup[dim]]
+                m &= np.isin(self.cells[:, j], codes)
+        return m
+
+    def rollup(self, by: Sequence[str] = ("strategy",), where: Optional[Dict[str, object]] = None) -> pd.DataFrame:
+        """Aggregate over every dimension not in `by`; `where` filters dims (lists, or a (lo, hi) quarter range)."""
+        by = list(by)
+        m = self._mask(where or {})
+        cells, stats = self.cells[m], self.stats[m]
+        if by:
+            keep = np.array([d in by for d in DIMS])
+            sub = np.where(keep, cells, np.array([0, 0, -1, 0], dtype=np.int32))
+            _, first, inv = np.unique(_pack(sub), return_index=True, return_inverse=True)
+            groups = sub[first]
+            inv = inv.ravel()
+            agg = np.column_stack([np.bincount(inv, weights=stats[:, k], minlength=len(groups)) for k in range(4)])
+        else:
+            groups, agg = np.zeros((1, 4), dtype=np.int32), stats.sum(axis=0, keepdims=True)
+        out = {}
+        for d in by:
+            g = groups[:, DIMS.index(d)]
+            out[d] = [quarter_label(q) for q in g] if d == "quarter" else np.array(self.names[d], dtype=object)[g]
+        n, wins, s, ss = (agg[:, k] for k in range(4))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = s / n
+            std = np.where(n > 1, np.sqrt(np.maximum(ss / n - mean * mean, 0) * n / np.maximum(n - 1, 1)), np.nan)
+            res = pd.DataFrame({**out, "count": n.astype(np.int64), "wins": wins.astype(np.int64),
+                                "win_rate": wins / n, "mean": mean, "std": std,
+                                "t_stat": mean / (std / np.sqrt(n))})
+        return res[res["count"] > 0].reset_index(drop=True)
+
+    # ---- sheet ----
+    def estimate_many(self, rows: Iterable[Tuple[str, str, Optional[str]]]) -> List[Optional[dict]]:
+        """Stats per (ticker, setup, sector), backing off to (sector, setup) then (setup) when thin.
+
+        Three rollups for the whole batch, then dict lookups.
+        """
+        levels = [("ticker", ["ticker", "strategy"]), ("sector", ["sector", "strategy"]), ("strategy", ["strategy"])]
+        tables = {}
+        for level, by in levels:
+            r = self.rollup(by)
+            r = r[r["count"] >= MIN_TRADES]
+            tables[level] = {tuple(k): rec for k, rec in zip(r[by].itertuples(index=False, name=None),
+                                                              r.to_dict("records"))}
+        out = []
+        for ticker, strategy, sector in rows:
+            keys = {"ticker": (ticker, strategy), "sector": (sector or UNKNOWN, strategy), "strategy": (strategy,)}
+            hit = None
+            for level, _ in levels:
+                rec = tables[level].get(keys[level])
+                if rec is not None:
+                    hit = {"level": level, **rec}
+                    break
+            out.append(hit)
+        return out
+
+    def estimate(self, ticker: str, strategy: str, sector: Optional[str] = None) -> Optional[dict]:
+        return self.estimate_many([(ticker, strategy, sector)])[0]
+
+    def confidence(self, est: Optional[dict]) -> int:
+        # 0..3: enough own history, win rate above the bar, mean P/L a standard error clear of zero
+        if est is None:
+            return 0
+        return int(est["level"] == "ticker") + int(est["win_rate"] >= WIN_RATE_OK) + int(est["t_stat"] >= T_STAT_OK)
+
+
+_cubes: Dict[str, RollupCube] = {}
+
+
+def default_cube(engine: str = SHEET_ENGINE) -> RollupCube:
+    if engine not in _cubes:
+        _cubes[engine] = RollupCube(engine)
+    return _cubes[engine]
+
+
+def tracker_sectors() -> Dict[str, str]:
+    # Sector column of the local sheet mirror; no network
+    from sheet_mirror import default_mirror
+    return {r["ticker"]: str(r.get("Sector") or "").strip() or UNKNOWN for r in default_mirror().records()}
+
+
+def record(engine: str, df: pd.DataFrame) -> int:
+    # Engine hook (via results_store.record_run): fold the run's trades into that engine's cube
+    cube = default_cube(engine)
+    try:
+        sectors = tracker_sectors()
+    except Exception:
+        sectors = {}
+    n = cube.upsert(df, sectors, replace=True)
+    cube.save()
+    return n
+
+
+def rebuild(engine: str, store=None) -> RollupCube:
+    """Fresh cube from every stored run of `engine`, oldest first (later runs win per trade)."""
+    from results_store import default_results
+    store = store or default_results()
+    cube = RollupCube(engine, fresh=True)
+    sectors = tracker_sectors()
+    for run in store.runs(engine):
+        cube.upsert(store.query(run), sectors, replace=True)
+    cube.save()
+    _cubes[engine] = cube
+    return cube
+
+
+# ───────── main ─────────
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Win-rate / P&L rollups from the aggregate cube")
+    ap.add_argument("--engine", default=SHEET_ENGINE)
+    ap.add_argument("--by", nargs="*", default=["ticker", "strategy"], choices=list(DIMS))
+    ap.add_argument("--ticker", nargs="+", default=None)
+    ap.add_argument("--strategy", nargs="+", default=None)
+    ap.add_argument("--sector", nargs="+", default=None)
+    ap.add_argument("--quarters", nargs=2, default=None, metavar=("FROM", "TO"), help="e.g. 2023Q1 2025Q4")
+    ap.add_argument("--rebuild", action="store_true", help="recompute from the results store first")
+    ap.add_argument("--out", default=None, help="CSV path, e.g. Win_Rate_by_Ticker_and_Strategy.csv")
+    args = ap.parse_args(argv)
+
+    cube = rebuild(args.engine) if args.rebuild else default_cube(args.engine)
+    where = {k: v for k, v in (("ticker", args.ticker), ("strategy", args.strategy), ("sector", args.sector)) if v}
+    if args.quarters:
+        where["quarter"] = tuple(args.quarters)
+    t0 = time.perf_counter()
+    res = cube.rollup(args.by, where)
+    print(f"{len(res)} groups in {(time.perf_counter() - t0) * 1000:.1f} ms ({cube.measure})")
+    if args.out:
+        res.assign(**{"Win Rate (%)": (res["win_rate"] * 100).round(2)}).to_csv(args.out, index=False)
+        print(f"Saved to {args.out}")
+    else:
+        print(res.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# sheet_mirror.py — local SQLite mirror of the Earnings Tracker, refreshed on a new sheet revision or a new day
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from sheets import clean_ticker, open_tracker
+
+# ───────── config ─────────
+MIRROR_PATH = os.path.join("data", "tracker.db")
+MAX_AGE = 15 * 60        # seconds a mirror is trusted without even asking Drive for the revision
+# TODAY()-driven cells (e.g. "days until") recalculate without bumping Drive's revision,
+# so a mirror loaded on an earlier calendar day is re-pulled whatever the revision says
+
+# sheet header -> (sqlite column, type)
+TYPED = {
+    "days until": ("days_until", "int"),
+    "P/L Estimate (units of ATR%)": ("pl_estimate", "float"),
+    "Dollar P/L": ("dollar_pl", "float"),
+    "IV Rank Change (5-day delta)": ("iv_rank_change", "float"),
+    "ATR% Z-Score": ("atr_pct_z", "float"),
+    "20 Day ATR": ("atr20", "float"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS rows (
+    row            INTEGER PRIMARY KEY,
+    ticker         TEXT NOT NULL,
+    days_until     INTEGER,
+    pl_estimate    REAL,
+    dollar_pl      REAL,
+    iv_rank_change REAL,
+    atr_pct_z      REAL,
+    atr20          REAL,
+    record         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rows_ticker ON rows (ticker);
+CREATE INDEX IF NOT EXISTS rows_days_until ON rows (days_until);
+"""
+
+
+def parse_number(val: Any) -> Optional[float]:
+    # "$1,234.50" / "12%" / "" -> float or None
+    if val is None or isinstance(val, bool):
+        return None
+    if isinstance(val, (int, float)):
+        return float(val)
+    s = str(val).strip().replace("$", "").replace(",", "").rstrip("%")
+    neg = s.startswith("(") and s.endswith(")")
+    s = s.strip("()")
+    try:
+        out = float(s)
+    except ValueError:
+        return None
+    return -out if neg else out
+
+
+def parse_int(val: Any) -> Optional[int]:
+    out = parse_number(val)
+    return None if out is None else int(out)
+
+
+def _day(ts: float) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(ts))
+
+
+def revision_of(sheet) -> Optional[str]:
+    # Drive modifiedTime; None when the handle can't tell us (always refetch then)
+    ss = getattr(sheet, "spreadsheet", None)
+    try:
+        return ss.get_lastUpdateTime() if ss is not None else None
+    except Exception as e:
+        print(f"⚠️ revision check failed: {e}")
+        return None
+
+
+class SheetMirror:
+    def __init__(self, path: str = MIRROR_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+        self.fetches = 0
+
+    # ---- meta ----
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    @property
+    def revision(self) -> Optional[str]:
+        return self._meta("revision")
+
+    @property
+    def synced_at(self) -> float:
+        return float(self._meta("synced_at") or 0)
+
+    @property
+    def loaded_at(self) -> float:
+        return float(self._meta("loaded_at") or 0)
+
+    def is_empty(self) -> bool:
+        return self._meta("synced_at") is None
+
+    def loaded_today(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return self._meta("loaded_at") is not None and _day(self.loaded_at) == _day(now)
+
+    # ---- sync ----
+    def load(self, values: List[List[Any]], revision: Optional[str] = None) -> int:
+        """Replace the mirror with a full grid (header row first)."""
+        header = [str(h).strip() for h in values[0]] if values else []
+        typed = {TYPED[h][0]: (i, TYPED[h][1]) for i, h in enumerate(header) if h in TYPED}
+        out = []
+        for r, raw in enumerate(values[1:], start=2):
+            rec = {h: (raw[i] if i < len(raw) else "") for i, h in enumerate(header) if h}
+            row = {"row": r, "ticker": clean_ticker(str(raw[0])) if raw else "", "record": json.dumps(rec)}
+            for col, (i, kind) in typed.items():
+                v = raw[i] if i < len(raw) else None
+                row[col] = parse_int(v) if kind == "int" else parse_number(v)
+            out.append(row)
+        cols = ["row", "ticker", "record"] + list(typed)
+        now = str(time.time())
+        with self.db:
+            self.db.execute("DELETE FROM rows")
+            self.db.executemany(
+                f"INSERT INTO rows ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                [[row.get(c) for c in cols] for row in out])
+            self.db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ("revision", revision), ("synced_at", now), ("loaded_at", now), ("header", json.dumps(header))])
+        return len(out)
+
+    def refresh(self, sheet=None, force: bool = False, max_age: float = MAX_AGE) -> bool:
+        """Re-pull the grid if the sheet changed or was loaded before today; True when a full fetch happened.
+
+        With no sheet handle and a same-day mirror younger than max_age, nothing
+        touches the network (no auth either).
+        """
+        now = time.time()
+        force = force or self.is_empty() or not self.loaded_today(now)
+        if sheet is None and not force and now - self.synced_at < max_age:
+            return False
+        sheet = sheet or open_tracker()
+        rev = revision_of(sheet)
+        if not force and rev is not None and rev == self.revision:
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('synced_at', ?)", (str(time.time()),))
+            return False
+        self.load(sheet.get_all_values(), rev)
+        self.fetches += 1
+        return True
+
+    def invalidate(self) -> None:
+        # After our own writes: force the next refresh to re-pull
+        with self.db:
+            self.db.execute("DELETE FROM meta WHERE key IN ('revision', 'synced_at', 'loaded_at')")
+
+    # ---- reads ----
+    def tickers(self) -> List[str]:
+        # Column A in sheet order, blank rows kept so values stay row-aligned
+        rows = self.db.execute("SELECT row, ticker FROM rows ORDER BY row").fetchall()
+        if not rows:
+            return []
+        out = [""] * (rows[-1]["row"] - 1)
+        for r in rows:
+            out[r["row"] - 2] = r["ticker"]
+        while out and not out[-1]:
+            out.pop()
+        return out
+
+    def header(self) -> List[str]:
+        return json.loads(self._meta("header") or "[]")
+
+    def _records(self, sql: str, args=()) -> List[Dict[str, Any]]:
+        out = []
+        for r in self.db.execute(sql, args):
+            rec = json.loads(r["record"])
+            rec.update({k: r[k] for k in r.keys() if k != "record"})
+            out.append(rec)
+        return out
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Sheet records (header -> raw value) plus the parsed typed columns."""
+        return self._records("SELECT * FROM rows WHERE ticker != '' ORDER BY row")
+
+    def by_ticker(self, ticker: str) -> List[Dict[str, Any]]:
+        return self._records("SELECT * FROM rows WHERE ticker = ? ORDER BY row", (clean_ticker(ticker),))
+
+    def upcoming(self, max_days: int, min_days: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Rows with a parsed days-until <= max_days (and >= min_days if given)
+        if min_days is None:
+            return self._records(
+                "SELECT * FROM rows WHERE days_until <= ? ORDER BY days_until, row", (max_days,))
+        return self._records(
+            "SELECT * FROM rows WHERE days_until BETWEEN ? AND ? ORDER BY days_until, row",
+            (min_days, max_days))
+
+    def close(self) -> None:
+        self.db.close()
+
+
+_default: Optional[SheetMirror] = None
+
+
+def default_mirror() -> SheetMirror:
+    global _default
+    if _default is None:
+        _default = SheetMirror()
+    return _default
+
+
+def tracker_tickers(max_age: float = MAX_AGE) -> List[str]:
+    # Column A from the mirror; auth + fetch only when it is stale and the sheet moved
+    m = default_mirror()
+    m.refresh(max_age=max_age)
+    return m.tickers()
+
+
+if __name__ == "__main__":
+    m = default_mirror()
+    m.refresh(force=True)
+    print(f"✅ Mirrored {len(m.records())} rows to {m.path} (revision {m.revision})")
@@ -0,0 +1,213 @@
+# sheet_sync.py — diffing, coalescing Google Sheets writer (one read, one batch_update per run)
+import json
+import math
+import random
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fetch_scheduler import is_retryable
+from instrumentation import count, enabled, timer
+from sheets import col_index, rc_to_a1
+
+# ───────── config ─────────
+RETRIES = 5
+BACKOFF_BASE = 2.0       # Sheets quotas are per minute, so back off in seconds, not ms
+BACKOFF_CAP = 64.0
+GAP_FILL = 2             # staged-but-unchanged rows that may be rewritten to join two runs
+
+Cellmap = Dict[Tuple[int, int], Any]
+
+
+def _same(old: Any, new: Any) -> bool:
+    # Numbers compare numerically ("2.5" == 2.5), everything else as trimmed text
+    if old is None:
+        old = ""
+    if new is None:
+        new = ""
+    try:
+        a, b = float(old), float(new)
+        return a == b or math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-12)
+    except (TypeError, ValueError):
+        return str(old).strip() == str(new).strip()
+
+
+def _runs(rows: List[int], staged_rows: set, gap: int) -> List[Tuple[int, int]]:
+    # Consecutive row runs; bridges short gaps only through cells we staged ourselves
+    runs = []
+    for r in sorted(rows):
+        if runs:
+            r0, r1 = runs[-1]
+            between = range(r1 + 1, r)
+            if r == r1 + 1 or (len(between) <= gap and all(x in staged_rows for x in between)):
+                runs[-1] = (r0, r)
+                continue
+        runs.append((r, r))
+    return runs
+
+
+def coalesce(changes: Cellmap, staged: Optional[Cellmap] = None, gap: int = GAP_FILL) -> List[Dict[str, Any]]:
+    """Merge changed cells into as few rectangular A1 ranges as possible."""
+    staged = staged if staged is not None else changes
+    by_col: Dict[int, List[int]] = defaultdict(list)
+    for r, c in changes:
+        by_col[c].append(r)
+
+    # Column runs, then glue neighbouring columns that share the exact same row span
+    spans: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for c, rows in by_col.items():
+        staged_rows = {r for (r, cc) in staged if cc == c}
+        for run in _runs(rows, staged_rows, gap):
+            spans[run].append(c)
+
+    data = []
+    for (r0, r1), cols in sorted(spans.items()):
+        cols.sort()
+        start = prev = cols[0]
+        blocks = []
+        for c in cols[1:]:
+            if c != prev + 1:
+                blocks.append((start, prev))
+                start = c
+            prev = c
+        blocks.append((start, prev))
+        for c0, c1 in blocks:
+            values = [[staged.get((r, c), changes.get((r, c), "")) for c in range(c0, c1 + 1)]
+                      for r in range(r0, r1 + 1)]
+            data.append({"range": f"{rc_to_a1(r0, c0)}:{rc_to_a1(r1, c1)}", "values": values})
+    return data
+
+
+class SheetWriter:
+    """Stage values, diff them against one grid read, push only what changed."""
+
+    def __init__(self, sheet, retries: int = RETRIES, backoff: float = BACKOFF_BASE,
+                 backoff_cap: float = BACKOFF_CAP, sleep=time.sleep):
+        self.sheet = sheet
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_cap = backoff_cap
+        self.sleep = sleep
+        self.staged: Cellmap = {}
+        self._grid: Optional[List[List[Any]]] = None
+        self.last_plan: List[Dict[str, Any]] = []
+
+    # ---- reads ----
+    def grid(self) -> List[List[Any]]:
+        if self._grid is None:
+            with timer("sheets.read_grid"):
+                self._grid = self._retry(lambda: self._read_grid())
+            count("sheets.rows_read", len(self._grid))
+        return self._grid
+
+    def _read_grid(self) -> List[List[Any]]:
+        try:
+            return self.sheet.get_all_values(value_render_option="UNFORMATTED_VALUE")
+        except TypeError:
+            return self.sheet.get_all_values()
+
+    def current(self, row: int, col: int) -> Any:
+        grid = self.grid()
+        if row - 1 < len(grid) and col - 1 < len(grid[row - 1]):
+            return grid[row - 1][col - 1]
+        return ""
+
+    # ---- staging ----
+    def set(self, row: int, col: int, value: Any) -> None:
+        self.staged[(row, col)] = value
+
+    def set_column(self, letter: str, values: Iterable[Any], start_row: int = 2) -> None:
+        col = col_index(letter)
+        for i, v in enumerate(values):
+            self.staged[(start_row + i, col)] = v
+
+    def diff(self) -> Cellmap:
+        return {rc: v for rc, v in self.staged.items() if not _same(self.current(*rc), v)}
+
+    def plan(self) -> List[Dict[str, Any]]:
+        return coalesce(self.diff(), self.staged)
+
+    # ---- writes ----
+    def _retry(self, fn):
+        for attempt in range(self.retries + 1):
+            try:
+                return fn()
+            except Exception as e:
+                code = getattr(getattr(e, "response", None), "status_code", None) or getattr(e, "code", None)
+                transient = is_retryable(e) or (isinstance(code, int) and code >= 500)
+                if attempt == self.retries or not transient:
+                    raise
+                count("sheets.retries")
+                self.sleep(random.uniform(0, min(self.backoff_cap, self.backoff * 2 ** attempt)))
+
+    def flush(self) -> int:
+        """Single batch_update with every changed cell; returns the number of ranges sent."""
+        changes = self.diff()
+        data = coalesce(changes, self.staged)
+        self.last_plan = data
+        if data:
+            needed = max(c for (_, c) in changes)
+            if getattr(self.sheet, "col_count", needed) < needed:
+                self._retry(lambda: self.sheet.resize(cols=needed))
+            with timer("sheets.batch_update"):
+                self._retry(lambda: self.sheet.batch_update(data))
+            self._apply(changes)
+            count("sheets.ranges_written", len(data))
+            count("sheets.cells_written", len(changes))
+            count("sheets.rows_written", len({r for r, _ in changes}))
+            if enabled():
+                count("sheets.bytes_sent", len(json.dumps(data, default=str)))
+        self.staged.clear()
+        return len(data)
+
+    def _apply(self, changes: Cellmap) -> None:
+        # Keep the cached grid in step so a second flush is a no-op
+        grid = self._grid
+        for (r, c), v in changes.items():
+            while len(grid) < r:
+                grid.append([])
+            row = grid[r - 1]
+            while len(row) < c:
+                row.append("")
+            row[c - 1] = v
+
+
+# ───────── offline benchmark ─────────
+def benchmark(n_rows: int = 500, changed_frac: float = 0.2, seed: int = 0) -> dict:
+    from fake_worksheet import FakeWorksheet
+
+    rng = random.Random(seed)
+    header = ["Ticker", "ATR %", "IV Rank"]
+    rows = [header] + [[f"T{i:04d}", round(rng.uniform(1, 5), 4), round(rng.uniform(0, 100), 4)]
+                       for i in range(n_rows)]
+    new_b = [r[1] if rng.random() > changed_frac else round(rng.uniform(1, 5), 4) for r in rows[1:]]
+    new_c = [r[2] if rng.random() > changed_frac else round(rng.uniform(0, 100), 4) for r in rows[1:]]
+
+    naive = FakeWorksheet([list(r) for r in rows])
+    t0 = time.perf_counter()
+    for i, (b, c) in enumerate(zip(new_b, new_c), start=2):
+        naive.update_cell(i, 2, b)
+        naive.update_cell(i, 3, c)
+    naive_s = time.perf_counter() - t0
+
+    fake = FakeWorksheet([list(r) for r in rows])
+    writer = SheetWriter(fake)
+    t0 = time.perf_counter()
+    writer.set_column("B", new_b)
+    writer.set_column("C", new_c)
+    ranges = writer.flush()
+    diff_s = time.perf_counter() - t0
+    assert fake.get_all_values() == naive.get_all_values()
+    return {
+        "rows": n_rows,
+        "update_cell_requests": naive.requests,
+        "writer_requests": fake.requests,
+        "writer_ranges": ranges,
+        "writer_cells": fake.cells_written,
+        "update_cell_s": round(naive_s, 4),
+        "writer_s": round(diff_s, 4),
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark())
@@ -0,0 +1,62 @@
+# sheets.py — shared Google Sheets access for the Earnings Tracker jobs
+import re
+from typing import List
+
+from instrumentation import timer
+
+# ───────── config ─────────
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+TRACKER = "Earnings Tracker"
+CREDS_FILE = "gcreds2.json"
+
+
+# ───────── auth ─────────
+def open_tracker(creds_file: str = CREDS_FILE):
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    with timer("sheets.auth"):
+        creds = ServiceAccountCredentials.from_json_keyfile_name(creds_file, SCOPE)
+        client = gspread.authorize(creds)
+    with timer("sheets.open"):
+        return client.open(TRACKER).sheet1
+
+
+# ───────── tickers ─────────
+def clean_ticker(raw: str) -> str:
+    return raw.strip().replace("$", "")
+
+
+def is_valid_ticker(t: str) -> bool:
+    return re.match(r'^[A-Z\-\.]{1,6}$', t) is not None  # Valid tickers only
+
+
+def read_tickers(sheet) -> List[str]:
+    # Column A, skip header; row alignment is kept (blank rows stay "")
+    return [clean_ticker(t) for t in sheet.col_values(1)[1:]]
+
+
+def col_letter(idx: int) -> str:
+    # 1-based column index -> A1 letter(s)
+    out = ""
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        out = chr(65 + rem) + out
+    return out
+
+
+def col_index(letter: str) -> int:
+    idx = 0
+    for ch in letter.upper():
+        idx = idx * 26 + ord(ch) - 64
+    return idx
+
+
+def a1_to_rc(a1: str):
+    # "AD12" -> (12, 30)
+    letters = "".join(ch for ch in a1 if ch.isalpha())
+    digits = "".join(ch for ch in a1 if ch.isdigit())
+    return int(digits), col_index(letters)
+
+
+def rc_to_a1(row: int, col: int) -> str:
+    return f"{col_letter(col)}{row}"
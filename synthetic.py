@@ -0,0 +1,125 @@
+# synthetic.py — deterministic synthetic OHLCV panels, option chains and earnings events for offline benchmarks
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from fake_provider import fake_universe
+
+# ───────── config ─────────
+END = "2025-06-30"           # fixed, so a fixture never depends on the day it was built
+SESSIONS_PER_YEAR = 252
+EVENTS_PER_YEAR = 4
+
+
+@dataclass
+class Panel:
+    tickers: List[str]
+    dates: pd.DatetimeIndex
+    open: np.ndarray             # (T, N) float64
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    @property
+    def shape(self):
+        return self.close.shape
+
+    def frame(self, j: int) -> pd.DataFrame:
+        # One ticker as the store would hand it out
+        return pd.DataFrame({
+            "Open": self.open[:, j], "High": self.high[:, j], "Low": self.low[:, j],
+            "Close": self.close[:, j], "Adj Close": self.close[:, j], "Volume": self.volume[:, j],
+        }, index=self.dates)
+
+
+def price_panel(n_tickers: int, years: float, seed: int = 0, end: str = END) -> Panel:
+    """Random-walk bars for n_tickers over `years` of business days, all generated in one block."""
+    T = max(int(round(years * SESSIONS_PER_YEAR)), 2)
+    dates = pd.bdate_range(end=end, periods=T)
+    rng = np.random.default_rng(seed)
+    vol = rng.uniform(0.01, 0.035, n_tickers)
+    start = rng.uniform(20, 400, n_tickers)
+    rets = rng.standard_normal((T, n_tickers)) * vol + 0.0002
+    close = start * np.exp(np.cumsum(rets, axis=0))
+    open_ = close * np.exp(rng.standard_normal((T, n_tickers)) * (vol / 2))
+    span = np.abs(rng.standard_normal((T, n_tickers))) * vol * close
+    high = np.maximum(open_, close) + span / 2
+    low = np.minimum(open_, close) - span / 2
+    volume = rng.integers(100_000, 50_000_000, (T, n_tickers)).astype(float)
+    return Panel(fake_universe(n_tickers), dates, open_, high, low, close, volume)
+
+
+def earnings_events(panel: Panel, per_year: int = EVENTS_PER_YEAR, seed: int = 0,
+                    warmup: int = 40) -> Dict[str, Dict[str, pd.Timestamp]]:
+    """Quarterly-ish report dates per ticker in the catalysts shape ({ticker: {label: date}})."""
+    from earnings_calendar import quarter_label
+    rng = np.random.default_rng(seed + 1)
+    T = len(panel.dates)
+    step = SESSIONS_PER_YEAR // per_year
+    out = {}
+    for t in panel.tickers:
+        first = warmup + int(rng.integers(0, step))
+        pos = np.arange(first, T - 2, step)
+        out[t] = {quarter_label(panel.dates[p]): panel.dates[p] for p in pos[::-1]}
+    return out
+
+
+def iv_history(panel: Panel, seed: int = 0) -> np.ndarray:
+    # Mean-reverting ATM IV per ticker, (T, N)
+    rng = np.random.default_rng(seed + 2)
+    T, N = panel.shape
+    base = rng.uniform(0.2, 0.6, N)
+    shocks = rng.standard_normal((T, N)) * 0.02
+    iv = np.empty((T, N))
+    iv[0] = base
+    for t in range(1, T):
+        iv[t] = iv[t - 1] + 0.05 * (base - iv[t - 1]) + shocks[t]
+    return np.clip(iv, 0.05, 3.0)
+
+
+def option_chain(spot: float, seed: int = 0, n_strikes: int = 21, T: float = 30 / 365, r: float = 0.04):
+    """(calls, puts) shaped like yfinance option_chain frames: quadratic smile, BS-priced quotes with a spread."""
+    from option_pricing import bs_price
+    rng = np.random.default_rng(seed)
+    step = 1.0 if spot < 50 else 2.5 if spot < 200 else 5.0
+    strikes = np.round(spot / step) * step + step * (np.arange(n_strikes) - n_strikes // 2)
+    base = rng.uniform(0.2, 0.6)
+    smile = base * (1 + 0.5 * ((strikes - spot) / spot) ** 2)
+
+    def side(skew: float, is_call: bool) -> pd.DataFrame:
+        iv = smile * (1 + skew)
+        mid = bs_price(spot, strikes, T, r, iv, is_call)
+        half = np.maximum(0.01, mid * rng.uniform(0.01, 0.05, len(strikes)))
+        bid = np.round(np.maximum(mid - half, 0.0), 2)
+        ask = np.round(mid + half, 2)
+        return pd.DataFrame({"strike": strikes, "impliedVolatility": iv,
+                             "bid": bid, "ask": ask, "lastPrice": np.round(mid, 2)})
+    return side(0.0, True), side(0.03, False)
+
+
+def option_chains(panel: Panel, seed: int = 0, n_strikes: int = 21) -> Dict[str, tuple]:
+    spots = panel.close[-1]
+    return {t: option_chain(float(s), seed + j, n_strikes) for j, (t, s) in enumerate(zip(panel.tickers, spots))}
+
+
+def sheet_grid(panel: Panel, n_cols: int = 8, seed: int = 0) -> List[List[object]]:
+    # Header + one row per ticker, numeric metric columns like the tracker's
+    rng = np.random.default_rng(seed + 3)
+    vals = np.round(rng.uniform(0, 100, (len(panel.tickers), n_cols)), 4)
+    header = ["Ticker"] + [f"M{k}" for k in range(n_cols)]
+    return [header] + [[t] + row.tolist() for t, row in zip(panel.tickers, vals)]
+
+
+def perturb(grid: List[List[object]], frac: float = 0.2, seed: int = 0) -> List[List[object]]:
+    # Copy of grid with `frac` of the numeric cells changed (a typical nightly delta)
+    rng = np.random.default_rng(seed + 4)
+    out = [list(r) for r in grid]
+    for r in out[1:]:
+        for c in range(1, len(r)):
+            if rng.random() < frac:
+                r[c] = round(float(rng.uniform(0, 100)), 4)
+    return out
+
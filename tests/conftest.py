@@ -0,0 +1,7 @@
+# conftest.py — the modules are flat scripts at the repo root; tests import them directly
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,36 @@
+# test_cli.py — `cli.py --help` stays inside the startup budget and imports nothing heavy
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import cli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 3
+# Parse `<cmd> --help` in-process, then report which heavy modules got loaded
+PROBE = ("import sys, cli\n"
+         "try:\n"
+         "    cli.main(%r)\n"
+         "except SystemExit:\n"
+         "    pass\n"
+         "print(','.join(m for m in %r if m in sys.modules), file=sys.stderr)\n")
+
+
+def test_help_within_budget():
+    runs = []
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "cli.py", "--help"], cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        runs.append(time.perf_counter() - t0)
+    assert min(runs) <= cli.STARTUP_BUDGET
+
+
+@pytest.mark.parametrize("cmd", ("",) + cli.COMMANDS)
+def test_help_imports_nothing_heavy(cmd):
+    argv = ([cmd] if cmd else []) + ["--help"]
+    out = subprocess.run([sys.executable, "-c", PROBE % (argv, cli.HEAVY)], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    assert out.stderr.strip() == "", f"cli.py {cmd} --help imported {out.stderr.strip()}"
@@ -0,0 +1,81 @@
+# test_discord_dispatch.py — packing, 429 handling and ledger dedupe against the local MockWebhook
+import asyncio
+import os
+import time
+
+import pytest
+
+from discord_dispatch import CONTENT_LIMIT, Alert, Dispatcher, MockWebhook, RateLimit, SentLedger, pack, render
+
+
+def alerts(n: int, width: int = 180, day: str = "2025-07-30"):
+    return [Alert(f"T{i:03d}", day, "Straddle", f"📈 `T{i:03d}` — Straddle | " + "x" * width) for i in range(n)]
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return SentLedger(os.path.join(tmp_path, "ledger.db"))
+
+
+def test_pack_fits_the_content_cap_and_keeps_order():
+    items = alerts(60, width=170) + [Alert("BIG", "2025-07-30", "Straddle", "y" * 3000)] + alerts(5, width=1900)
+    chunks = pack(items)
+    assert all(len(render(c)) <= CONTENT_LIMIT for c in chunks)
+    assert [a for c in chunks for a in c] == items                 # every alert once, in order
+    assert len(chunks) < len(items) / 3                            # small alerts share messages
+
+
+def test_pack_boundary_exactly_at_the_cap():
+    half = (CONTENT_LIMIT - 2) // 2
+    a, b = Alert("A", "d", "s", "a" * half), Alert("B", "d", "s", "b" * half)
+    assert pack([a, b]) == [[a, b]] and len(render([a, b])) == CONTENT_LIMIT
+    assert len(pack([a, Alert("C", "d", "s", "c" * (half + 1))])) == 2
+
+
+def test_retry_after_is_honored(ledger):
+    # Four senders hit a 2-per-window bucket before any response tells them its state
+    with MockWebhook(limit=2, window=0.3) as hook:
+        disp = Dispatcher(hook.url, ledger, max_in_flight=4, retries=3)
+        t0 = time.perf_counter()
+        sent = asyncio.run(disp.send(alerts(8, width=1900)))
+        wall = time.perf_counter() - t0
+    assert len(sent) == 8 and len(hook.messages) == 8 and disp.stats["failed"] == 0
+    assert 0 < hook.rejected <= 4                                  # 429s stop once Retry-After is known
+    assert disp.stats["rate_limited"] == hook.rejected
+    assert wall >= 0.3 * 3 * 0.9                                   # 8 messages need 4 windows
+
+
+def test_429_blocks_every_sender_for_retry_after():
+    async def run():
+        limit = RateLimit()
+        retry = limit.update({"Retry-After": "5"}, 429, '{"retry_after": 0.25, "global": false}')
+        t0 = time.perf_counter()
+        await asyncio.gather(limit.acquire(), limit.acquire())
+        return retry, time.perf_counter() - t0
+    retry, waited = asyncio.run(run())
+    assert retry == 0.25 and waited >= 0.24                        # body's retry_after wins over the header
+
+
+def test_rerun_sends_nothing_already_in_the_ledger(ledger):
+    with MockWebhook(limit=50, window=1.0) as hook:
+        disp = Dispatcher(hook.url, ledger)
+        first = asyncio.run(disp.send(alerts(20)))
+        n = len(hook.messages)
+        again = asyncio.run(disp.send(alerts(20)))
+        more = asyncio.run(disp.send(alerts(21) + alerts(3, day="2025-10-30")))
+    assert len(first) == 20 and again == []
+    assert [a.ticker for a in more] == ["T020", "T000", "T001", "T002"]
+    assert disp.stats["skipped"] == 20 + 20
+    assert len(hook.messages) == n + 1                             # the four new alerts share one message
+
+
+def test_waiting_sender_does_not_hold_the_lock():
+    async def run():
+        limit = RateLimit()
+        limit.blocked_until = limit.clock() + 0.2
+        waiter = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0.05)
+        held = limit.lock.locked()
+        await waiter
+        return held
+    assert asyncio.run(run()) is False
@@ -0,0 +1,44 @@
+# test_earnings_calendar.py — fetched dates replace the ticker's earlier pull; static sources are kept
+import pytest
+
+import earnings_calendar
+from earnings_calendar import EarningsCalendar, _bit
+
+
+@pytest.fixture
+def static(tmp_path, monkeypatch):
+    # No catalysts / CSV unless a test writes one
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def empty() -> EarningsCalendar:
+    return EarningsCalendar.from_entries({})
+
+
+def days(cal, ticker):
+    return [str(d) for d in cal.events(ticker)[0]]
+
+
+def test_moved_projection_does_not_linger(static):
+    cal = empty().merge({"AAA": ["2025-07-20", "2025-10-30"]})
+    cal = cal.merge({"AAA": ["2025-07-20", "2025-10-22"]})
+    assert days(cal, "AAA") == ["2025-07-20", "2025-10-22"]
+    assert cal.next_event("AAA", "2025-10-23") is None
+
+
+def test_shallower_pull_keeps_older_history(static):
+    cal = empty().merge({"AAA": ["2025-01-28", "2025-04-29", "2025-07-29"]})
+    cal = cal.merge({"AAA": ["2025-07-29", "2025-10-28"]})
+    assert days(cal, "AAA") == ["2025-01-28", "2025-04-29", "2025-07-29", "2025-10-28"]
+
+
+def test_static_dates_survive_a_replaced_pull(static):
+    (static / earnings_calendar.EVENTS_CSV).write_text("Ticker,Earnings Date\nAAA,2025-10-30\n")
+    cal = EarningsCalendar.from_entries(earnings_calendar.static_entries())
+    cal = cal.merge({"AAA": ["2025-10-28"]})                # same report, fetched date wins
+    assert days(cal, "AAA") == ["2025-10-28"]
+    cal = cal.merge({"AAA": ["2025-10-15"]})                # pull moved away: the CSV date is back
+    assert days(cal, "AAA") == ["2025-10-15", "2025-10-30"]
+    mask = dict(zip(days(cal, "AAA"), cal.source[cal._slice("AAA")]))
+    assert mask["2025-10-30"] == _bit("csv") and mask["2025-10-15"] == _bit("yfinance")
@@ -0,0 +1,64 @@
+# test_iv_archive.py — the nightly snapshot spends one scheduler token per request and retries only what failed
+from collections import Counter
+
+import pandas as pd
+
+from fake_provider import FakeProvider, FakeRateLimitError, fake_universe
+from fetch_scheduler import FetchScheduler
+from iv_archive import MAX_EXPIRIES, IVArchive, snapshot_all
+from price_store import PriceStore
+
+
+class CountingProvider(FakeProvider):
+    def __init__(self, throttle=()):
+        super().__init__()
+        self.throttle = set(throttle)          # (ticker, expiry) that 429 once
+        self.requests = Counter()
+
+    def options(self, ticker, as_of=None):
+        self.requests["options", ticker] += 1
+        return super().options(ticker, as_of)
+
+    def option_chain(self, ticker, expiry, as_of=None):
+        self.requests["chain", ticker, expiry] += 1
+        if (ticker, expiry) in self.throttle:
+            self.throttle.discard((ticker, expiry))
+            raise FakeRateLimitError()
+        return super().option_chain(ticker, expiry, as_of)
+
+
+def setup(tmp_path, provider, tickers):
+    store = PriceStore(str(tmp_path / "prices"), provider=provider)
+    store.ensure_many(tickers, pd.Timestamp.today().normalize() - pd.Timedelta(days=10),
+                      scheduler=FetchScheduler(rate=0))
+    sched = FetchScheduler(rate=0, sleep=lambda s: None, seed=0)
+    tokens = []
+    acquire = sched.bucket.acquire
+    sched.bucket.acquire = lambda: (tokens.append(1), acquire())
+    return store, sched, tokens
+
+
+def test_one_token_per_request(tmp_path):
+    tickers = fake_universe(5)
+    provider = CountingProvider()
+    store, sched, tokens = setup(tmp_path, provider, tickers)
+    n = snapshot_all(tickers, IVArchive(str(tmp_path / "iv")), store, sched, provider)
+    assert n == len(tickers) * MAX_EXPIRIES
+    assert sum(provider.requests.values()) == len(tickers) * (1 + MAX_EXPIRIES)
+    assert len(tokens) == sum(provider.requests.values())
+
+
+def test_failed_chain_retries_only_that_expiry(tmp_path):
+    tickers = fake_universe(2)
+    provider = CountingProvider()
+    expiries = provider.options(tickers[0])[:MAX_EXPIRIES]
+    provider.requests.clear()
+    provider.throttle = {(tickers[0], expiries[2])}
+    store, sched, tokens = setup(tmp_path, provider, tickers)
+    archive = IVArchive(str(tmp_path / "iv"))
+    assert snapshot_all(tickers, archive, store, sched, provider) == len(tickers) * MAX_EXPIRIES
+    assert provider.requests["chain", tickers[0], expiries[2]] == 2
+    assert all(provider.requests["chain", tickers[0], e] == 1 for e in expiries if e != expiries[2])
+    assert provider.requests["options", tickers[0]] == 1
+    assert len(tokens) == sum(provider.requests.values())
+    assert len(archive.load(tickers[0])) == MAX_EXPIRIES
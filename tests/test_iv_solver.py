@@ -0,0 +1,55 @@
+# test_iv_solver.py — chains priced with bs_price solve back to their vols; arbitrage quotes come back NaN
+import numpy as np
+import pandas as pd
+
+from iv_solver import ABOVE_MAX, BELOW_INTRINSIC, OK, chain_ivs, implied_vol, solve_chain
+from option_pricing import RISK_FREE, bs_price
+
+AS_OF = pd.Timestamp("2025-01-02")
+SPOT = 100.0
+
+
+def side(strikes, prices, vendor=np.nan):
+    return pd.DataFrame({"strike": strikes, "bid": np.nan, "ask": np.nan, "lastPrice": prices,
+                         "impliedVolatility": vendor})
+
+
+def test_solve_chain_recovers_the_grid():
+    strikes = np.arange(80.0, 121.0, 5.0)
+    for days in (14, 90, 365):
+        T = days / 365.0
+        expiry = AS_OF + pd.Timedelta(days=days)
+        for vol in (0.2, 0.45, 0.9):
+            calls = side(strikes, bs_price(SPOT, strikes, T, RISK_FREE, vol, True))
+            puts = side(strikes, bs_price(SPOT, strikes, T, RISK_FREE, vol, False))
+            out = solve_chain(calls, puts, SPOT, expiry, AS_OF, fields=("mid",))
+            ok = out["status_mid"] == OK
+            assert ok.mean() > 0.8                      # only deep ITM quotes with no time value drop out
+            # Tolerance is on price, so low-vega wings come back a little looser than ATM
+            assert np.allclose(out.loc[ok, "iv_mid"], vol, atol=1e-3)
+            atm = ok & (out["strike"] == SPOT)
+            assert np.allclose(out.loc[atm, "iv_mid"], vol, atol=1e-6)
+            assert out.loc[~ok, "iv_mid"].isna().all()
+
+
+def test_quotes_outside_no_arbitrage_bounds_are_nan():
+    T = 0.25
+    price = [15.0, 150.0, 5.0, 120.0]          # call < intrinsic, call > spot, put < intrinsic, put > strike
+    K = [80.0, 100.0, 120.0, 100.0]
+    res = implied_vol(price, SPOT, K, T, [True, True, False, False])
+    assert list(res.status) == [BELOW_INTRINSIC, ABOVE_MAX, BELOW_INTRINSIC, ABOVE_MAX]
+    assert np.isnan(res.iv).all()
+
+
+def test_chain_ivs_falls_back_to_vendor_iv():
+    T, vol = 30 / 365.0, 0.35
+    strikes = np.array([90.0, 100.0, 110.0])
+    prices = bs_price(SPOT, strikes, T, RISK_FREE, vol, True)
+    prices[0] = 1.0                            # below intrinsic: unsolvable
+    calls = side(strikes, prices, vendor=[0.5, 0.9, 0.0])
+    puts = side(strikes[:0], [])
+    out = chain_ivs(calls, puts, SPOT, AS_OF + pd.Timedelta(days=30), AS_OF).set_index("strike")["iv"]
+    assert out[90.0] == 0.5                    # vendor fills the strike we could not solve
+    assert abs(out[100.0] - vol) < 1e-5        # our own solve wins over the vendor's 0.9
+    vendor_only = chain_ivs(calls, puts, SPOT).set_index("strike")["iv"]
+    assert list(vendor_only[[90.0, 100.0]]) == [0.5, 0.9] and np.isnan(vendor_only[110.0])   # zero = missing
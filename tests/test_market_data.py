@@ -0,0 +1,119 @@
+# test_market_data.py — YFinanceProvider against a yf.download stand-in that keeps yfinance's shared globals
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+yf = pytest.importorskip("yfinance")
+from yfinance import shared
+
+import market_data
+from fetch_scheduler import FetchScheduler
+from market_data import DownloadError, YFinanceProvider
+
+RATE_LIMITED = "YFRateLimitError('Too Many Requests. Rate limited. Try after a while.')"
+NO_DATA = "YFPricesMissingError('possibly delisted; no price data found  (1d 2024-01-01 -> 2024-01-02)')"
+
+
+def price_of(ticker: str) -> float:
+    return float(sum(map(ord, ticker)))
+
+
+def bars(ticker: str, start, end) -> pd.DataFrame:
+    idx = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+    p = price_of(ticker)
+    return pd.DataFrame({c: p for c in ("Open", "High", "Low", "Close", "Adj Close")} | {"Volume": 1.0}, index=idx)
+
+
+class FakeDownload:
+    """yf.download's shape: reset the module globals, fill them per ticker, concat at the end."""
+
+    def __init__(self, fail=None):
+        self.fail = fail or {}           # ticker -> error text for its first n calls
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, tickers, start=None, end=None, group_by="column", **kw):
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        shared._DFS, shared._ERRORS = {}, {}
+        for t in tickers:
+            time.sleep(0.001)
+            with self.lock:
+                n = self.calls[t] = self.calls.get(t, 0) + 1
+            err = self.fail.get(t)
+            if err is not None and n <= err[1]:
+                shared._DFS[t] = pd.DataFrame(np.nan, index=pd.DatetimeIndex([]), columns=["Close"])
+                shared._ERRORS[t] = err[0]
+            else:
+                shared._DFS[t] = bars(t, start, end)
+        time.sleep(0.001)
+        df = pd.concat(shared._DFS.values(), axis=1, keys=shared._DFS.keys(), names=["Ticker", "Price"])
+        return df if group_by == "ticker" else df.swaplevel(axis=1)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    def install(**kw):
+        f = FakeDownload(**kw)
+        monkeypatch.setattr(yf, "download", f)
+        return f
+    return install
+
+
+def test_concurrent_downloads_keep_their_own_bars(fake):
+    fake()
+    provider = YFinanceProvider()
+    tickers = [f"T{chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(64)]
+    sched = FetchScheduler(max_workers=8, rate=0)
+    frames = sched.values(lambda t: provider.download(t, "2024-01-01", "2024-02-01"), tickers)
+    for t, df in zip(tickers, frames):
+        assert df is not None and len(df) == 23
+        assert (df["Close"] == price_of(t)).all(), t
+
+
+def test_logged_rate_limit_raises_and_is_retried(fake):
+    f = fake(fail={"AAA": (RATE_LIMITED, 1)})
+    provider = YFinanceProvider()
+    with pytest.raises(DownloadError):
+        provider.download("AAA", "2024-01-01", "2024-02-01")
+    sched = FetchScheduler(max_workers=1, rate=0, backoff=0, sleep=lambda s: None)
+    f.calls.clear()
+    [res] = sched.map(lambda t: provider.download(t, "2024-01-01", "2024-02-01"), ["AAA"])
+    assert res.ok and res.attempts == 2
+    assert (res.value["Close"] == price_of("AAA")).all()
+
+
+def test_no_price_data_comes_back_empty(fake):
+    fake(fail={"OLD": (NO_DATA, 99)})
+    assert YFinanceProvider().download("OLD", "2024-01-01", "2024-01-02").empty
+
+
+
+def test_history_batch_with_logged_429_raises(fake):
+    fake(fail={"BBB": (RATE_LIMITED, 1)})
+    with pytest.raises(DownloadError):
+        YFinanceProvider().history(["AAA", "BBB"], "2024-01-01", "2024-02-01")
+
+
+def test_history_leaves_out_tickers_without_data(fake):
+    fake(fail={"OLD": (NO_DATA, 99)})
+    out = YFinanceProvider().history(["AAA", "OLD"], "2024-01-01", "2024-02-01")
+    assert set(out) == {"AAA"}
+    assert (out["AAA"]["Close"] == price_of("AAA")).all()
+
+
+def test_store_does_not_cover_a_range_that_came_back_empty(fake, tmp_path):
+    from price_store import PriceStore
+    f = fake(fail={"OLD": (NO_DATA, 1), "BBB": (RATE_LIMITED, 9)})
+    store = PriceStore(str(tmp_path), provider=YFinanceProvider())
+    sched = FetchScheduler(max_workers=4, rate=0, retries=1, backoff=0, sleep=lambda s: None)
+    assert store.ensure_many(["AAA", "OLD"], "2024-01-01", "2024-02-01", scheduler=sched) == 1
+    assert store._ranges["OLD"] is None
+    assert store.ensure_many(["BBB"], "2024-01-01", "2024-02-01", scheduler=sched) == 0
+    assert store._ranges["BBB"] is None
+    # next run: OLD is asked again and now fills in; AAA stays a cache hit
+    calls = dict(f.calls)
+    assert store.ensure_many(["AAA", "OLD"], "2024-01-01", "2024-02-01", scheduler=sched) == 1
+    assert f.calls["AAA"] == calls["AAA"] and len(store.get("OLD", fetch=False)) == 23
@@ -0,0 +1,32 @@
+# test_monte_carlo.py — each backtest row is simulated over its own hold, as price_events marks it
+import numpy as np
+import pandas as pd
+
+from monte_carlo import HOLD_DAYS, simulate, simulate_trades
+
+
+def rows(holds):
+    open_date = pd.Timestamp("2025-01-02")
+    return pd.DataFrame({
+        "ticker": ["AAA"] * len(holds), "open_date": open_date,
+        "close_date": [open_date + pd.Timedelta(days=h) for h in holds],
+        "strategy": ["Long ATM Straddle"] * len(holds), "entry_price": 100.0,
+        "entry_iv": 0.5, "exit_iv": 0.4,
+    })
+
+
+def test_rows_use_their_own_hold():
+    holds = [28, 31, 45]
+    df = rows(holds)
+    got = simulate_trades(df, n_paths=20_000, seed=3, workers=1)
+    want = simulate(df["strategy"].to_numpy(), df["entry_price"], df["entry_iv"], df["exit_iv"],
+                    hold_days=np.array(holds, dtype=float), n_paths=20_000, seed=3, workers=1)
+    assert np.allclose(got["mc_exp_pnl"], want["exp_pnl"])
+    assert got["mc_exp_pnl"].nunique() == len(holds)
+
+
+def test_rows_without_close_date_fall_back_to_hold_days():
+    df = rows([HOLD_DAYS, HOLD_DAYS]).drop(columns="close_date")
+    with_dates = simulate_trades(rows([HOLD_DAYS, HOLD_DAYS]), n_paths=5_000, seed=1, workers=1)
+    without = simulate_trades(df, n_paths=5_000, seed=1, workers=1)
+    assert np.allclose(with_dates["mc_exp_pnl"], without["mc_exp_pnl"])
@@ -0,0 +1,62 @@
+# test_option_pricing.py — Black-Scholes against textbook values, the expiry rule and P&L signs per structure
+import math
+
+import numpy as np
+
+from option_pricing import (EXPIRY_BUFFER, OPTION_DTE, bs_greeks, bs_price, expiry_dte, norm_cdf,
+                            price_events)
+
+
+def test_norm_cdf_matches_erf():
+    x = np.linspace(-9, 9, 721)
+    ref = np.array([0.5 * math.erfc(-v / math.sqrt(2)) for v in x])
+    assert np.allclose(norm_cdf(x), ref, rtol=1e-12, atol=1e-15)
+
+
+def test_known_value_and_put_call_parity():
+    # Hull: S=K=100, T=1, r=5%, σ=20% -> call 10.4506, put 5.5735
+    assert abs(bs_price(100, 100, 1.0, 0.05, 0.2, True) - 10.4506) < 1e-4
+    assert abs(bs_price(100, 100, 1.0, 0.05, 0.2, False) - 5.5735) < 1e-4
+    K, T = np.linspace(60, 140, 17), 0.4
+    c = bs_price(100, K, T, 0.03, 0.35, True, q=0.01)
+    p = bs_price(100, K, T, 0.03, 0.35, False, q=0.01)
+    assert np.allclose(c - p, 100 * np.exp(-0.01 * T) - K * np.exp(-0.03 * T), atol=1e-10)
+
+
+def test_greeks_match_finite_differences():
+    S, K, T, r, v, h = 100.0, 105.0, 0.5, 0.04, 0.3, 1e-4
+    for call in (True, False):
+        g = bs_greeks(S, K, T, r, v, call)
+        px = lambda s=S, t=T, vol=v: bs_price(s, K, t, r, vol, call)
+        assert abs(g.price - px()) < 1e-10
+        assert abs(g.delta - (px(s=S + h) - px(s=S - h)) / (2 * h)) < 1e-6
+        assert abs(g.gamma - (px(s=S + h) - 2 * px() + px(s=S - h)) / h ** 2) < 1e-3
+        assert abs(g.vega - (px(vol=v + h) - px(vol=v - h)) / (2 * h)) < 1e-5
+        assert abs(g.theta + (px(t=T + h) - px(t=T - h)) / (2 * h)) < 1e-4
+
+
+def test_expiry_outlives_the_hold():
+    hold = np.array([0, 10, 23, 29, 31, 60])
+    assert list(expiry_dte(hold)) == [max(OPTION_DTE, h + EXPIRY_BUFFER) for h in hold]
+    assert (expiry_dte(hold) - hold >= EXPIRY_BUFFER).all()
+    assert expiry_dte(5, min_dte=45) == 45
+
+
+def test_pnl_signs_on_simple_moves():
+    s0, hold, iv = 100.0, 30, 0.4
+    flat, up, down = 100.0, 125.0, 75.0
+
+    def pnl(strategy, s1):
+        return price_events([strategy], [s0], [s1], [iv], [iv], [hold])["pnl"][0]
+
+    assert pnl("Long ATM Straddle", up) > 0 and pnl("Long ATM Straddle", down) > 0
+    assert pnl("Long ATM Straddle", flat) < 0          # pure decay
+    assert pnl("Iron Condor", flat) > 0
+    assert pnl("Iron Condor", up) < 0 and pnl("Iron Condor", down) < 0
+    assert pnl("Vertical Call", up) > 0 > pnl("Vertical Call", down)
+
+
+def test_unknown_strategy_and_crush():
+    out = price_events(["Straddle", "Butterfly"], [100, 100], [100, 100], [0.5, 0.5], [0.3, 0.3], [1, 1])
+    assert out["pnl"][0] < 0 and np.isnan(out["pnl"][1])    # IV crush on an unmoved straddle loses
+    assert out["risk"][0] == out["entry"][0] and out["ror"][0] >= -1
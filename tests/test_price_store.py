@@ -0,0 +1,99 @@
+# test_price_store.py — the stored range only grows over gaps the network actually answered
+import pandas as pd
+import pytest
+
+from fetch_scheduler import FetchScheduler
+from price_store import PriceStore
+
+HOLIDAYS = pd.to_datetime(["2025-01-01", "2025-01-20", "2025-02-17"])
+SESSIONS = pd.bdate_range("2024-06-03", "2025-06-30").difference(HOLIDAYS)
+ts = pd.Timestamp
+
+
+class Source:
+    """Bars for every session; records each (start, end) asked for and can fail or go blank on cue."""
+
+    def __init__(self):
+        self.calls, self.fail, self.blank = [], set(), set()
+
+    def bars(self, ticker, start, end):
+        idx = SESSIONS[(SESSIONS >= start) & (SESSIONS < end)]
+        return pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 1e6}, index=idx)
+
+    def __call__(self, ticker, start, end):
+        self.calls.append((ticker, start, end))
+        if ticker in self.fail:
+            raise TimeoutError("read timed out")
+        return self.bars(ticker, start, end).iloc[:0] if ticker in self.blank else self.bars(ticker, start, end)
+
+    # provider interface for the bulk path
+    def download(self, ticker, start, end):
+        return self(ticker, start, end)
+
+    def history(self, tickers, start, end):
+        self.calls.append((tuple(tickers), start, end))
+        return {t: self.bars(t, start, end) for t in tickers if t not in self.blank}
+
+
+def test_first_fetch_then_tail_only(tmp_path):
+    src = Source()
+    store = PriceStore(str(tmp_path), fetcher=src)
+    assert store.ensure("AAA", "2025-01-02", "2025-03-01") is True
+    assert src.calls == [("AAA", ts("2025-01-02"), ts("2025-03-01"))]
+    # A fresh process reads the range from disk and only asks for the tail (from the last stored bar)
+    store = PriceStore(str(tmp_path), fetcher=src)
+    assert store.ensure("AAA", "2025-01-02", "2025-03-01") is False
+    store.ensure("AAA", "2025-01-02", "2025-04-01")
+    assert src.calls[1:] == [("AAA", ts("2025-02-28"), ts("2025-04-01"))]
+    got = store.get("AAA", "2025-01-02", "2025-04-01", fetch=False)
+    assert got.index.equals(SESSIONS[(SESSIONS >= "2025-01-02") & (SESSIONS < "2025-04-01")])
+
+
+def test_holiday_edge_counts_as_covered(tmp_path):
+    src = Source()
+    store = PriceStore(str(tmp_path), fetcher=src)
+    store.ensure("AAA", "2025-01-02", "2025-02-01")
+    store.ensure("AAA", "2025-01-01", "2025-02-01")            # New Year's Day: no session, one bday
+    assert src.calls[-1] == ("AAA", ts("2025-01-01"), ts("2025-01-02"))
+    n = len(src.calls)
+    assert store.ensure("AAA", "2025-01-01", "2025-02-01") is False and len(src.calls) == n
+
+
+@pytest.mark.parametrize("how", ["fail", "blank"])
+def test_failed_or_blank_gap_stays_missing(tmp_path, how):
+    src = Source()
+    store = PriceStore(str(tmp_path), fetcher=src)
+    store.ensure("AAA", "2025-03-03", "2025-04-01")
+    getattr(src, how).add("AAA")
+    if how == "fail":
+        with pytest.raises(TimeoutError):
+            store.ensure("AAA", "2025-01-02", "2025-04-01")
+    else:
+        store.ensure("AAA", "2025-01-02", "2025-04-01")
+    getattr(src, how).discard("AAA")
+    store = PriceStore(str(tmp_path), fetcher=src)
+    store.ensure("AAA", "2025-01-02", "2025-04-01")
+    assert src.calls[-1] == ("AAA", ts("2025-01-02"), ts("2025-03-03"))
+    got = store.get("AAA", "2025-01-02", "2025-04-01", fetch=False)
+    assert got.index.equals(SESSIONS[(SESSIONS >= "2025-01-02") & (SESSIONS < "2025-04-01")])
+
+
+def test_blank_first_fetch_saves_nothing(tmp_path):
+    src = Source()
+    src.blank.add("AAA")
+    PriceStore(str(tmp_path), fetcher=src).ensure("AAA", "2025-01-02", "2025-04-01")
+    assert not (tmp_path / "AAA.npz").exists()
+    src.blank.clear()
+    PriceStore(str(tmp_path), fetcher=src).ensure("AAA", "2025-01-02", "2025-04-01")
+    assert len(src.calls) == 2
+
+
+def test_bulk_leaves_a_missing_ticker_uncovered(tmp_path):
+    src = Source()
+    src.blank.add("BBB")
+    store = PriceStore(str(tmp_path), provider=src)
+    sched = FetchScheduler(rate=0, sleep=lambda s: None)
+    assert store.ensure_many(["AAA", "BBB"], "2025-01-02", "2025-04-01", scheduler=sched) == 1
+    src.blank.clear()
+    store.ensure_many(["AAA", "BBB"], "2025-01-02", "2025-04-01", scheduler=sched)
+    assert src.calls[-1] == (("BBB",), ts("2025-01-02"), ts("2025-04-01"))
@@ -0,0 +1,78 @@
+# test_result_cache.py — only new or changed events recompute; params/version changes miss; runs resume
+import numpy as np
+import pandas as pd
+
+from result_cache import ResultCache, params_hash, window_version
+
+P = params_hash({"min_atr": 0.02, "version": 1})
+D1, D2, D3 = pd.Timestamp("2025-01-30"), pd.Timestamp("2025-04-30"), pd.Timestamp("2025-07-30")
+
+
+def cache(tmp_path, engine="bt"):
+    return ResultCache(engine, str(tmp_path / "cache.db"))
+
+
+def test_hit_with_same_version_miss_with_new_one(tmp_path):
+    c = cache(tmp_path)
+    c.store("AAA", P, {D1: ("v1", {"pnl": 1.5}), D2: ("v2", {"pnl": -2.0})})
+    cached, todo = c.lookup("AAA", P, {D1: "v1", D2: "v2-readjusted", D3: "v3"})
+    assert cached == {D1: {"pnl": 1.5}}
+    assert todo == [D2, D3]
+
+
+def test_skipped_event_round_trips_as_none(tmp_path):
+    c = cache(tmp_path)
+    c.store("AAA", P, {D1: ("v1", None)})
+    cached, todo = c.lookup("AAA", P, {D1: "v1"})
+    assert cached == {D1: None} and todo == []
+
+
+def test_other_params_miss_and_prune(tmp_path):
+    c = cache(tmp_path)
+    other = params_hash({"min_atr": 0.03, "version": 1})
+    assert other != P and params_hash({"version": 1, "min_atr": 0.02}) == P
+    c.store("AAA", P, {D1: ("v1", {"pnl": 1.0})})
+    c.store("AAA", other, {D1: ("v1", {"pnl": 9.0})})
+    assert c.lookup("AAA", other, {D1: "v1"})[0] == {D1: {"pnl": 9.0}}
+    assert c.prune(P) == 1
+    assert c.lookup("AAA", other, {D1: "v1"})[1] == [D1]
+    assert c.lookup("AAA", P, {D1: "v1"})[0] == {D1: {"pnl": 1.0}}
+
+
+def test_interrupted_run_resumes(tmp_path):
+    c = cache(tmp_path)
+    c.store("AAA", P, {D1: ("v1", {"pnl": 1.0})})      # first batch committed, then the run died
+    c.close()
+    cached, todo = cache(tmp_path).lookup("AAA", P, {D1: "v1", D2: "v2"})
+    assert list(cached) == [D1] and todo == [D2]
+
+
+def test_engines_do_not_share_rows(tmp_path):
+    cache(tmp_path, "a").store("AAA", P, {D1: ("v1", {"pnl": 1.0})})
+    assert cache(tmp_path, "b").lookup("AAA", P, {D1: "v1"})[1] == [D1]
+
+
+def test_forget_only_withdrawn_dates_from_the_oldest_kept(tmp_path):
+    c = cache(tmp_path)
+    old, phantom = pd.Timestamp("2024-10-30"), pd.Timestamp("2025-10-30")
+    c.store("AAA", P, {old: ("v0", {"pnl": 0.5}), D2: ("v2", {"pnl": 1.0}),
+                       D3: ("v3", {"pnl": 2.0}), phantom: ("v4", {"pnl": 3.0})})
+    c.store("BBB", P, {phantom: ("v4", {"pnl": 3.0})})
+    assert c.forget("AAA", [D2, D3, pd.Timestamp("2025-10-22")]) == 1
+    versions = {old: "v0", D2: "v2", D3: "v3", phantom: "v4"}
+    assert list(c.lookup("AAA", P, versions)[0]) == [old, D2, D3]    # older history kept, phantom gone
+    assert list(c.lookup("BBB", P, {phantom: "v4"})[0]) == [phantom]
+    assert c.forget("AAA", []) == 0
+
+
+def test_window_version_ignores_bars_past_the_window():
+    idx = pd.bdate_range("2025-01-01", periods=60)
+    bars = pd.DataFrame(np.arange(240, dtype=float).reshape(60, 4), index=idx,
+                        columns=["Open", "High", "Low", "Close"])
+    v = window_version(bars, idx[5], idx[30])
+    longer = pd.concat([bars, bars.iloc[-1:].set_axis([idx[-1] + pd.offsets.BDay()])])
+    assert window_version(longer, idx[5], idx[30]) == v
+    adjusted = bars.copy()
+    adjusted.iloc[10, 3] *= 0.5
+    assert window_version(adjusted, idx[5], idx[30]) != v
+    assert window_version(bars, idx[5], idx[30], extra=[0.31]) != v
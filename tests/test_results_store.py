@@ -0,0 +1,76 @@
+# test_results_store.py — legacy frames round-trip typed; manifest pruning and row masks agree with a plain filter
+import numpy as np
+import pandas as pd
+
+from results_store import SCHEMA, ResultsStore
+
+
+def series_cell(ticker, value):
+    # How the old engines wrote a one-row Series into a CSV cell
+    return f"Ticker\n{ticker}    {value}\nName: 2025-01-02 00:00:00, dtype: float64"
+
+
+def legacy():
+    return pd.DataFrame({
+        "Ticker": ["aapl", "AAPL", "MSFT", "MSFT"],
+        "Earnings Date": ["2025-01-30", "2025-05-01", "2025-01-29", None],
+        "Buy Date": ["2025-01-02", "2025-04-02", "2025-01-02", "2025-04-01"],
+        "Sell Date": ["2025-01-31", "2025-05-02", "2025-01-30", "2025-05-01"],
+        "Strategy": ["Straddle", "Iron Condor", "Straddle", "Vertical Call"],
+        "Buy Price": [series_cell("AAPL", 209.0), "200", 410.0, 400.0],
+        "Sell Price": [220.0, 190.0, series_cell("MSFT", 451.0), 380.0],
+        "P/L": [0.05, -0.05, np.nan, -0.05],
+    })
+
+
+def store_with_run(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    run = store.new_run("backtest052925")
+    assert store.append(run, legacy()) == 4
+    return ResultsStore(str(tmp_path)), run          # reopened: everything comes from the manifest
+
+
+def test_legacy_round_trip(tmp_path):
+    store, run = store_with_run(tmp_path)
+    df = store.query(run).sort_values(["ticker", "entry_date"]).reset_index(drop=True)
+    assert list(df["ticker"]) == ["AAPL", "AAPL", "MSFT", "MSFT"]
+    assert list(df["strategy"]) == ["Straddle", "Iron Condor", "Straddle", "Vertical Call"]
+    for col, dtype in SCHEMA.items():
+        if col != "strategy":
+            assert df[col].dtype.kind == np.dtype(dtype).kind, col          # f8 stays float, dates stay datetime
+    assert df["event_date"].dtype.kind == "M" and pd.isna(df.loc[3, "event_date"])
+    assert list(df["entry_price"]) == [209.0, 200.0, 410.0, 400.0]
+    assert list(df["exit_price"]) == [220.0, 190.0, 451.0, 380.0]
+    assert np.isclose(df.loc[2, "ret"], 451 / 410 - 1)            # missing P/L derived from prices
+    assert df.loc[0, "ret"] == 0.05
+    assert df["option_pnl"].isna().all()
+
+
+def test_manifest_prunes_by_ticker_strategy_and_date(tmp_path):
+    store, run = store_with_run(tmp_path)
+    assert {p["ticker"] for p in store.parts(run, tickers=["msft"])} == {"MSFT"}
+    assert {p["ticker"] for p in store.parts(run, strategies="Iron Condor")} == {"AAPL"}
+    assert store.parts(run, strategies="Butterfly") == []
+    assert store.parts(run, start="2025-06-01") == []
+    assert {p["ticker"] for p in store.parts(run, end="2025-01-29")} == {"MSFT"}
+    other = store.new_run("main_cleaned")
+    store.append(other, legacy().iloc[:1])
+    assert {p["run"] for p in store.parts(other)} == {other}
+
+
+def test_scan_masks_rows_of_a_straddling_part(tmp_path):
+    store, run = store_with_run(tmp_path)
+    seen = {p["ticker"]: a for p, a in store.scan(run, start="2025-03-01", columns=["event_date", "pnl"])}
+    assert set(seen) == {"AAPL"}                                   # MSFT's only dated row is before the bound
+    assert list(seen["AAPL"]["event_date"]) == [np.datetime64("2025-05-01")]
+    whole = {p["ticker"]: a for p, a in store.scan(run, tickers=["AAPL"], columns=["pnl"])}
+    assert isinstance(whole["AAPL"]["pnl"], np.memmap) and len(whole["AAPL"]["pnl"]) == 2
+
+
+def test_nat_dates_fall_out_of_a_date_filter(tmp_path):
+    store, run = store_with_run(tmp_path)
+    df = store.query(run, tickers=["MSFT"], start="2024-01-01", end="2026-01-01")
+    assert len(df) == 1 and df["event_date"].notna().all()
+    assert len(store.query(run, tickers=["MSFT"])) == 2
+    by_entry = store.query(run, tickers=["MSFT"], start="2025-03-01", on="entry_date")
+    assert list(by_entry["strategy"]) == ["Vertical Call"]
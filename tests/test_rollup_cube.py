@@ -0,0 +1,37 @@
+# test_rollup_cube.py — re-recorded runs replace trades, withdrawn events leave the cube
+import pandas as pd
+
+from rollup_cube import RollupCube
+
+
+def run(rows):
+    return pd.DataFrame(rows, columns=["ticker", "open_date", "strategy", "pnl"])
+
+
+def test_whole_run_retracts_withdrawn_events(tmp_path):
+    cube = RollupCube("main_cleaned", root=str(tmp_path), fresh=True)
+    cube.upsert(run([("AAA", "2025-04-01", "Iron Condor", 10.0),
+                     ("AAA", "2025-07-01", "Iron Condor", -5.0),
+                     ("AAA", "2025-10-30", "Iron Condor", 7.0),       # phantom date
+                     ("BBB", "2025-07-01", "Iron Condor", 3.0)]), replace=True)
+    cube.upsert(run([("AAA", "2025-04-01", "Iron Condor", 10.0),
+                     ("AAA", "2025-07-01", "Iron Condor", -5.0),
+                     ("AAA", "2025-10-22", "Iron Condor", 4.0)]), replace=True)
+    r = cube.rollup(["ticker"]).set_index("ticker")
+    assert r.loc["AAA", "count"] == 3 and r.loc["AAA", "mean"] == (10 - 5 + 4) / 3
+    assert r.loc["BBB", "count"] == 1                                  # not in the run: untouched
+    assert sorted(cube.ledger.index) == ["AAA|2025-04-01", "AAA|2025-07-01", "AAA|2025-10-22", "BBB|2025-07-01"]
+
+
+def test_replace_keeps_history_before_the_run(tmp_path):
+    cube = RollupCube("main_cleaned", root=str(tmp_path), fresh=True)
+    cube.upsert(run([("AAA", "2024-01-02", "Straddle", 1.0), ("AAA", "2025-01-02", "Straddle", 2.0)]))
+    cube.upsert(run([("AAA", "2025-01-02", "Straddle", 2.0)]), replace=True)
+    assert cube.rollup([])["count"].iloc[0] == 2
+
+
+def test_plain_upsert_never_retracts(tmp_path):
+    cube = RollupCube("main_cleaned", root=str(tmp_path), fresh=True)
+    cube.upsert(run([("AAA", "2025-01-02", "Straddle", 1.0)]))
+    cube.upsert(run([("AAA", "2025-04-02", "Straddle", 2.0)]))
+    assert cube.rollup([])["count"].iloc[0] == 2
@@ -0,0 +1,48 @@
+# test_sheet_mirror.py — same revision skips the pull, a new calendar day forces one
+import sheet_mirror
+from sheet_mirror import SheetMirror
+
+DAY = 86400.0
+
+
+class FakeSheet:
+    def __init__(self, days_until):
+        self.days_until, self.revision, self.spreadsheet = days_until, "rev-1", self
+
+    def get_lastUpdateTime(self):
+        return self.revision
+
+    def get_all_values(self):
+        return [["Ticker", "days until"], ["AAA", str(self.days_until)]]
+
+
+def test_same_revision_same_day_skips_the_pull(tmp_path, monkeypatch):
+    now = [1_760_000_000.0]
+    monkeypatch.setattr(sheet_mirror.time, "time", lambda: now[0])
+    m, sheet = SheetMirror(str(tmp_path / "m.db")), FakeSheet(5)
+    assert m.refresh(sheet) is True
+    now[0] += 60
+    assert m.refresh(sheet) is False and m.fetches == 1
+
+
+def test_new_day_refreshes_whatever_the_revision(tmp_path, monkeypatch):
+    now = [1_760_000_000.0]
+    monkeypatch.setattr(sheet_mirror.time, "time", lambda: now[0])
+    m, sheet = SheetMirror(str(tmp_path / "m.db")), FakeSheet(5)
+    m.refresh(sheet)
+    now[0] += DAY
+    sheet.days_until = 4                      # TODAY() recalculated, revision unchanged
+    assert m.refresh(sheet) is True
+    assert [r["days_until"] for r in m.upcoming(10)] == [4]
+
+
+def test_new_day_beats_max_age_without_a_handle(tmp_path, monkeypatch):
+    now = [1_760_000_000.0]
+    monkeypatch.setattr(sheet_mirror.time, "time", lambda: now[0])
+    sheet = FakeSheet(5)
+    monkeypatch.setattr(sheet_mirror, "open_tracker", lambda: sheet)
+    m = SheetMirror(str(tmp_path / "m.db"))
+    m.refresh(sheet)
+    assert m.refresh(max_age=3 * DAY) is False
+    now[0] += DAY
+    assert m.refresh(max_age=3 * DAY) is True and m.fetches == 2
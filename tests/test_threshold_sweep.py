@@ -0,0 +1,34 @@
+# test_threshold_sweep.py — sweep cells match the scalar select() rule, NaN P/L events excluded
+import numpy as np
+
+from threshold_sweep import STRATEGIES, EventMatrix, select, sweep
+
+
+def events(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    atr, iv = rng.uniform(0.0, 0.06, n), rng.uniform(0.0, 1.0, n)
+    pnl = {s: rng.normal(0.0, 1.0, n) for s in STRATEGIES}
+    for s in STRATEGIES:
+        pnl[s][rng.random(n) < 0.3] = np.nan                     # unpriced events
+    return EventMatrix(atr, iv, pnl)
+
+
+def test_nan_pnl_is_not_a_losing_trade():
+    ev = events()
+    grid = {"straddle_atr": [0.03], "straddle_iv": [0.4], "condor_atr": [0.02], "condor_iv": [0.6]}
+    res = sweep(ev, grid)
+    labels = select(ev, 0.03, 0.4, 0.02, 0.6)
+    for s in STRATEGIES:
+        p = ev.pnl[s][labels == s]
+        p = p[~np.isnan(p)]
+        assert res.count[s].item() == len(p)
+        assert np.isclose(res.win_rate(s).item(), (p > 0).mean())
+        assert np.isclose(res.mean_pnl(s).item(), p.mean())
+
+
+def test_all_nan_cell_has_no_stats():
+    ev = events(50)
+    ev.pnl["Straddle"][:] = np.nan
+    res = sweep(ev, {"straddle_atr": [0.0], "straddle_iv": [0.0], "condor_atr": [0.02], "condor_iv": [0.6]})
+    assert res.count["Straddle"].item() == 0
+    assert np.isnan(res.win_rate("Straddle").item()) and np.isnan(res.mean_pnl("Straddle").item())
@@ -0,0 +1,221 @@
+# threshold_sweep.py — vectorized grid search over the Straddle / Iron Condor selector thresholds
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ───────── config ─────────
+EVENTS_CSV = "earnings_strategy_backtest.csv"
+STRATEGIES = ("Straddle", "Iron Condor", "Vertical Call")
+OPS = {">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal}
+
+# (atr op, iv op) per strategy; Straddle is tested first, Vertical Call is the fallthrough
+RULES = {
+    "backtest": {"Straddle": (">", ">"), "Iron Condor": ("<", "<")},        # backtest052925 / main_cleaned_updated2
+    "main_cleaned": {"Straddle": (">=", "<="), "Iron Condor": (">=", ">=")},  # MIN_ATR_PCT / LOW / HIGH_IV_RANK
+}
+
+DEFAULT_GRID = {
+    "straddle_atr": np.round(np.arange(0.005, 0.0601, 0.0025), 4),
+    "straddle_iv": np.round(np.arange(0.0, 1.001, 0.05), 2),
+    "condor_atr": np.round(np.arange(0.005, 0.0601, 0.0025), 4),
+    "condor_iv": np.round(np.arange(0.0, 1.001, 0.05), 2),
+}
+AXES = ("straddle_atr", "straddle_iv", "condor_atr", "condor_iv")
+
+
+# ───────── event matrix ─────────
+@dataclass
+class EventMatrix:
+    atr_pct: np.ndarray                  # ATR14 / entry price at entry
+    iv_rank: np.ndarray                  # 0..1 at entry
+    pnl: Dict[str, np.ndarray]           # per-strategy P/L for every event
+    meta: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+    def __len__(self) -> int:
+        return len(self.atr_pct)
+
+
+def move_payoffs(atr_pct: np.ndarray, move: np.ndarray) -> Dict[str, np.ndarray]:
+    # Placeholder P/L from the underlying move, in return units: long vol earns the move
+    # beyond one ATR%, the condor keeps it, the vertical rides direction
+    absmove = np.abs(move)
+    return {
+        "Straddle": absmove - atr_pct,
+        "Iron Condor": atr_pct - absmove,
+        "Vertical Call": move,
+    }
+
+
+def option_payoffs(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    # Every event priced as every structure (Black-Scholes, entry -> exit), as return on max loss
+    from option_pricing import price_events
+    hold = (pd.to_datetime(df["Exit Date"]) - pd.to_datetime(df["Entry Date"])).dt.days.to_numpy(dtype=float)
+    args = (df["Entry Price"], df["Exit Price"], df["Entry IV"], df["Exit IV"], hold)
+    return {s: price_events(np.full(len(df), s, dtype=object), *args)["ror"] for s in STRATEGIES}
+
+
+def events_from_frame(df: pd.DataFrame, payoff=None) -> EventMatrix:
+    """payoff=None prices the option structures when the backtest wrote IVs, else move_payoffs."""
+    df = df.dropna(subset=["ATR%", "IV Rank", "P/L"]).reset_index(drop=True)
+    atr = df["ATR%"].to_numpy(dtype=float)
+    iv = df["IV Rank"].to_numpy(dtype=float)
+    move = df["P/L"].to_numpy(dtype=float)
+    if payoff is None and {"Entry IV", "Exit IV"} <= set(df.columns):
+        pnl = option_payoffs(df)
+    else:
+        pnl = (payoff or move_payoffs)(atr, move)
+    return EventMatrix(atr, iv, pnl, df.drop(columns=["Strategy"], errors="ignore"))
+
+
+def load_events(path: str = EVENTS_CSV, payoff=None) -> EventMatrix:
+    return events_from_frame(pd.read_csv(path), payoff)
+
+
+# ───────── result cube ─────────
+@dataclass
+class SweepResult:
+    axes: Dict[str, np.ndarray]
+    count: Dict[str, np.ndarray]         # strategy -> cube of trade counts
+    wins: Dict[str, np.ndarray]
+    pnl_sum: Dict[str, np.ndarray]
+    n_events: int
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(len(self.axes[a]) for a in AXES)
+
+    def total(self, strategies: Sequence[str] = STRATEGIES):
+        c = sum(self.count[s] for s in strategies)
+        w = sum(self.wins[s] for s in strategies)
+        p = sum(self.pnl_sum[s] for s in strategies)
+        return c, w, p
+
+    def win_rate(self, strategy: Optional[str] = None) -> np.ndarray:
+        c, w, _ = self.total() if strategy is None else (self.count[strategy], self.wins[strategy], None)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(c > 0, w / c, np.nan)
+
+    def mean_pnl(self, strategy: Optional[str] = None) -> np.ndarray:
+        c, _, p = self.total() if strategy is None else (self.count[strategy], None, self.pnl_sum[strategy])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(c > 0, p / c, np.nan)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long table: one row per grid cell, count / win rate / mean P/L per strategy and overall."""
+        grids = np.meshgrid(*(self.axes[a] for a in AXES), indexing="ij")
+        out = {a: g.ravel() for a, g in zip(AXES, grids)}
+        for s in STRATEGIES:
+            key = s.lower().replace(" ", "_")
+            out[f"{key}_n"] = self.count[s].ravel()
+            out[f"{key}_win"] = self.win_rate(s).ravel()
+            out[f"{key}_pnl"] = self.mean_pnl(s).ravel()
+        out["n"] = self.total()[0].ravel()
+        out["win"] = self.win_rate().ravel()
+        out["pnl"] = self.mean_pnl().ravel()
+        return pd.DataFrame(out)
+
+    def best(self, strategy: Optional[str] = None, by: str = "pnl", min_trades: int = 20,
+             top: int = 10) -> pd.DataFrame:
+        df = self.to_frame()
+        prefix = "" if strategy is None else strategy.lower().replace(" ", "_") + "_"
+        df = df[df[f"{prefix}n"] >= min_trades]
+        return df.sort_values(f"{prefix}{by}", ascending=False).head(top)
+
+
+# ───────── kernel ─────────
+def _masks(atr: np.ndarray, iv: np.ndarray, atr_levels, iv_levels, ops) -> np.ndarray:
+    # (len(atr_levels) * len(iv_levels), E) float 0/1 selection matrix
+    a = OPS[ops[0]](atr[None, :], np.asarray(atr_levels)[:, None])
+    b = OPS[ops[1]](iv[None, :], np.asarray(iv_levels)[:, None])
+    return (a[:, None, :] & b[None, :, :]).reshape(-1, len(atr)).astype(float)
+
+
+def _sweep_block(atr, iv, pnl, s_atr, s_iv, c_atr, c_iv, rule):
+    """Stats for a block of straddle levels × every condor level, via matrix products.
+
+    Condor only takes events the straddle rule left over, so
+    sum(C & ~S) = C·1 - C·Sᵀ; the Vertical Call bucket is whatever remains.
+    """
+    S = _masks(atr, iv, s_atr, s_iv, rule["Straddle"])          # (nS, E)
+    C = _masks(atr, iv, c_atr, c_iv, rule["Iron Condor"])       # (nC, E)
+    nS, nC = len(S), len(C)
+    out = {}
+    for s in STRATEGIES:
+        # Events with no P/L for this structure are not trades: out of the count, wins and sum alike
+        ok = ~np.isnan(pnl[s])
+        p = np.where(ok, pnl[s], 0.0)
+        w = (p > 0).astype(float)
+        per = {}
+        for name, v in (("count", ok.astype(float)), ("wins", w), ("pnl_sum", p)):
+            S_v = S @ v                                         # (nS,)
+            C_v = C @ v                                         # (nC,)
+            CS_v = (C * v) @ S.T                                # (nC, nS)
+            condor = (C_v[:, None] - CS_v).T                    # (nS, nC)
+            if s == "Straddle":
+                cube = np.broadcast_to(S_v[:, None], (nS, nC))
+            elif s == "Iron Condor":
+                cube = condor
+            else:
+                cube = v.sum() - S_v[:, None] - condor
+            per[name] = cube
+        out[s] = per
+    return out
+
+
+def _run_chunk(args):
+    atr, iv, pnl, s_atr, s_iv, c_atr, c_iv, rule = args
+    return _sweep_block(atr, iv, pnl, s_atr, s_iv, c_atr, c_iv, rule)
+
+
+def sweep(events: EventMatrix, grid: Optional[Dict[str, Sequence[float]]] = None,
+          rule: str = "backtest", workers: int = 0, chunk: int = 8) -> SweepResult:
+    """Evaluate every threshold combination at once.
+
+    workers > 0 splits the straddle-ATR axis across a process pool
+    (worth it only for very large grids; the ~230k-cell default runs in-process in under a second).
+    """
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    axes = {a: np.asarray(grid[a], dtype=float) for a in AXES}
+    r = RULES[rule] if isinstance(rule, str) else rule
+    atr, iv = events.atr_pct, events.iv_rank
+    pnl = {s: np.asarray(events.pnl[s], dtype=float) for s in STRATEGIES}
+
+    s_atr = axes["straddle_atr"]
+    blocks = [s_atr[i:i + chunk] for i in range(0, len(s_atr), chunk)] if workers else [s_atr]
+    jobs = [(atr, iv, pnl, b, axes["straddle_iv"], axes["condor_atr"], axes["condor_iv"], r) for b in blocks]
+    if workers:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_run_chunk, jobs))
+    else:
+        parts = [_run_chunk(j) for j in jobs]
+
+    shape = tuple(len(axes[a]) for a in AXES)
+    res = {name: {} for name in ("count", "wins", "pnl_sum")}
+    for s in STRATEGIES:
+        for name in res:
+            # each part is (len(block) * nSiv, nCatr * nCiv); stack along straddle ATR
+            cube = np.concatenate([p[s][name].reshape(-1, shape[1], shape[2], shape[3]) for p in parts])
+            res[name][s] = np.ascontiguousarray(cube)
+    return SweepResult(axes, res["count"], res["wins"], res["pnl_sum"], len(events))
+
+
+def select(events: EventMatrix, straddle_atr: float, straddle_iv: float, condor_atr: float,
+           condor_iv: float, rule: str = "backtest") -> np.ndarray:
+    # Scalar reference of the same rule, one label per event (used to spot-check a cell)
+    r = RULES[rule] if isinstance(rule, str) else rule
+    s = OPS[r["Straddle"][0]](events.atr_pct, straddle_atr) & OPS[r["Straddle"][1]](events.iv_rank, straddle_iv)
+    c = OPS[r["Iron Condor"][0]](events.atr_pct, condor_atr) & OPS[r["Iron Condor"][1]](events.iv_rank, condor_iv)
+    return np.where(s, "Straddle", np.where(c, "Iron Condor", "Vertical Call"))
+
+
+if __name__ == "__main__":
+    import time
+    ev = load_events()
+    t0 = time.perf_counter()
+    res = sweep(ev)
+    cells = int(np.prod(res.shape))
+    print(f"{cells:,} threshold cells × {len(ev)} events in {time.perf_counter() - t0:.2f}s")
+    print(res.best(min_trades=max(20, len(ev) // 50)).to_string(index=False))